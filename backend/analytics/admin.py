@@ -0,0 +1,25 @@
+from django.contrib import admin
+from .models import CohortRetention, DailyMetrics, MonthlyChurn
+
+
+@admin.register(DailyMetrics)
+class DailyMetricsAdmin(admin.ModelAdmin):
+    list_display = ["date", "new_members", "new_vehicles", "revenue", "updated_at"]
+    date_hierarchy = "date"
+
+
+@admin.register(CohortRetention)
+class CohortRetentionAdmin(admin.ModelAdmin):
+    list_display = ["cohort", "months_since_signup", "cohort_size", "retained"]
+    list_filter = ["cohort"]
+
+
+@admin.register(MonthlyChurn)
+class MonthlyChurnAdmin(admin.ModelAdmin):
+    list_display = [
+        "month",
+        "active_members",
+        "new_members",
+        "churned_members",
+        "reactivated_members",
+    ]
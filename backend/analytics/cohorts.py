@@ -0,0 +1,234 @@
+"""
+Membership cohort retention and churn
+
+Members are ordered by signup, so each signup-month cohort is a contiguous
+range of positions. Activity for each month is held as one integer bitmask
+over those positions (bit i set = member i was active), which turns every
+retention cell and churn figure into a single AND plus a popcount over the
+whole population instead of a per-member loop.
+
+A member is active in a month when they completed a payment in it or held a
+membership covering it. Nightly runs only rewrite the most recent months;
+--all rebuilds from the first signup.
+"""
+
+from datetime import datetime, time as dt_time, timedelta
+from django.db.models import Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import CohortRetention, DailyMetrics, MonthlyChurn
+from .revenue import add_months, month_range
+from .rollups import local_date
+
+
+def _month_index(months, value):
+    """Index of value's month within months, clamped to the window"""
+    month = local_date(value).replace(day=1)
+    if month < months[0]:
+        return 0
+    if month > months[-1]:
+        return len(months) - 1
+    return (month.year - months[0].year) * 12 + month.month - months[0].month
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+class ActivityBits:
+    """Per-month activity bitmasks for every member, ordered by signup"""
+
+    def __init__(self, months):
+        from users.models import User
+
+        self.months = months
+        members = list(
+            User.objects.filter(is_staff=False)
+            .order_by("created_at", "id")
+            .values_list("id", "created_at")
+        )
+        self.size = len(members)
+        self.position = {user_id: i for i, (user_id, _) in enumerate(members)}
+
+        # Cohort month -> (first position, end position)
+        self.cohorts = {}
+        for i, (_, created_at) in enumerate(members):
+            cohort = local_date(created_at).replace(day=1)
+            first, _end = self.cohorts.get(cohort, (i, i))
+            self.cohorts[cohort] = (first, i + 1)
+
+        self._buffers = [bytearray((self.size + 7) // 8) for _ in months]
+        self.before = bytearray((self.size + 7) // 8)
+
+    def _set(self, buffer, user_id):
+        i = self.position.get(user_id)
+        if i is not None:
+            buffer[i >> 3] |= 1 << (i & 7)
+
+    def load(self):
+        from users.models import Membership
+        from payments.models import Payment
+
+        start = _day_start(self.months[0])
+        end = _day_start(add_months(self.months[-1], 1))
+
+        payments = (
+            Payment.objects.filter(
+                status="completed", completed_at__gte=start, completed_at__lt=end
+            )
+            .annotate(month=TruncMonth("completed_at"))
+            .order_by()
+            .values_list("user_id", "month")
+            .distinct()
+        )
+        for user_id, month in payments:
+            self._set(self._buffers[_month_index(self.months, month)], user_id)
+
+        memberships = Membership.objects.filter(
+            started_at__isnull=False, started_at__lt=end
+        ).values_list(
+            "user_id", "status", "started_at", "cancelled_at", "next_billing_at"
+        )
+        for user_id, status, started_at, cancelled_at, next_billing_at in memberships:
+            if status == "active":
+                ended_at = None
+            else:
+                ended_at = cancelled_at or next_billing_at or started_at
+                if ended_at < start:
+                    continue
+            first = _month_index(self.months, started_at)
+            last = len(self.months) - 1
+            if ended_at is not None:
+                last = _month_index(self.months, ended_at)
+            for m in range(first, last + 1):
+                self._set(self._buffers[m], user_id)
+
+        # Anyone active before the window counts as returning, not new
+        earlier = Payment.objects.filter(status="completed", completed_at__lt=start)
+        for user_id in earlier.values_list("user_id", flat=True).distinct():
+            self._set(self.before, user_id)
+        earlier = Membership.objects.filter(started_at__lt=start)
+        for user_id in earlier.values_list("user_id", flat=True).distinct():
+            self._set(self.before, user_id)
+
+        self.active = [int.from_bytes(buffer, "little") for buffer in self._buffers]
+        self.ever_before = int.from_bytes(self.before, "little")
+        del self._buffers, self.before
+        return self
+
+    def cohort_mask(self, cohort):
+        first, end = self.cohorts[cohort]
+        return ((1 << end) - 1) ^ ((1 << first) - 1)
+
+
+def rollup_cohorts(first_month, last_month):
+    """
+    Recompute retention cells and churn for calendar months
+    first_month..last_month, returning the number of rows written
+    """
+    # One month of lead-in so the first month's churn has a baseline
+    months = month_range(add_months(first_month, -1), last_month)
+    bits = ActivityBits(months).load()
+    now = timezone.now()
+
+    retention = []
+    for cohort in sorted(bits.cohorts):
+        mask = bits.cohort_mask(cohort)
+        size = mask.bit_count()
+        for m, month in enumerate(months):
+            if month < max(cohort, first_month):
+                continue
+            offset = (month.year - cohort.year) * 12 + month.month - cohort.month
+            retention.append(
+                CohortRetention(
+                    cohort=cohort,
+                    months_since_signup=offset,
+                    cohort_size=size,
+                    retained=(bits.active[m] & mask).bit_count(),
+                    updated_at=now,
+                )
+            )
+    CohortRetention.objects.bulk_create(
+        retention,
+        update_conflicts=True,
+        unique_fields=["cohort", "months_since_signup"],
+        update_fields=["cohort_size", "retained", "updated_at"],
+        batch_size=500,
+    )
+
+    churn = []
+    ever = bits.ever_before | bits.active[0]
+    for m in range(1, len(months)):
+        previous, current = bits.active[m - 1], bits.active[m]
+        churn.append(
+            MonthlyChurn(
+                month=months[m],
+                active_members=current.bit_count(),
+                new_members=(current & ~ever).bit_count(),
+                churned_members=(previous & ~current).bit_count(),
+                reactivated_members=(current & ~previous & ever).bit_count(),
+                updated_at=now,
+            )
+        )
+        ever |= current
+    MonthlyChurn.objects.bulk_create(
+        churn,
+        update_conflicts=True,
+        unique_fields=["month"],
+        update_fields=[
+            "active_members",
+            "new_members",
+            "churned_members",
+            "reactivated_members",
+            "updated_at",
+        ],
+    )
+    return len(retention) + len(churn)
+
+
+def active_member_ids(since):
+    """
+    Members with any activity since the given time: signing in or refreshing
+    a session, booking, messaging support, or paying
+    """
+    from users.models import User
+    from appointments.models import Appointment
+    from chat.models import ChatMessage
+    from payments.models import Payment
+
+    active = set(
+        User.objects.filter(is_staff=False, last_login__gte=since).values_list(
+            "id", flat=True
+        )
+    )
+    active.update(
+        Appointment.objects.filter(created_at__gte=since)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    active.update(
+        ChatMessage.objects.filter(sender="user", created_at__gte=since)
+        .values_list("thread__user_id", flat=True)
+        .distinct()
+    )
+    active.update(
+        Payment.objects.filter(Q(created_at__gte=since) | Q(completed_at__gte=since))
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    active.difference_update(
+        User.objects.filter(is_staff=True).values_list("id", flat=True)
+    )
+    return active
+
+
+def snapshot_active_members(day=None):
+    """Store the 30-day active member count on the day's metrics row"""
+    day = day or timezone.localdate()
+    since = _day_start(day) - timedelta(days=29)
+    count = len(active_member_ids(since))
+    DailyMetrics.objects.update_or_create(
+        date=day,
+        defaults={"active_members_30d": count, "updated_at": timezone.now()},
+    )
+    return count
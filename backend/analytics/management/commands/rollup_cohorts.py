@@ -0,0 +1,56 @@
+"""
+Management command to rebuild membership cohort retention and churn
+Retention and churn only change for recent months, so the nightly run
+rewrites the last two calendar months; run once with --all after deploying
+to backfill every cohort since the first signup.
+
+Usage: python manage.py rollup_cohorts [--months 2] [--all]
+Cron: 15 0 * * * cd /path/to/project && python manage.py rollup_cohorts
+"""
+
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from analytics.cohorts import rollup_cohorts, snapshot_active_members
+from analytics.revenue import add_months
+from analytics.rollups import local_date
+
+
+class Command(BaseCommand):
+    help = "Rebuild membership cohort retention and churn"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=2,
+            help="Number of calendar months to rebuild, ending this month",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every month since the first signup",
+        )
+
+    def handle(self, *args, **options):
+        from users.models import User
+
+        this_month = timezone.localdate().replace(day=1)
+        first_month = add_months(this_month, 1 - max(options["months"], 1))
+        if options["all"]:
+            first_signup = User.objects.filter(is_staff=False).aggregate(
+                first=Min("created_at")
+            )["first"]
+            if first_signup:
+                first_month = min(first_month, local_date(first_signup).replace(day=1))
+
+        rows = rollup_cohorts(first_month, this_month)
+        active = snapshot_active_members()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Rebuilt {rows} cohort and churn rows "
+                f"({first_month:%Y-%m} to {this_month:%Y-%m}), "
+                f"{active} members active in the last 30 days"
+            )
+        )
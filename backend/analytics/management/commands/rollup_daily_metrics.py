@@ -0,0 +1,68 @@
+"""
+Management command to rebuild the daily metrics rollups behind the admin dashboard
+Signals keep today's rows current; run this nightly to reconcile recent days
+and once with --all after deploying to backfill history.
+
+Usage: python manage.py rollup_daily_metrics [--days 2] [--all]
+Cron: 5 0 * * * cd /path/to/project && python manage.py rollup_daily_metrics
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+from django.utils import timezone
+from analytics.rollups import local_date, rollup_range, snapshot_membership_tiers
+
+
+class Command(BaseCommand):
+    help = "Rebuild daily metrics rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=2,
+            help="Number of days to rebuild, ending today",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Rebuild every day since the first recorded activity",
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = today - timedelta(days=max(options["days"], 1) - 1)
+        if options["all"]:
+            start = min(self.first_activity() or today, start)
+
+        # Upcoming appointments are counted on the day they start
+        from appointments.models import Appointment
+
+        last_start = Appointment.objects.aggregate(last=Max("start_time"))["last"]
+        end = max(today, local_date(last_start)) if last_start else today
+
+        days = rollup_range(start, end)
+        tiers = snapshot_membership_tiers(today)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Rolled up {days} days ({start} to {end}), "
+                f"{sum(tiers.values())} active memberships"
+            )
+        )
+
+    def first_activity(self):
+        from users.models import User
+        from vehicles.models import Vehicle
+        from appointments.models import Appointment
+        from payments.models import Payment
+
+        firsts = [
+            User.objects.aggregate(first=Min("created_at"))["first"],
+            Vehicle.objects.aggregate(first=Min("created_at"))["first"],
+            Appointment.objects.aggregate(first=Min("start_time"))["first"],
+            Payment.objects.aggregate(first=Min("completed_at"))["first"],
+        ]
+        dates = [local_date(value) for value in firsts if value]
+        return min(dates) if dates else None
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyMetrics",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("date", models.DateField(unique=True)),
+                ("new_members", models.IntegerField(default=0)),
+                ("new_vehicles", models.IntegerField(default=0)),
+                ("appointments_scheduled", models.IntegerField(default=0)),
+                ("appointments_in_progress", models.IntegerField(default=0)),
+                ("appointments_completed", models.IntegerField(default=0)),
+                ("appointments_cancelled", models.IntegerField(default=0)),
+                ("revenue", models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ("payments_count", models.IntegerField(default=0)),
+                ("membership_tiers", models.JSONField(blank=True, default=dict)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "db_table": "daily_metrics",
+                "ordering": ["date"],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:29
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyChurn",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("month", models.DateField(unique=True)),
+                ("active_members", models.IntegerField(default=0)),
+                ("new_members", models.IntegerField(default=0)),
+                ("churned_members", models.IntegerField(default=0)),
+                ("reactivated_members", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "db_table": "monthly_churn",
+                "ordering": ["month"],
+            },
+        ),
+        migrations.AddField(
+            model_name="dailymetrics",
+            name="active_members_30d",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="CohortRetention",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("cohort", models.DateField()),
+                ("months_since_signup", models.PositiveSmallIntegerField()),
+                ("cohort_size", models.IntegerField(default=0)),
+                ("retained", models.IntegerField(default=0)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                "db_table": "cohort_retention",
+                "ordering": ["cohort", "months_since_signup"],
+                "unique_together": {("cohort", "months_since_signup")},
+            },
+        ),
+    ]
@@ -0,0 +1,101 @@
+from django.db import models
+from django.utils import timezone
+
+
+class DailyMetrics(models.Model):
+    """
+    Precomputed per-day platform metrics behind the admin dashboard.
+
+    Days are bucketed in the project time zone. Rows are rebuilt by the
+    rollup_daily_metrics command and refreshed by model signals.
+    """
+
+    date = models.DateField(unique=True)
+    # Members who signed up on this day and are still active
+    new_members = models.IntegerField(default=0)
+    new_vehicles = models.IntegerField(default=0)
+    # Appointments starting on this day, by current status
+    appointments_scheduled = models.IntegerField(default=0)
+    appointments_in_progress = models.IntegerField(default=0)
+    appointments_completed = models.IntegerField(default=0)
+    appointments_cancelled = models.IntegerField(default=0)
+    # Completed payments by completion day
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments_count = models.IntegerField(default=0)
+    # Snapshot of active memberships per plan tier, e.g. {"basic": 12}
+    membership_tiers = models.JSONField(default=dict, blank=True)
+    # Members with any activity in the 30 days up to this day (nightly snapshot)
+    active_members_30d = models.IntegerField(null=True, blank=True)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "daily_metrics"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"Metrics for {self.date}"
+
+    @property
+    def appointments_total(self):
+        return (
+            self.appointments_scheduled
+            + self.appointments_in_progress
+            + self.appointments_completed
+            + self.appointments_cancelled
+        )
+
+
+class CohortRetention(models.Model):
+    """
+    Members of a signup-month cohort still active N months after signup.
+
+    Written by the rollup_cohorts command; a member counts as active in a
+    month when they paid or held a membership during it.
+    """
+
+    cohort = models.DateField()  # First day of the signup month
+    months_since_signup = models.PositiveSmallIntegerField()
+    cohort_size = models.IntegerField(default=0)
+    retained = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "cohort_retention"
+        ordering = ["cohort", "months_since_signup"]
+        unique_together = ["cohort", "months_since_signup"]
+
+    def __str__(self):
+        return f"Cohort {self.cohort:%Y-%m} +{self.months_since_signup}"
+
+    @property
+    def retention_rate(self):
+        if not self.cohort_size:
+            return 0.0
+        return round(self.retained / self.cohort_size * 100, 1)
+
+
+class MonthlyChurn(models.Model):
+    """Month-over-month member movement, written by rollup_cohorts"""
+
+    month = models.DateField(unique=True)  # First day of the month
+    active_members = models.IntegerField(default=0)
+    new_members = models.IntegerField(default=0)  # Active for the first time
+    churned_members = models.IntegerField(default=0)  # Active last month, not now
+    reactivated_members = models.IntegerField(default=0)  # Back after a gap
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "monthly_churn"
+        ordering = ["month"]
+
+    def __str__(self):
+        return f"Churn for {self.month:%Y-%m}"
+
+    @property
+    def churn_rate(self):
+        """Churned members as a percentage of last month's active members"""
+        previous = self.active_members - self.new_members - self.reactivated_members
+        previous += self.churned_members
+        if previous <= 0:
+            return 0.0
+        return round(self.churned_members / previous * 100, 1)
@@ -0,0 +1,180 @@
+"""
+Revenue and MRR analytics over payments and memberships
+
+The monthly series comes from one grouped query: completed payments summed
+per (member, month, plan). A single pass over those rows classifies each
+member's month-to-month change as new, expansion, contraction, churned or
+reactivated MRR. Live MRR/ARR come from active memberships priced at their
+plan. Results are cached per period under a generation key that payment,
+membership and plan writes bump.
+"""
+
+import time
+from collections import defaultdict
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .rollups import local_date
+
+GENERATION_KEY = "analytics:revenue:gen"
+MOVEMENTS = ["new", "expansion", "contraction", "churned", "reactivation"]
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def month_range(start, end):
+    months = []
+    month = month_start(start)
+    while month <= end:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def _per_member(amount, members):
+    if not members:
+        return Decimal("0")
+    return (amount / members).quantize(Decimal("0.01"))
+
+
+def current_subscriptions():
+    """Live MRR from active memberships at their plan's monthly price"""
+    from users.models import Membership
+
+    totals = Membership.objects.filter(status="active", plan__isnull=False).aggregate(
+        mrr=Sum("plan__price_monthly"), subscriptions=Count("id")
+    )
+    mrr = Decimal(totals["mrr"] or 0)
+    subscriptions = totals["subscriptions"]
+    return {
+        "mrr": mrr,
+        "arr": mrr * 12,
+        "subscriptions": subscriptions,
+        "arpu": _per_member(mrr, subscriptions),
+    }
+
+
+def compute_revenue(first_month, last_month):
+    """
+    Monthly revenue series for first_month..last_month (month starts)
+
+    Each month carries mrr, arr, the MRR movements, net_new_mrr,
+    paying_members, arpu, revenue and revenue_by_plan.
+    """
+    from payments.models import Payment
+
+    months = month_range(first_month, last_month)
+    end = timezone.make_aware(datetime.combine(add_months(last_month, 1), dt_time.min))
+
+    # Earlier history is included so a member's first-ever payment can be
+    # told apart from a return after a gap
+    rows = (
+        Payment.objects.filter(status="completed", completed_at__lt=end)
+        .annotate(month=TruncMonth("completed_at"))
+        .order_by()
+        .values_list("user_id", "month", "plan__name")
+        .annotate(total=Sum("amount"))
+    )
+
+    paid = defaultdict(lambda: defaultdict(Decimal))
+    by_plan = defaultdict(lambda: defaultdict(Decimal))
+    for user_id, month, plan, total in rows:
+        month = local_date(month)
+        paid[user_id][month] += total
+        if month >= months[0]:
+            by_plan[month][plan or "Unknown"] += total
+
+    series = {}
+    for month in months:
+        series[month] = {"mrr": Decimal("0"), "paying": 0}
+        series[month].update({movement: Decimal("0") for movement in MOVEMENTS})
+    for history in paid.values():
+        first_paid = min(history)
+        for month in months:
+            current = history.get(month, Decimal("0"))
+            previous = history.get(add_months(month, -1), Decimal("0"))
+            stats = series[month]
+            if current:
+                stats["mrr"] += current
+                stats["paying"] += 1
+            if current and not previous:
+                stats["new" if first_paid == month else "reactivation"] += current
+            elif current > previous:
+                stats["expansion"] += current - previous
+            elif current < previous:
+                stats["churned" if not current else "contraction"] += previous - current
+
+    results = []
+    for month in months:
+        stats = series[month]
+        mrr = stats["mrr"]
+        results.append(
+            {
+                "month": month.isoformat(),
+                "mrr": mrr,
+                "arr": mrr * 12,
+                "new_mrr": stats["new"],
+                "expansion_mrr": stats["expansion"],
+                "contraction_mrr": stats["contraction"],
+                "churned_mrr": stats["churned"],
+                "reactivation_mrr": stats["reactivation"],
+                "net_new_mrr": stats["new"]
+                + stats["expansion"]
+                + stats["reactivation"]
+                - stats["contraction"]
+                - stats["churned"],
+                "paying_members": stats["paying"],
+                "arpu": _per_member(mrr, stats["paying"]),
+                "revenue": sum(by_plan[month].values(), Decimal("0")),
+                "revenue_by_plan": dict(by_plan[month]),
+            }
+        )
+    return results
+
+
+def _generation():
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns(), timeout=None)
+        generation = cache.get(GENERATION_KEY, 0)
+    return generation
+
+
+def get_revenue(first_month, last_month):
+    """Cached revenue series plus live subscription figures"""
+    key = (
+        f"analytics:revenue:{first_month.isoformat()}:{last_month.isoformat()}:"
+        f"{_generation()}"
+    )
+    report = cache.get(key)
+    if report is None:
+        report = {
+            "months": compute_revenue(first_month, last_month),
+            "current": current_subscriptions(),
+        }
+        cache.set(key, report, timeout=settings.REVENUE_ANALYTICS_CACHE_TIMEOUT)
+    return report
+
+
+def invalidate_revenue():
+    """Drop cached revenue reports once the current transaction commits"""
+
+    def bump():
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            cache.set(GENERATION_KEY, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
@@ -0,0 +1,168 @@
+"""
+Daily metrics rollups
+
+Each metric group is recomputed for a date range with one grouped query and
+upserted into DailyMetrics. Signals call this for the single day a write
+touched; the rollup_daily_metrics command rebuilds whole ranges.
+"""
+
+from datetime import datetime, time, timedelta
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import DailyMetrics
+
+METRIC_GROUPS = {
+    "members": ["new_members"],
+    "vehicles": ["new_vehicles"],
+    "appointments": [
+        "appointments_scheduled",
+        "appointments_in_progress",
+        "appointments_completed",
+        "appointments_cancelled",
+    ],
+    "revenue": ["revenue", "payments_count"],
+}
+
+
+def _day_range(start, end):
+    """Aware datetimes covering the dates start..end inclusive"""
+    return (
+        timezone.make_aware(datetime.combine(start, time.min)),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+    )
+
+
+def local_date(value):
+    """Project-time-zone date of an aware datetime"""
+    if value is None:
+        return None
+    if timezone.is_naive(value):
+        return value.date()
+    return timezone.localdate(value)
+
+
+def _grouped_by_day(queryset, field, start, end, *group_by, **aggregates):
+    start_dt, end_dt = _day_range(start, end)
+    return (
+        queryset.filter(**{f"{field}__gte": start_dt, f"{field}__lt": end_dt})
+        .annotate(day=TruncDate(field))
+        .order_by()
+        .values("day", *group_by)
+        .annotate(**aggregates)
+    )
+
+
+def _collect(group, start, end):
+    """Return {date: {field: value}} for one metric group"""
+    from users.models import User
+    from vehicles.models import Vehicle
+    from appointments.models import Appointment
+    from payments.models import Payment
+
+    values = {}
+    if group == "members":
+        # Only accounts still active, so the running total is the active member
+        # count; deactivating a member re-rolls their signup day
+        rows = _grouped_by_day(
+            User.objects.filter(is_active=True, is_staff=False),
+            "created_at",
+            start,
+            end,
+            n=Count("id"),
+        )
+        for row in rows:
+            values[row["day"]] = {"new_members": row["n"]}
+    elif group == "vehicles":
+        rows = _grouped_by_day(
+            Vehicle.objects.all(), "created_at", start, end, n=Count("id")
+        )
+        for row in rows:
+            values[row["day"]] = {"new_vehicles": row["n"]}
+    elif group == "appointments":
+        rows = _grouped_by_day(
+            Appointment.objects.all(), "start_time", start, end, "status", n=Count("id")
+        )
+        for row in rows:
+            field = f"appointments_{row['status']}"
+            if field in METRIC_GROUPS["appointments"]:
+                values.setdefault(row["day"], {})[field] = row["n"]
+    elif group == "revenue":
+        rows = _grouped_by_day(
+            Payment.objects.filter(status="completed"),
+            "completed_at",
+            start,
+            end,
+            total=Sum("amount"),
+            n=Count("id"),
+        )
+        for row in rows:
+            values[row["day"]] = {"revenue": row["total"] or 0, "payments_count": row["n"]}
+    return values
+
+
+def rollup_range(start, end, groups=None):
+    """
+    Recompute metric groups for every date in start..end and upsert them
+
+    Dates without activity are written as zeros so deletes and status
+    changes are reflected exactly.
+    """
+    groups = groups or list(METRIC_GROUPS)
+    now = timezone.now()
+
+    rows = {}
+    day = start
+    while day <= end:
+        rows[day] = DailyMetrics(date=day, updated_at=now)
+        day += timedelta(days=1)
+
+    update_fields = ["updated_at"]
+    for group in groups:
+        update_fields.extend(METRIC_GROUPS[group])
+        for day, fields in _collect(group, start, end).items():
+            for field, value in fields.items():
+                setattr(rows[day], field, value)
+
+    DailyMetrics.objects.bulk_create(
+        rows.values(),
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=update_fields,
+        batch_size=500,
+    )
+    return len(rows)
+
+
+def snapshot_membership_tiers(day=None):
+    """Store today's active membership count per plan tier"""
+    from users.models import Membership
+
+    tiers = {}
+    rows = (
+        Membership.objects.filter(status="active")
+        .order_by()
+        .values("plan__tier")
+        .annotate(n=Count("id"))
+    )
+    for row in rows:
+        tier = row["plan__tier"] or "none"
+        tiers[tier] = tiers.get(tier, 0) + row["n"]
+
+    DailyMetrics.objects.update_or_create(
+        date=day or timezone.localdate(),
+        defaults={"membership_tiers": tiers, "updated_at": timezone.now()},
+    )
+    return tiers
+
+
+def refresh_day(group, day):
+    """Recompute one metric group for one day once the transaction commits"""
+    if day is None:
+        return
+    transaction.on_commit(lambda: rollup_range(day, day, [group]))
+
+
+def refresh_membership_tiers():
+    transaction.on_commit(snapshot_membership_tiers)
@@ -0,0 +1,73 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from appointments.models import Appointment
+from payments.models import Payment
+from users.models import Membership, Plan, User
+from vehicles.models import Vehicle
+from .revenue import invalidate_revenue
+from .rollups import local_date, refresh_day, refresh_membership_tiers
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    # Logins only touch last_login
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    refresh_day("members", local_date(instance.created_at))
+
+
+@receiver(post_save, sender=Vehicle)
+@receiver(post_delete, sender=Vehicle)
+def vehicle_changed(sender, instance, **kwargs):
+    if kwargs.get("created") is False:
+        return
+    refresh_day("vehicles", local_date(instance.created_at))
+
+
+@receiver(pre_save, sender=Appointment)
+def appointment_saving(sender, instance, **kwargs):
+    """Remember the previous day so a rescheduled appointment updates both"""
+    instance._metrics_previous_day = None
+    if instance._state.adding:
+        return
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and "start_time" not in update_fields:
+        return
+    previous = (
+        Appointment.objects.filter(pk=instance.pk)
+        .values_list("start_time", flat=True)
+        .first()
+    )
+    instance._metrics_previous_day = local_date(previous)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    day = local_date(instance.start_time)
+    refresh_day("appointments", day)
+    previous_day = getattr(instance, "_metrics_previous_day", None)
+    if previous_day and previous_day != day:
+        refresh_day("appointments", previous_day)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    refresh_day("revenue", local_date(instance.completed_at))
+    invalidate_revenue()
+
+
+@receiver(post_save, sender=Membership)
+@receiver(post_delete, sender=Membership)
+def membership_changed(sender, instance, **kwargs):
+    refresh_membership_tiers()
+    invalidate_revenue()
+
+
+@receiver(post_save, sender=Plan)
+@receiver(post_delete, sender=Plan)
+def plan_changed(sender, instance, **kwargs):
+    invalidate_revenue()
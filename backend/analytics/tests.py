@@ -0,0 +1,323 @@
+from io import StringIO
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Membership, Plan, User
+from vehicles.models import Vehicle
+from appointments.models import Appointment, Location
+from payments.models import Payment
+from .models import CohortRetention, DailyMetrics, MonthlyChurn
+
+
+class DailyMetricsRollupTest(TestCase):
+    def setUp(self):
+        self.today = timezone.localdate()
+        self.user = User.objects.create_user(
+            email="member@example.com",
+            password="testpass123",
+        )
+        self.location = Location.objects.create(name="Main Service Center")
+
+    def test_signals_keep_rollups_current(self):
+        """Test writes refresh the affected day once the transaction commits"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Vehicle.objects.create(user=self.user, make="Toyota", model="Camry")
+            appointment = Appointment.objects.create(
+                user=self.user,
+                location=self.location,
+                start_time=timezone.now(),
+            )
+
+        row = DailyMetrics.objects.get(date=self.today)
+        self.assertEqual(row.new_vehicles, 1)
+        self.assertEqual(row.appointments_scheduled, 1)
+
+        # Rescheduling moves the count to the new day
+        tomorrow = timezone.now() + timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.start_time = tomorrow
+            appointment.status = "completed"
+            appointment.save()
+
+        row.refresh_from_db()
+        self.assertEqual(row.appointments_scheduled, 0)
+        moved = DailyMetrics.objects.get(date=timezone.localdate(tomorrow))
+        self.assertEqual(moved.appointments_completed, 1)
+
+    def test_member_totals_count_active_accounts(self):
+        """Test deactivated and staff accounts drop out of the member count"""
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(email="second@example.com", password="pass")
+            User.objects.create_user(
+                email="staff@example.com", password="pass", is_staff=True
+            )
+        self.assertEqual(DailyMetrics.objects.get(date=self.today).new_members, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(DailyMetrics.objects.get(date=self.today).new_members, 1)
+
+    def test_command_rebuilds_history(self):
+        """Test the rollup command recomputes members, revenue and tiers"""
+        earlier = timezone.now() - timedelta(days=10)
+        User.objects.filter(pk=self.user.pk).update(created_at=earlier)
+        plan = Plan.objects.create(name="Premium", price_monthly=50, tier="premium")
+        Membership.objects.create(user=self.user, plan=plan)
+        Payment.objects.create(
+            user=self.user,
+            plan=plan,
+            amount=Decimal("49.99"),
+            status="completed",
+            completed_at=timezone.now(),
+        )
+        DailyMetrics.objects.all().delete()
+
+        call_command("rollup_daily_metrics", "--all", stdout=StringIO())
+
+        joined = DailyMetrics.objects.get(date=timezone.localdate(earlier))
+        self.assertEqual(joined.new_members, 1)
+        row = DailyMetrics.objects.get(date=self.today)
+        self.assertEqual(row.revenue, Decimal("49.99"))
+        self.assertEqual(row.payments_count, 1)
+        self.assertEqual(row.membership_tiers, {"premium": 1})
+
+
+class DashboardAnalyticsTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        today = timezone.localdate()
+        DailyMetrics.objects.create(
+            date=today,
+            new_members=3,
+            new_vehicles=2,
+            appointments_scheduled=4,
+            appointments_completed=1,
+            revenue=Decimal("120.00"),
+            payments_count=2,
+            membership_tiers={"premium": 2, "basic": 1},
+        )
+        DailyMetrics.objects.create(
+            date=today - timedelta(days=1),
+            appointments_scheduled=2,
+            revenue=Decimal("30.00"),
+        )
+
+    def test_dashboard_reads_rollups(self):
+        """Test the dashboard is served from rollups in a fixed number of queries"""
+        url = reverse("dashboard_analytics")
+        # Rollup totals, the last 7 days and monthly revenue
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["total_members"], 3)
+        self.assertEqual(data["total_vehicles"], 2)
+        self.assertEqual(data["appointments_today"], 5)
+        self.assertEqual(data["appointments_change"], 150.0)
+        self.assertEqual(len(data["revenue_chart"]), 6)
+        self.assertEqual(len(data["appointments_chart"]), 7)
+        self.assertEqual(data["appointments_chart"][-1]["scheduled"], 4)
+        self.assertEqual(
+            data["membership_tiers"],
+            [{"name": "Premium", "value": 2}, {"name": "Basic", "value": 1}],
+        )
+
+
+class RevenueAnalyticsTest(TestCase):
+    def setUp(self):
+        from analytics.revenue import add_months
+
+        cache.clear()
+        self.this_month = timezone.localdate().replace(day=1)
+        self.add_months = add_months
+        self.basic = Plan.objects.create(
+            name="Basic", price_monthly=59, tier="compact"
+        )
+        self.premium = Plan.objects.create(
+            name="Premium", price_monthly=99, tier="premium"
+        )
+        self.members = [
+            User.objects.create_user(
+                email=f"payer{i}@example.com", password="testpass123"
+            )
+            for i in range(4)
+        ]
+        self.intent = 0
+
+    def pay(self, member, plan, months_ago):
+        self.intent += 1
+        month = self.add_months(self.this_month, -months_ago)
+        Payment.objects.create(
+            user=member,
+            plan=plan,
+            amount=Decimal(plan.price_monthly),
+            status="completed",
+            stripe_payment_intent_id=f"pi_{self.intent}",
+            completed_at=timezone.make_aware(
+                datetime.combine(month.replace(day=10), time(12))
+            ),
+        )
+
+    def test_mrr_movements(self):
+        """Test MRR is split into new, expansion, churned and reactivated"""
+        from analytics.revenue import compute_revenue
+
+        a, b, c, d = self.members
+        # a: steady basic, b: upgrades, c: churns, d: returns after a gap
+        for months_ago in (3, 2, 1):
+            self.pay(a, self.basic, months_ago)
+        self.pay(b, self.basic, 2)
+        self.pay(b, self.premium, 1)
+        self.pay(c, self.basic, 2)
+        self.pay(d, self.basic, 3)
+        self.pay(d, self.basic, 1)
+
+        months = compute_revenue(
+            self.add_months(self.this_month, -2), self.add_months(self.this_month, -1)
+        )
+        first, last = months
+        self.assertEqual(first["mrr"], Decimal("177"))
+        self.assertEqual(first["new_mrr"], Decimal("118"))
+        self.assertEqual(first["churned_mrr"], Decimal("59"))
+        self.assertEqual(last["mrr"], Decimal("217"))
+        self.assertEqual(last["expansion_mrr"], Decimal("40"))
+        self.assertEqual(last["churned_mrr"], Decimal("59"))
+        self.assertEqual(last["reactivation_mrr"], Decimal("59"))
+        self.assertEqual(last["net_new_mrr"], Decimal("40"))
+        self.assertEqual(last["paying_members"], 3)
+        self.assertEqual(
+            last["revenue_by_plan"], {"Basic": Decimal("118"), "Premium": Decimal("99")}
+        )
+
+    def test_endpoint_is_cached_until_payments_change(self):
+        """Test revenue reports are served from cache and invalidated on writes"""
+        client = APIClient()
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        client.force_authenticate(user=admin)
+        Membership.objects.create(user=self.members[0], plan=self.premium)
+        Membership.objects.create(user=self.members[1], plan=self.basic)
+        self.pay(self.members[0], self.premium, 0)
+        url = reverse("revenue_analytics")
+
+        response = client.get(url, {"months": 3})
+        data = response.json()
+        self.assertEqual(data["monthly_recurring"], 158.0)
+        self.assertEqual(data["annual_recurring"], 1896.0)
+        self.assertEqual(data["average_per_member"], 79.0)
+        self.assertEqual(data["total_revenue"], 99.0)
+        self.assertEqual(len(data["months"]), 3)
+
+        with self.assertNumQueries(0):
+            client.get(url, {"months": 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pay(self.members[1], self.basic, 0)
+        self.assertEqual(client.get(url, {"months": 3}).json()["total_revenue"], 158.0)
+
+
+class CohortRetentionTest(TestCase):
+    def setUp(self):
+        from analytics.revenue import add_months
+
+        self.add_months = add_months
+        self.this_month = timezone.localdate().replace(day=1)
+        self.plan = Plan.objects.create(
+            name="Basic", price_monthly=59, tier="compact"
+        )
+
+    def at(self, months_ago, day=5):
+        month = self.add_months(self.this_month, -months_ago)
+        return timezone.make_aware(datetime.combine(month.replace(day=day), time(12)))
+
+    def member(self, email, signup_months_ago):
+        return User.objects.create_user(
+            email=email, password="testpass123", created_at=self.at(signup_months_ago)
+        )
+
+    def test_retention_matrix_and_churn(self):
+        """Test cohorts, churn and reactivation from memberships and payments"""
+        # Cohort three months ago: one stays, one cancels, one returns later
+        stays = self.member("stays@example.com", 3)
+        leaves = self.member("leaves@example.com", 3)
+        returns = self.member("returns@example.com", 3)
+        Membership.objects.create(user=stays, plan=self.plan, started_at=self.at(3))
+        Membership.objects.create(
+            user=leaves,
+            plan=self.plan,
+            status="cancelled",
+            started_at=self.at(3),
+            cancelled_at=self.at(2),
+        )
+        for months_ago, intent in ((3, "pi_a"), (1, "pi_b")):
+            Payment.objects.create(
+                user=returns,
+                plan=self.plan,
+                amount=Decimal("59"),
+                status="completed",
+                stripe_payment_intent_id=intent,
+                completed_at=self.at(months_ago),
+            )
+        # Cohort last month, never active
+        self.member("idle@example.com", 1)
+
+        call_command("rollup_cohorts", "--all", stdout=StringIO())
+
+        cohort = CohortRetention.objects.filter(cohort=self.at(3).date().replace(day=1))
+        self.assertEqual(
+            [(cell.cohort_size, cell.retained) for cell in cohort],
+            [(3, 3), (3, 2), (3, 2), (3, 1)],
+        )
+        self.assertEqual(
+            list(
+                CohortRetention.objects.filter(
+                    cohort=self.at(1).date().replace(day=1)
+                ).values_list("retained", flat=True)
+            ),
+            [0, 0],
+        )
+
+        churn = {row.month: row for row in MonthlyChurn.objects.all()}
+        two_ago = churn[self.add_months(self.this_month, -2)]
+        self.assertEqual(two_ago.churned_members, 1)
+        self.assertEqual(two_ago.churn_rate, 33.3)
+        one_ago = churn[self.add_months(self.this_month, -1)]
+        self.assertEqual(one_ago.reactivated_members, 1)
+        self.assertEqual(one_ago.churned_members, 1)
+
+    def test_member_analytics_reads_rollups(self):
+        """Test member analytics reports real 30-day activity and churn"""
+        client = APIClient()
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        client.force_authenticate(user=admin)
+        self.member("quiet@example.com", 2)
+        # Logging in is activity
+        self.member("busy@example.com", 2)
+        APIClient().post(
+            reverse("login"),
+            {"email": "busy@example.com", "password": "testpass123"},
+            format="json",
+        )
+
+        call_command("rollup_cohorts", stdout=StringIO())
+        data = client.get(reverse("member_analytics")).json()
+        self.assertEqual(data["total"], 2)
+        self.assertEqual(data["active_30_days"], 1)
+        self.assertEqual(data["churn_rate"], 0)
+        self.assertEqual(len(data["churn"]), 2)
@@ -0,0 +1,124 @@
+"""
+Appointment availability computation with per-(location, date) caching
+
+Computed slots are cached under a generation key. Any change to an
+appointment at a location/date bumps that generation, so readers never see
+stale slots - even when a read races with a booking, the stale result is
+written under the old generation and is never read again.
+"""
+
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from .models import Appointment
+
+SLOT_MINUTES = 30
+OPENING_HOUR = 8
+CLOSING_HOUR = 18
+
+# Appointments in these states occupy a slot
+BLOCKING_STATUSES = ["scheduled", "in_progress"]
+
+
+def _generation_key(location_id, date):
+    return f"appointments:availability:gen:{location_id}:{date.isoformat()}"
+
+
+def _slots_key(location_id, date, generation):
+    return f"appointments:availability:{location_id}:{date.isoformat()}:{generation}"
+
+
+def _get_generation(location_id, date):
+    """Return the current cache generation for a location/date"""
+    key = _generation_key(location_id, date)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock so a generation lost to eviction can never
+        # come back with a value that old slot entries were stored under
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key, 0)
+    return generation
+
+
+def compute_available_slots(location, date):
+    """Compute free 30-minute slots between opening and closing for a day"""
+    start_of_day = timezone.make_aware(datetime.combine(date, datetime.min.time()))
+    end_of_day = start_of_day + timedelta(days=1)
+
+    # One query for the whole day instead of one per slot
+    booked = list(
+        Appointment.objects.filter(
+            location=location,
+            start_time__gte=start_of_day,
+            start_time__lt=end_of_day,
+            status__in=BLOCKING_STATUSES,
+            end_time__isnull=False,
+        ).values_list("start_time", "end_time")
+    )
+
+    available_slots = []
+    current_time = start_of_day.replace(hour=OPENING_HOUR, minute=0)
+    end_time = start_of_day.replace(hour=CLOSING_HOUR, minute=0)
+
+    while current_time < end_time:
+        slot_end = current_time + timedelta(minutes=SLOT_MINUTES)
+        conflict = any(
+            booked_start < slot_end and booked_end > current_time
+            for booked_start, booked_end in booked
+        )
+
+        if not conflict:
+            available_slots.append(
+                {
+                    "start": current_time.isoformat(),
+                    "end": slot_end.isoformat(),
+                }
+            )
+
+        current_time = slot_end
+
+    return available_slots
+
+
+def get_available_slots(location, date):
+    """Return available slots for a location/date, served from cache when possible"""
+    generation = _get_generation(location.id, date)
+    key = _slots_key(location.id, date, generation)
+
+    slots = cache.get(key)
+    if slots is None:
+        slots = compute_available_slots(location, date)
+        cache.set(
+            key, slots, timeout=getattr(settings, "AVAILABILITY_CACHE_TIMEOUT", 300)
+        )
+    return slots
+
+
+def invalidate_availability(location_id, start_time):
+    """
+    Invalidate cached availability for the location/day containing start_time
+
+    Runs after the current transaction commits so a concurrent reader cannot
+    repopulate the cache from uncommitted state.
+    """
+    if not location_id or not start_time:
+        return
+
+    date = timezone.localtime(start_time).date()
+    key = _generation_key(location_id, date)
+
+    def bump():
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def invalidate_appointment_availability(appointment):
+    """Invalidate cached availability affected by an appointment"""
+    invalidate_availability(appointment.location_id, appointment.start_time)
@@ -0,0 +1,156 @@
+"""
+iCalendar (RFC 5545) rendering for appointment feeds
+
+Feeds are streamed row by row from a values() query so memory stays flat no
+matter how many appointments a location has.
+"""
+
+import hashlib
+from datetime import timedelta, timezone as dt_timezone
+from django.db.models import Count, Max
+from django.utils import timezone
+from .models import Appointment
+
+# Past appointments older than this are left out of feeds
+FEED_HISTORY = timedelta(days=90)
+DEFAULT_DURATION = timedelta(hours=1)
+
+FEED_FIELDS = (
+    "id",
+    "start_time",
+    "end_time",
+    "services",
+    "status",
+    "notes",
+    "updated_at",
+    "user__name",
+    "user__email",
+    "location__name",
+    "location__address",
+    "vehicle__year",
+    "vehicle__make",
+    "vehicle__model",
+)
+
+ICAL_STATUS = {
+    "scheduled": "CONFIRMED",
+    "in_progress": "CONFIRMED",
+    "completed": "CONFIRMED",
+    "cancelled": "CANCELLED",
+}
+
+
+def feed_appointments(feed):
+    """Appointments visible in a calendar feed"""
+    appointments = Appointment.objects.filter(
+        start_time__gte=timezone.now() - FEED_HISTORY
+    )
+    if feed.location_id:
+        return appointments.filter(location_id=feed.location_id)
+    return appointments.filter(user_id=feed.user_id)
+
+
+def feed_etag(feed):
+    """Strong ETag that changes whenever an appointment in the feed changes"""
+    state = feed_appointments(feed).aggregate(
+        latest=Max("updated_at"), count=Count("id")
+    )
+    latest = state["latest"].isoformat() if state["latest"] else ""
+    digest = hashlib.sha256(f"{feed.token}:{latest}:{state['count']}".encode())
+    return digest.hexdigest()[:32]
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _fold(line):
+    """Fold content lines longer than 75 octets"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+
+    parts = []
+    while encoded:
+        limit = 75 if not parts else 74
+        cut = min(limit, len(encoded))
+        # Don't split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode("utf-8"))
+        encoded = encoded[cut:]
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def render_event(row, include_member):
+    """Render one appointment row from FEED_FIELDS as a VEVENT"""
+    start = row["start_time"]
+    end = row["end_time"] or start + DEFAULT_DURATION
+    service = ", ".join(row["services"]) if row["services"] else "Service"
+    vehicle = " ".join(
+        str(part)
+        for part in (row["vehicle__year"], row["vehicle__make"], row["vehicle__model"])
+        if part
+    )
+
+    description = []
+    if include_member:
+        description.append(f"Member: {row['user__name'] or row['user__email']}")
+    if vehicle:
+        description.append(f"Vehicle: {vehicle}")
+    if row["notes"]:
+        description.append(row["notes"])
+
+    lines = [
+        "BEGIN:VEVENT",
+        f"UID:{row['id']}@membershipauto.com",
+        f"DTSTAMP:{_format_datetime(row['updated_at'])}",
+        f"LAST-MODIFIED:{_format_datetime(row['updated_at'])}",
+        f"DTSTART:{_format_datetime(start)}",
+        f"DTEND:{_format_datetime(end)}",
+        f"SUMMARY:{_escape(service)}",
+        f"STATUS:{ICAL_STATUS.get(row['status'], 'CONFIRMED')}",
+    ]
+    if row["location__name"]:
+        location = row["location__name"]
+        if row["location__address"]:
+            location = f"{location}, {row['location__address']}"
+        lines.append(f"LOCATION:{_escape(location)}")
+    if description:
+        lines.append(f"DESCRIPTION:{_escape(chr(10).join(description))}")
+    lines.append("END:VEVENT")
+    return "".join(_fold(line) for line in lines)
+
+
+def stream_feed(feed, name):
+    """Yield an iCalendar document for a feed, one event at a time"""
+    yield "".join(
+        _fold(line)
+        for line in (
+            "BEGIN:VCALENDAR",
+            "VERSION:2.0",
+            "PRODID:-//Membership Auto//Appointments//EN",
+            "CALSCALE:GREGORIAN",
+            "METHOD:PUBLISH",
+            f"X-WR-CALNAME:{_escape(name)}",
+            "X-PUBLISHED-TTL:PT15M",
+        )
+    )
+
+    rows = feed_appointments(feed).order_by("start_time").values(*FEED_FIELDS)
+    include_member = bool(feed.location_id)
+    for row in rows.iterator(chunk_size=500):
+        yield render_event(row, include_member)
+
+    yield "END:VCALENDAR\r\n"
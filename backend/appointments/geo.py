@@ -0,0 +1,214 @@
+"""
+In-process spatial index over service locations
+
+Locations are stored in a 3-D KD-tree of unit vectors, so straight-line
+(chord) distance orders points exactly like great-circle distance and
+k-nearest / radius lookups need no full scan. Each process keeps its own
+index and rebuilds it when the shared version in the Django cache changes,
+which happens whenever a Location is saved or deleted.
+"""
+
+import heapq
+import itertools
+import math
+import threading
+import uuid
+from django.core.cache import cache
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_RADIUS_KM = 50
+
+INDEX_VERSION_KEY = "appointments:location_index:version"
+
+
+def to_unit_vector(lat, lng):
+    """Convert latitude/longitude in degrees to a point on the unit sphere"""
+    phi = math.radians(float(lat))
+    lam = math.radians(float(lng))
+    return (
+        math.cos(phi) * math.cos(lam),
+        math.cos(phi) * math.sin(lam),
+        math.sin(phi),
+    )
+
+
+def chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+def km_to_chord(km):
+    return 2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)
+
+
+def parse_coordinates(query_params):
+    """
+    Read lat/lng from query params
+
+    Returns:
+        (lat, lng) tuple, or None if either is missing
+
+    Raises:
+        ValueError: if the values are not valid coordinates
+    """
+    lat = query_params.get("lat")
+    lng = query_params.get("lng")
+    if lat in (None, "") or lng in (None, ""):
+        return None
+
+    lat, lng = float(lat), float(lng)
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("Coordinates out of range")
+    return lat, lng
+
+
+class KDTree:
+    """Static 3-D KD-tree supporting k-nearest and radius queries"""
+
+    def __init__(self, points):
+        """
+        Args:
+            points: iterable of (xyz_tuple, item) pairs
+        """
+        self.size = 0
+        self.root = self._build(list(points), 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        self.size += 1
+        return (
+            points[mid][0],
+            points[mid][1],
+            axis,
+            self._build(points[:mid], depth + 1),
+            self._build(points[mid + 1 :], depth + 1),
+        )
+
+    @staticmethod
+    def _dist2(a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+    def nearest(self, target, k, max_dist=None):
+        """Return up to k (chord_distance, item) pairs ordered nearest first"""
+        if k <= 0 or self.root is None:
+            return []
+
+        limit2 = max_dist**2 if max_dist is not None else math.inf
+        heap = []  # max-heap via negated distances
+        counter = itertools.count()
+
+        def visit(node):
+            if node is None:
+                return
+            point, item, axis, left, right = node
+            d2 = self._dist2(point, target)
+            if d2 <= limit2:
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d2, next(counter), item))
+                elif d2 < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d2, next(counter), item))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            worst = -heap[0][0] if len(heap) == k else limit2
+            if diff * diff <= worst:
+                visit(far)
+
+        visit(self.root)
+        return [(math.sqrt(-d2), item) for d2, _, item in sorted(heap, reverse=True)]
+
+    def within(self, target, max_dist):
+        """Return (chord_distance, item) pairs within max_dist, nearest first"""
+        limit2 = max_dist**2
+        found = []
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            point, item, axis, left, right = node
+            d2 = self._dist2(point, target)
+            if d2 <= limit2:
+                found.append((math.sqrt(d2), item))
+            diff = target[axis] - point[axis]
+            if diff <= 0 or diff * diff <= limit2:
+                stack.append(left)
+            if diff >= 0 or diff * diff <= limit2:
+                stack.append(right)
+        found.sort(key=lambda pair: pair[0])
+        return found
+
+
+class LocationIndex:
+    """Nearest-location lookups over all locations that have coordinates"""
+
+    def __init__(self, rows):
+        """
+        Args:
+            rows: iterable of (location_id, lat, lng)
+        """
+        self.tree = KDTree(
+            (to_unit_vector(lat, lng), location_id)
+            for location_id, lat, lng in rows
+            if lat is not None and lng is not None
+        )
+
+    def __len__(self):
+        return self.tree.size
+
+    def nearest(self, lat, lng, k=None, radius_km=None):
+        """
+        Return [(location_id, distance_km)] ordered by distance
+
+        Args:
+            k: maximum number of results (all indexed locations if None)
+            radius_km: only include locations within this distance
+        """
+        target = to_unit_vector(lat, lng)
+        max_dist = km_to_chord(radius_km) if radius_km is not None else None
+        if k is None:
+            if max_dist is not None:
+                results = self.tree.within(target, max_dist)
+            else:
+                results = self.tree.nearest(target, len(self))
+        else:
+            results = self.tree.nearest(target, k, max_dist)
+        return [(location_id, chord_to_km(chord)) for chord, location_id in results]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_location_index():
+    """Return this process's location index, rebuilding it if it is stale"""
+    global _index, _index_version
+    from .models import Location
+
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        # Seed a fresh version so an evicted key can't match an old index
+        cache.add(INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
+        version = cache.get(INDEX_VERSION_KEY)
+
+    if _index is not None and _index_version == version:
+        return _index
+
+    with _index_lock:
+        if _index is None or _index_version != version:
+            rows = Location.objects.filter(
+                lat__isnull=False, lng__isnull=False
+            ).values_list("id", "lat", "lng")
+            _index = LocationIndex(rows)
+            _index_version = version
+    return _index
+
+
+def invalidate_location_index():
+    """Mark every process's location index as stale"""
+    cache.set(INDEX_VERSION_KEY, uuid.uuid4().hex, timeout=None)
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0002_appointment_notes_appointment_service_schedule"),
+        ("services", "0001_initial"),
+        ("vehicles", "0002_vehicle_photo_url"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="appointment",
+            name="reminder_sent_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="appointment",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["start_time"], name="appointment_start_t_acd4ae_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["updated_at"], name="appointment_updated_263af2_idx"),
+        ),
+    ]
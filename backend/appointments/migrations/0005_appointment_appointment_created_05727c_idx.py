@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:20
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0004_calendarfeed"),
+        ("services", "0001_initial"),
+        ("vehicles", "0003_vehicle_vehicles_created_175451_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="appointment",
+            index=models.Index(fields=["created_at", "id"], name="appointment_created_05727c_idx"),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicate_feeds(apps, schema_editor):
+    CalendarFeed = apps.get_model("appointments", "CalendarFeed")
+
+    # Keep the oldest feed per member or location; its URL is the one shared
+    seen = set()
+    duplicates = []
+    for feed in CalendarFeed.objects.order_by("created_at", "id").iterator():
+        owner = ("location", feed.location_id) if feed.location_id else (
+            "user",
+            feed.user_id,
+        )
+        if owner in seen:
+            duplicates.append(feed.pk)
+        seen.add(owner)
+    CalendarFeed.objects.filter(pk__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("appointments", "0005_appointment_appointment_created_05727c_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_feeds, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="calendarfeed",
+            constraint=models.UniqueConstraint(condition=models.Q(("location__isnull", True)), fields=("user",), name="calendar_feeds_one_per_member"),
+        ),
+        migrations.AddConstraint(
+            model_name="calendarfeed",
+            constraint=models.UniqueConstraint(condition=models.Q(("location__isnull", False)), fields=("location",), name="calendar_feeds_one_per_location"),
+        ),
+    ]
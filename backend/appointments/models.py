@@ -56,10 +56,70 @@ class Appointment(models.Model):
     services = models.JSONField(default=list, blank=True)
     status = models.TextField(choices=STATUS_CHOICES, default="scheduled")
     notes = models.TextField(blank=True, null=True)
+    reminder_sent_at = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = "appointments"
+        indexes = [
+            models.Index(fields=["start_time"]),
+            models.Index(fields=["updated_at"]),
+            models.Index(fields=["created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"Appointment for {self.user.email} at {self.start_time}"
+
+
+def generate_feed_token():
+    """Generate an unguessable calendar feed token"""
+    import secrets
+
+    return secrets.token_urlsafe(32)
+
+
+class CalendarFeed(models.Model):
+    """Read-only iCalendar feed of a member's or a location's appointments"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    token = models.CharField(max_length=64, unique=True, default=generate_feed_token)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="calendar_feeds",
+        null=True,
+        blank=True,
+    )
+    location = models.ForeignKey(
+        Location,
+        on_delete=models.CASCADE,
+        related_name="calendar_feeds",
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = "calendar_feeds"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user"],
+                condition=models.Q(location__isnull=True),
+                name="calendar_feeds_one_per_member",
+            ),
+            models.UniqueConstraint(
+                fields=["location"],
+                condition=models.Q(location__isnull=False),
+                name="calendar_feeds_one_per_location",
+            ),
+        ]
+
+    def __str__(self):
+        owner = self.location.name if self.location else self.user.email
+        return f"Calendar feed for {owner}"
+
+    def rotate_token(self):
+        """Replace the token, invalidating any previously shared URL"""
+        self.token = generate_feed_token()
+        self.save(update_fields=["token"])
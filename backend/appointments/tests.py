@@ -1,12 +1,15 @@
-from django.test import TestCase
+from django.db import IntegrityError, transaction
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 from users.models import User
 from vehicles.models import Vehicle
-from .models import Appointment, Location
+from .models import Appointment, CalendarFeed, Location
+from .views import calendar_feed
 from datetime import datetime, timedelta
 from django.utils import timezone
+from django.core.cache import cache
 
 
 class AppointmentAPITest(TestCase):
@@ -100,3 +103,274 @@ class AppointmentAPITest(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 2)
+
+
+class AppointmentAvailabilityCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="availability@example.com",
+            password="testpass123",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.vehicle = Vehicle.objects.create(
+            user=self.user,
+            make="Toyota",
+            model="Camry",
+            year=2021,
+        )
+        self.location = Location.objects.create(name="Downtown Service Center")
+        self.date = (timezone.now() + timedelta(days=7)).date()
+        self.slot_start = timezone.make_aware(
+            datetime.combine(self.date, datetime.min.time())
+        ).replace(hour=10)
+
+    def get_slots(self):
+        url = reverse("appointment-availability")
+        response = self.client.get(
+            url,
+            {"locationId": str(self.location.id), "date": self.date.isoformat()},
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [slot["start"] for slot in response.data["availableSlots"]]
+
+    def test_repeat_reads_hit_cache(self):
+        """Test repeat availability reads skip the appointments query"""
+        self.get_slots()
+
+        # Only the location lookup remains
+        with self.assertNumQueries(1):
+            slots = self.get_slots()
+
+        self.assertEqual(len(slots), 20)
+
+    def test_booking_invalidates_cache(self):
+        """Test booking removes the slot from cached availability"""
+        self.assertIn(self.slot_start.isoformat(), self.get_slots())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("appointment-book"),
+                {
+                    "vehicleId": str(self.vehicle.id),
+                    "locationId": str(self.location.id),
+                    "startTime": self.slot_start.isoformat(),
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        self.assertNotIn(self.slot_start.isoformat(), self.get_slots())
+
+    def test_cancel_invalidates_cache(self):
+        """Test cancelling an appointment frees its slot in cached availability"""
+        appointment = Appointment.objects.create(
+            user=self.user,
+            vehicle=self.vehicle,
+            location=self.location,
+            start_time=self.slot_start,
+            end_time=self.slot_start + timedelta(hours=1),
+            status="scheduled",
+        )
+        self.assertNotIn(self.slot_start.isoformat(), self.get_slots())
+
+        url = reverse("appointment-detail", kwargs={"appointment_id": appointment.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(url)
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+        self.assertIn(self.slot_start.isoformat(), self.get_slots())
+
+
+class LocationSpatialIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="nearest@example.com",
+            password="testpass123",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.manhattan = Location.objects.create(
+            name="Manhattan", lat=40.7831, lng=-73.9712
+        )
+        self.newark = Location.objects.create(name="Newark", lat=40.7357, lng=-74.1724)
+        self.boston = Location.objects.create(name="Boston", lat=42.3601, lng=-71.0589)
+        self.unmapped = Location.objects.create(name="Aardvark Auto")
+
+    def test_nearest_locations(self):
+        """Test nearest lookup orders by distance and honours the radius"""
+        url = reverse("location-nearest")
+        response = self.client.get(url, {"lat": 40.7128, "lng": -74.0060, "limit": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["name"] for item in response.data], ["Manhattan", "Newark"]
+        )
+        self.assertLess(response.data[0]["distance_km"], 10)
+
+        response = self.client.get(url, {"lat": 40.7128, "lng": -74.0060, "radius": 5})
+        self.assertEqual(response.data, [])
+
+    def test_nearest_requires_coordinates(self):
+        """Test nearest lookup without lat/lng"""
+        response = self.client.get(reverse("location-nearest"))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_list_sorted_by_distance(self):
+        """Test location list sorts by distance when lat/lng are given"""
+        url = reverse("location-list")
+        response = self.client.get(url, {"lat": 42.35, "lng": -71.06})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [item["name"] for item in response.data],
+            ["Boston", "Manhattan", "Newark", "Aardvark Auto"],
+        )
+        self.assertIsNone(response.data[-1]["distance_km"])
+
+    def test_index_rebuilt_on_location_change(self):
+        """Test the index picks up new and moved locations"""
+        url = reverse("location-nearest")
+        params = {"lat": 41.8240, "lng": -71.4128, "limit": 1}
+        self.assertEqual(self.client.get(url, params).data[0]["name"], "Boston")
+
+        Location.objects.create(name="Providence", lat=41.8240, lng=-71.4128)
+        self.assertEqual(self.client.get(url, params).data[0]["name"], "Providence")
+
+        self.boston.lat, self.boston.lng = 41.83, -71.41
+        self.boston.save()
+        Location.objects.filter(name="Providence").delete()
+        self.assertEqual(self.client.get(url, params).data[0]["name"], "Boston")
+
+    def test_kd_tree_matches_brute_force(self):
+        """Test k-nearest results match a linear scan"""
+        import random
+        from .geo import LocationIndex, chord_to_km, to_unit_vector
+
+        rng = random.Random(7)
+        rows = [
+            (i, rng.uniform(-60, 60), rng.uniform(-180, 180)) for i in range(500)
+        ]
+        index = LocationIndex(rows)
+
+        def distance(lat, lng, row):
+            a, b = to_unit_vector(lat, lng), to_unit_vector(row[1], row[2])
+            return chord_to_km(sum((x - y) ** 2 for x, y in zip(a, b)) ** 0.5)
+
+        for _ in range(20):
+            lat, lng = rng.uniform(-60, 60), rng.uniform(-180, 180)
+            expected = sorted(rows, key=lambda row: distance(lat, lng, row))
+            found = index.nearest(lat, lng, k=5)
+            self.assertEqual([i for i, _ in found], [row[0] for row in expected[:5]])
+
+            within = index.nearest(lat, lng, radius_km=1500)
+            self.assertEqual(
+                {i for i, _ in within},
+                {row[0] for row in rows if distance(lat, lng, row) <= 1500},
+            )
+
+
+class AppointmentCalendarFeedTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            email="calendar@example.com",
+            password="testpass123",
+            name="Casey Calendar",
+        )
+        self.client.force_authenticate(user=self.user)
+
+        self.vehicle = Vehicle.objects.create(
+            user=self.user, make="Ford", model="F-150", year=2019
+        )
+        self.location = Location.objects.create(
+            name="Uptown Service Center", address="1 Main St, Springfield"
+        )
+        self.appointment = Appointment.objects.create(
+            user=self.user,
+            vehicle=self.vehicle,
+            location=self.location,
+            start_time=timezone.now() + timedelta(days=3),
+            services=["oil_change", "tire_rotation"],
+        )
+
+    def get_feed_url(self):
+        response = self.client.get(reverse("appointment-calendar"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data["url"]
+
+    def test_member_feed(self):
+        """Test the member feed streams one VEVENT per appointment"""
+        client = APIClient()
+        response = client.get(self.get_feed_url())
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertEqual(body.count("BEGIN:VEVENT"), 1)
+        self.assertIn(f"UID:{self.appointment.id}@membershipauto.com", body)
+        self.assertIn("SUMMARY:oil_change\\, tire_rotation", body)
+        self.assertIn("LOCATION:Uptown Service Center\\, 1 Main St\\, Springfield", body)
+        self.assertIn('"', response["ETag"])
+
+    def test_etag_not_modified_until_appointment_changes(self):
+        """Test polls with a matching ETag get 304 until an appointment changes"""
+        client = APIClient()
+        url = self.get_feed_url()
+        etag = client.get(url)["ETag"]
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self.appointment.status = "cancelled"
+        self.appointment.save()
+
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn("STATUS:CANCELLED", b"".join(response.streaming_content).decode())
+
+    def test_asgi_feed_streams_without_buffering(self):
+        """Test feeds served over ASGI hand Django an async iterator"""
+        self.get_feed_url()
+        token = CalendarFeed.objects.get(user=self.user).token
+        request = RequestFactory().get("/")
+        request.scope = {"type": "http"}
+
+        response = calendar_feed(request, token=token)
+
+        self.assertTrue(response.is_async)
+
+    def test_one_feed_per_member(self):
+        """Test the database refuses a second feed for the same member"""
+        self.get_feed_url()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CalendarFeed.objects.create(user=self.user)
+
+    def test_rotated_token_revokes_old_url(self):
+        """Test rotating the token makes the old feed URL return 404"""
+        old_url = self.get_feed_url()
+        response = self.client.post(reverse("appointment-calendar"))
+        self.assertNotEqual(response.data["url"], old_url)
+
+        self.assertEqual(APIClient().get(old_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_location_feed(self):
+        """Test staff can share a location feed that includes member details"""
+        staff = User.objects.create_user(
+            email="manager@example.com", password="testpass123", is_staff=True
+        )
+        self.client.force_authenticate(user=staff)
+        response = self.client.get(
+            reverse("location_calendar", kwargs={"location_id": self.location.id})
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        feed = APIClient().get(response.json()["url"])
+        body = b"".join(feed.streaming_content).decode()
+        self.assertIn("Member: Casey Calendar", body)
+        self.assertIn("X-WR-CALNAME:Membership Auto - Uptown Service Center", body)
@@ -5,7 +5,10 @@ from .views import (
     AppointmentListView,
     AppointmentDetailView,
     LocationListView,
+    LocationNearestView,
     LocationDetailView,
+    AppointmentCalendarView,
+    calendar_feed,
 )
 
 urlpatterns = [
@@ -16,12 +19,27 @@ urlpatterns = [
     ),
     path("book/", AppointmentBookView.as_view(), name="appointment-book"),
     path("upcoming/", AppointmentListView.as_view(), name="appointment-list"),
+    path(
+        "calendar/",
+        AppointmentCalendarView.as_view(),
+        name="appointment-calendar",
+    ),
+    path(
+        "calendar/<str:token>.ics",
+        calendar_feed,
+        name="appointment-calendar-feed",
+    ),
     path(
         "<uuid:appointment_id>/",
         AppointmentDetailView.as_view(),
         name="appointment-detail",
     ),
     path("locations/", LocationListView.as_view(), name="location-list"),
+    path(
+        "locations/nearest/",
+        LocationNearestView.as_view(),
+        name="location-nearest",
+    ),
     path(
         "locations/<uuid:location_id>/",
         LocationDetailView.as_view(),
@@ -2,10 +2,17 @@ from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.http import condition, require_GET
 from datetime import datetime, timedelta
-from .models import Appointment, Location
+from .models import Appointment, CalendarFeed, Location
+from .availability import get_available_slots, invalidate_appointment_availability
+from .calendar import feed_etag, stream_feed
+from .geo import get_location_index, parse_coordinates
 from .serializers import AppointmentSerializer, LocationSerializer
+from users.exports import aiter_chunks, chunked
 from vehicles.models import Vehicle
 
 
@@ -40,39 +47,7 @@ class AppointmentAvailabilityView(APIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Get existing appointments for the date
-        start_of_day = timezone.make_aware(datetime.combine(date, datetime.min.time()))
-        end_of_day = start_of_day + timedelta(days=1)
-
-        existing_appointments = Appointment.objects.filter(
-            location=location,
-            start_time__gte=start_of_day,
-            start_time__lt=end_of_day,
-            status__in=["scheduled", "in_progress"],
-        )
-
-        # Generate available time slots (every 30 minutes from 8 AM to 6 PM)
-        available_slots = []
-        current_time = start_of_day.replace(hour=8, minute=0)
-        end_time = start_of_day.replace(hour=18, minute=0)
-
-        while current_time < end_time:
-            slot_end = current_time + timedelta(minutes=30)
-            # Check if this slot conflicts with existing appointments
-            conflict = existing_appointments.filter(
-                start_time__lt=slot_end,
-                end_time__gt=current_time,
-            ).exists()
-
-            if not conflict:
-                available_slots.append(
-                    {
-                        "start": current_time.isoformat(),
-                        "end": slot_end.isoformat(),
-                    }
-                )
-
-            current_time += timedelta(minutes=30)
+        available_slots = get_available_slots(location, date)
 
         return Response({"availableSlots": available_slots}, status=status.HTTP_200_OK)
 
@@ -152,6 +127,7 @@ class AppointmentBookView(APIView):
             services=services,
             status="scheduled",
         )
+        invalidate_appointment_availability(appointment)
 
         serializer = AppointmentSerializer(appointment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -193,6 +169,7 @@ class AppointmentDetailView(APIView):
             # Cancel the appointment
             appointment.status = "cancelled"
             appointment.save()
+            invalidate_appointment_availability(appointment)
 
             return Response(status=status.HTTP_204_NO_CONTENT)
         except Appointment.DoesNotExist:
@@ -206,10 +183,71 @@ class LocationListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        """List all service locations"""
+        """List all service locations, nearest first when lat/lng are given"""
+        try:
+            coordinates = parse_coordinates(request.query_params)
+        except ValueError:
+            return Response(
+                {"error": "Invalid lat/lng"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         locations = Location.objects.all().order_by("name")
-        serializer = LocationSerializer(locations, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if not coordinates:
+            serializer = LocationSerializer(locations, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        distances = dict(get_location_index().nearest(*coordinates))
+        # Locations without coordinates keep name order after the ranked ones
+        ranked = sorted(
+            locations,
+            key=lambda loc: (loc.id not in distances, distances.get(loc.id, 0)),
+        )
+        data = LocationSerializer(ranked, many=True).data
+        for item, location in zip(data, ranked):
+            item["distance_km"] = (
+                round(distances[location.id], 2) if location.id in distances else None
+            )
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class LocationNearestView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Find the nearest service locations to a point"""
+        try:
+            coordinates = parse_coordinates(request.query_params)
+            limit = int(request.query_params.get("limit", 5))
+            radius = request.query_params.get("radius")
+            radius_km = float(radius) if radius else None
+        except ValueError:
+            return Response(
+                {"error": "Invalid lat, lng, limit or radius"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        if not coordinates:
+            return Response(
+                {"error": "lat and lng are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        nearest = get_location_index().nearest(
+            *coordinates, k=max(1, min(limit, 50)), radius_km=radius_km
+        )
+        locations = Location.objects.in_bulk([location_id for location_id, _ in nearest])
+
+        results = []
+        for location_id, distance_km in nearest:
+            # Skip locations deleted since the index was built
+            if location_id not in locations:
+                continue
+            item = LocationSerializer(locations[location_id]).data
+            item["distance_km"] = round(distance_km, 2)
+            results.append(item)
+
+        return Response(results, status=status.HTTP_200_OK)
 
 
 class LocationDetailView(APIView):
@@ -226,3 +264,75 @@ class LocationDetailView(APIView):
                 {"error": "Location not found"},
                 status=status.HTTP_404_NOT_FOUND,
             )
+
+
+def calendar_feed_payload(request, feed):
+    """Response body describing a calendar feed subscription"""
+    url = request.build_absolute_uri(
+        reverse("appointment-calendar-feed", kwargs={"token": feed.token})
+    )
+    return {
+        "token": feed.token,
+        "url": url,
+        "webcalUrl": url.replace("https://", "webcal://").replace("http://", "webcal://"),
+    }
+
+
+class AppointmentCalendarView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """Get (or create) the user's appointment calendar feed"""
+        feed, _ = CalendarFeed.objects.get_or_create(
+            user=request.user, location__isnull=True
+        )
+        return Response(calendar_feed_payload(request, feed), status=status.HTTP_200_OK)
+
+    def post(self, request):
+        """Rotate the user's calendar feed token, revoking the old URL"""
+        feed, created = CalendarFeed.objects.get_or_create(
+            user=request.user, location__isnull=True
+        )
+        if not created:
+            feed.rotate_token()
+        return Response(calendar_feed_payload(request, feed), status=status.HTTP_200_OK)
+
+
+def _calendar_feed_etag(request, token):
+    feed = CalendarFeed.objects.filter(token=token).first()
+    return feed_etag(feed) if feed else None
+
+
+@require_GET
+@condition(etag_func=_calendar_feed_etag)
+def calendar_feed(request, token):
+    """
+    Public iCalendar feed for calendar apps
+
+    Authenticated by the unguessable token in the URL. Polls with a matching
+    If-None-Match get a 304 after a single aggregate query.
+    """
+    feed = (
+        CalendarFeed.objects.select_related("user", "location")
+        .filter(token=token)
+        .first()
+    )
+    if not feed:
+        raise Http404("Calendar feed not found")
+
+    name = (
+        f"Membership Auto - {feed.location.name}"
+        if feed.location
+        else "Membership Auto Appointments"
+    )
+    chunks = chunked(stream_feed(feed, name))
+    if getattr(request, "scope", None) is not None:
+        # Served over ASGI (daphne)
+        chunks = aiter_chunks(chunks)
+
+    response = StreamingHttpResponse(
+        chunks, content_type="text/calendar; charset=utf-8"
+    )
+    response["Content-Disposition"] = 'inline; filename="appointments.ics"'
+    response["Cache-Control"] = "private, no-cache"
+    return response
@@ -0,0 +1,156 @@
+"""
+JWT authentication for chat sockets with a cached identity
+
+Mobile clients reconnect every time they change networks, and after a
+deploy every socket reconnects at once. The access token in ?token= is
+verified in the event loop (it is only an HMAC check), and the user it
+names is resolved through two caches keyed by the token's jti:
+
+1. a per-process LRU, which needs no thread-pool hop at all
+2. a shared Redis store read with redis.asyncio, which needs no database
+   query and, unlike the Django cache's aget/aset, never leaves the event
+   loop (so the reconnect storm after a deploy, when every LRU is empty,
+   does not queue behind database work on the sync thread)
+
+Only a token seen by neither loads the User row. Entries live until the
+token expires or CHAT_AUTH_CACHE_TTL passes, whichever is sooner, so a
+deactivated or demoted user keeps an already-issued token's socket access
+for at most that long. Without CHAT_AUTH_REDIS_URL (development and tests)
+the Django cache stands in for the shared store.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from .local_cache import LocalCache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+identities = LocalCache(settings.CHAT_AUTH_CACHE_SIZE, settings.CHAT_AUTH_CACHE_TTL)
+
+
+class SocketUser:
+    """The few User fields a chat socket needs, rebuilt from the cache"""
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, identity):
+        self.id = self.pk = User._meta.pk.to_python(identity["id"])
+        self.email = identity["email"]
+        self.name = identity["name"]
+        self.role = identity["role"]
+        self.is_staff = identity["is_staff"]
+        self.is_active = identity["is_active"]
+
+    def __str__(self):
+        return self.email
+
+
+def _key(jti):
+    return f"chat:auth:{jti}"
+
+
+class SharedIdentities:
+    """Identities shared by every socket process, keyed by token jti"""
+
+    def __init__(self, url):
+        self.url = url
+        # A redis.asyncio client's connections belong to the loop that opened
+        # them, so keep one client per event loop
+        self.clients = weakref.WeakKeyDictionary()
+
+    def client(self):
+        loop = asyncio.get_running_loop()
+        client = self.clients.get(loop)
+        if client is None:
+            client = self.clients[loop] = aioredis.Redis.from_url(self.url)
+        return client
+
+    async def get(self, jti):
+        if not self.url:
+            return await cache.aget(_key(jti))
+        try:
+            value = await self.client().get(_key(jti))
+        except RedisError as e:
+            logger.warning(f"Chat auth cache read failed: {str(e)}")
+            return None
+        return json.loads(value) if value else None
+
+    async def set(self, jti, identity, timeout):
+        if not self.url:
+            await cache.aset(_key(jti), identity, timeout=timeout)
+            return
+        try:
+            await self.client().set(_key(jti), json.dumps(identity), ex=timeout)
+        except RedisError as e:
+            logger.warning(f"Chat auth cache write failed: {str(e)}")
+
+
+shared_identities = SharedIdentities(settings.CHAT_AUTH_REDIS_URL)
+
+
+@database_sync_to_async
+def load_identity(user_id):
+    row = (
+        User.objects.filter(pk=user_id)
+        .values("id", "email", "name", "role", "is_staff", "is_active")
+        .first()
+    )
+    if row is not None:
+        row["id"] = str(row["id"])
+    return row
+
+
+async def authenticate(token):
+    """Return a SocketUser for a valid access token, otherwise None"""
+    try:
+        access = AccessToken(token)
+    except TokenError:
+        return None
+    jti = access.get(api_settings.JTI_CLAIM)
+    user_id = access.get(api_settings.USER_ID_CLAIM)
+    ttl = min(access["exp"] - time.time(), settings.CHAT_AUTH_CACHE_TTL)
+    if not jti or not user_id or ttl <= 0:
+        return None
+
+    identity = identities.get(jti)
+    if identity is None:
+        identity = await shared_identities.get(jti)
+        if identity is None:
+            identity = await load_identity(user_id)
+            if identity is None:
+                return None
+            await shared_identities.set(jti, identity, max(int(ttl), 1))
+        identities.put(jti, identity, ttl)
+
+    if not identity["is_active"] or identity["id"] != str(user_id):
+        return None
+    return SocketUser(identity)
+
+
+class TokenAuthMiddleware(BaseMiddleware):
+    """Populate scope["user"] from the ?token= access token"""
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        token = query.get("token", [""])[0]
+        user = await authenticate(token) if token else None
+        scope = dict(scope, user=user or AnonymousUser())
+        return await super().__call__(scope, receive, send)
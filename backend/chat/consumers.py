@@ -1,87 +1,178 @@
+import asyncio
 import json
+import time
 from channels.generic.websocket import AsyncWebsocketConsumer
+from channels.consumer import get_handler_name
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from . import presence
+from .inbox import mark_read
 from .models import ChatThread, ChatMessage
+from .rooms import (
+    UNASSIGNED_GROUP,
+    agent_group,
+    message_events,
+    thread_group,
+    user_group,
+)
+from .writer import threads, writer
 
-User = get_user_model()
 
+class BaseChatConsumer(AsyncWebsocketConsumer):
+    """
+    Access checks, group bookkeeping, presence heartbeats and the
+    event handlers shared by member and support agent sockets
+    """
 
-class ChatConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        # Get token from query string
-        token = self.scope.get("query_string", b"").decode().split("token=")[-1].split("&")[0]
-        
-        if not token:
-            await self.close()
-            return
+    role = None
 
-        # Authenticate user
-        user = await self.authenticate_token(token)
-        if not user:
+    async def connect(self):
+        # chat.auth.TokenAuthMiddleware resolved ?token= into scope["user"]
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated or not self.allowed(user):
             await self.close()
             return
 
         self.user = user
-        self.room_group_name = f"chat_{user.id}"
-
-        # Join room group
-        await self.channel_layer.group_add(
-            self.room_group_name,
-            self.channel_name
-        )
+        self.joined = set()
+        self.typing = {}
+        for group in await self.initial_groups():
+            await self.join(group)
 
         await self.accept()
+        self.group_refresher = asyncio.create_task(self.refresh_groups())
+        await self.send(text_data=json.dumps({
+            "type": "CONNECTED",
+            "heartbeatInterval": settings.CHAT_PRESENCE_TTL // 2,
+        }))
+        if await database_sync_to_async(presence.heartbeat)(self.user.id):
+            await self.announce("online")
+
+    async def dispatch(self, message):
+        # channels hops to the sync thread before every handler only to run
+        # close_old_connections(), queueing each frame and group event behind
+        # whatever database work is in flight. Every ORM call here already
+        # goes through database_sync_to_async, which does that cleanup itself.
+        handler = getattr(self, get_handler_name(message), None)
+        if handler is None:
+            raise ValueError(f"No handler for message type {message['type']}")
+        await handler(message)
+
+    def allowed(self, user):
+        return True
+
+    async def initial_groups(self):
+        return []
+
+    async def join(self, group):
+        await self.channel_layer.group_add(group, self.channel_name)
+        self.joined.add(group)
+
+    async def leave(self, group):
+        await self.channel_layer.group_discard(group, self.channel_name)
+        self.joined.discard(group)
+
+    async def refresh_groups(self):
+        """Re-join groups before the channel layer's group_expiry drops them"""
+        expiry = getattr(self.channel_layer, "group_expiry", 86400)
+        while True:
+            await asyncio.sleep(expiry / 2)
+            for group in list(self.joined):
+                await self.channel_layer.group_add(group, self.channel_name)
 
     async def disconnect(self, close_code):
-        # Leave room group
-        if hasattr(self, "room_group_name"):
-            await self.channel_layer.group_discard(
-                self.room_group_name,
-                self.channel_name
-            )
+        if hasattr(self, "group_refresher"):
+            self.group_refresher.cancel()
+        if not hasattr(self, "joined"):
+            return
+
+        for thread_id in list(self.typing):
+            await self.typing_stopped(thread_id)
+        await database_sync_to_async(presence.leave)(self.user.id)
+        await self.announce("offline")
+        for group in list(self.joined):
+            await self.leave(group)
+
+    def watched_threads(self):
+        return [group for group in self.joined if group.startswith("chat_thread_")]
+
+    async def announce(self, status, groups=None):
+        """Tell everyone watching this user's threads that they came or went"""
+        for group in groups or self.watched_threads():
+            await self.channel_layer.group_send(group, {
+                "type": "presence",
+                "user": str(self.user.id),
+                "role": self.role,
+                "status": status,
+            })
 
     async def receive(self, text_data):
         try:
             data = json.loads(text_data)
-            message_type = data.get("type")
-
-            if message_type == "SEND":
-                thread_id = data.get("threadId")
-                body = data.get("body")
-                attachments = data.get("attachments", [])
-
-                if thread_id and body:
-                    message = await self.save_message(thread_id, body, attachments)
-                    if message:
-                        # Send message to room group
-                        await self.channel_layer.group_send(
-                            self.room_group_name,
-                            {
-                                "type": "chat_message",
-                                "message": {
-                                    "id": str(message.id),
-                                    "threadId": str(thread_id),
-                                    "body": message.body,
-                                    "sender": message.sender,
-                                    "timestamp": message.created_at.isoformat(),
-                                }
-                            }
-                        )
-
-            elif message_type == "TYPING":
-                # Broadcast typing indicator
-                await self.channel_layer.group_send(
-                    self.room_group_name,
-                    {
-                        "type": "typing_indicator",
-                        "user": str(self.user.id),
-                        "threadId": data.get("threadId"),
-                    }
-                )
-
         except json.JSONDecodeError:
             await self.send(text_data=json.dumps({"error": "Invalid JSON"}))
+            return
+
+        message_type = data.get("type")
+        if message_type == "HEARTBEAT":
+            if await database_sync_to_async(presence.heartbeat)(self.user.id):
+                await self.announce("online")
+            await self.send(text_data=json.dumps({"type": "HEARTBEAT_ACK"}))
+        elif message_type == "TYPING":
+            thread_id = str(data.get("threadId"))
+            if thread_group(thread_id) in self.joined:
+                if data.get("isTyping", True):
+                    await self.typing_started(thread_id)
+                else:
+                    await self.typing_stopped(thread_id)
+        else:
+            if message_type == "SEND" and data.get("threadId"):
+                # Receivers clear the indicator when the message arrives
+                await self.typing_stopped(str(data["threadId"]), announce=False)
+            await self.handle(message_type, data)
+
+    async def typing_started(self, thread_id):
+        """
+        Coalesce TYPING frames into at most one group_send per
+        CHAT_TYPING_INTERVAL, and announce a stop once they have been
+        quiet for CHAT_TYPING_TIMEOUT
+        """
+        sent_at, expiry = self.typing.get(thread_id, (None, None))
+        if expiry is not None:
+            expiry.cancel()
+        now = time.monotonic()
+        if sent_at is None or now - sent_at >= settings.CHAT_TYPING_INTERVAL:
+            sent_at = now
+            await self.send_typing(thread_id, True)
+        expiry = asyncio.create_task(self.typing_expires(thread_id))
+        self.typing[thread_id] = (sent_at, expiry)
+
+    async def typing_expires(self, thread_id):
+        await asyncio.sleep(settings.CHAT_TYPING_TIMEOUT)
+        await self.typing_stopped(thread_id)
+
+    async def typing_stopped(self, thread_id, announce=True):
+        _, expiry = self.typing.pop(thread_id, (None, None))
+        if expiry is None:
+            return
+        if expiry is not asyncio.current_task():
+            expiry.cancel()
+        if announce:
+            await self.send_typing(thread_id, False)
+
+    async def send_typing(self, thread_id, is_typing):
+        await self.channel_layer.group_send(thread_group(thread_id), {
+            "type": "typing_indicator",
+            "user": str(self.user.id),
+            "role": self.role,
+            "threadId": thread_id,
+            "isTyping": is_typing,
+            "origin": self.channel_name,
+        })
+
+    async def handle(self, message_type, data):
+        pass
 
     async def chat_message(self, event):
         # Send message to WebSocket
@@ -91,29 +182,147 @@ class ChatConsumer(AsyncWebsocketConsumer):
         }))
 
     async def typing_indicator(self, event):
-        # Send typing indicator to WebSocket
+        # Don't echo typing back to the socket that sent it
+        if event.get("origin") == self.channel_name:
+            return
         await self.send(text_data=json.dumps({
             "type": "TYPING",
             "user": event["user"],
+            "role": event.get("role"),
             "threadId": event.get("threadId"),
+            "isTyping": event.get("isTyping", True),
         }))
 
+    async def presence(self, event):
+        if event["user"] == str(self.user.id):
+            return
+        await self.send(text_data=json.dumps({
+            "type": "PRESENCE",
+            "user": event["user"],
+            "role": event["role"],
+            "status": event["status"],
+        }))
+
+    async def thread_activity(self, event):
+        await self.send(text_data=json.dumps({
+            "type": "THREAD",
+            **event["thread"]
+        }))
+
+
+class ChatConsumer(BaseChatConsumer):
+    """Member socket: joins every open thread the member owns"""
+
+    role = "member"
+
+    async def connect(self):
+        self.pending_acks = set()
+        await super().connect()
+
+    async def initial_groups(self):
+        thread_ids = await self.open_thread_ids()
+        return [user_group(self.user.id)] + [thread_group(pk) for pk in thread_ids]
+
+    async def handle(self, message_type, data):
+        if message_type == "SEND":
+            thread_id = data.get("threadId")
+            body = data.get("body")
+            attachments = data.get("attachments", [])
+
+            if thread_id and body:
+                if settings.CHAT_WRITE_BEHIND:
+                    await self.send_buffered(
+                        thread_id, body, attachments, data.get("clientId")
+                    )
+                    return
+                # chat.signals pushes the saved message to the thread group
+                message = await self.save_message(thread_id, body, attachments)
+                if message and thread_group(thread_id) not in self.joined:
+                    await self.join(thread_group(thread_id))
+                await self.acknowledge(message, data.get("clientId"))
+
+    async def send_buffered(self, thread_id, body, attachments, client_id):
+        """Fan the message out now and leave saving it to chat.writer"""
+        thread = await self.owned_thread(thread_id)
+        if thread is None:
+            await self.acknowledge(None, client_id)
+            return
+
+        message = ChatMessage(
+            thread=thread, sender="user", body=body, attachments=attachments
+        )
+        if thread_group(thread_id) not in self.joined:
+            await self.join(thread_group(thread_id))
+        for group, event in message_events(message):
+            await self.channel_layer.group_send(group, event)
+
+        saved = writer.submit(message)
+        ack = asyncio.create_task(self.acknowledge(message, client_id, saved))
+        self.pending_acks.add(ack)
+        ack.add_done_callback(self.pending_acks.discard)
+
+    async def acknowledge(self, message, client_id, saved=None):
+        ok = message is not None and (saved is None or await saved)
+        await self.send(text_data=json.dumps({
+            "type": "ACK",
+            "id": str(message.id) if message else None,
+            "clientId": client_id,
+            "ok": ok,
+        }))
+
+    async def disconnect(self, close_code):
+        # Don't leave this socket's messages waiting on the flush timer
+        await writer.drain()
+        for ack in list(self.pending_acks):
+            ack.cancel()
+        await super().disconnect(close_code)
+
+    async def thread_opened(self, event):
+        """A thread created over REST: start following it"""
+        await self.join(thread_group(event["threadId"]))
+        await self.send(text_data=json.dumps({
+            "type": "THREAD_OPENED",
+            "threadId": event["threadId"],
+        }))
+
+    async def thread_activity(self, event):
+        # Members only need status changes for their own threads
+        thread = event["thread"]
+        await self.send(text_data=json.dumps({
+            "type": "THREAD",
+            "threadId": thread["threadId"],
+            "status": thread["status"],
+        }))
+
+    @database_sync_to_async
+    def open_thread_ids(self):
+        return list(
+            ChatThread.objects.filter(user_id=self.user.id)
+            .exclude(status="closed")
+            .values_list("id", flat=True)
+        )
+
+    async def owned_thread(self, thread_id):
+        thread = threads.get(thread_id)
+        if thread is None:
+            thread = await self.load_thread(thread_id)
+            if thread is None:
+                return None
+            threads.put(thread.id, thread)
+        return thread if thread.user_id == self.user.id else None
+
     @database_sync_to_async
-    def authenticate_token(self, token):
-        """Authenticate JWT token and return user"""
-        from rest_framework_simplejwt.tokens import AccessToken
+    def load_thread(self, thread_id):
         try:
-            access_token = AccessToken(token)
-            user_id = access_token["user_id"]
-            return User.objects.get(id=user_id)
-        except Exception:
+            return ChatThread.objects.get(id=thread_id)
+        except (ChatThread.DoesNotExist, ValueError, ValidationError):
             return None
 
     @database_sync_to_async
     def save_message(self, thread_id, body, attachments):
         """Save message to database"""
         try:
-            thread = ChatThread.objects.get(id=thread_id, user=self.user)
+            thread = ChatThread.objects.get(id=thread_id, user_id=self.user.id)
             message = ChatMessage.objects.create(
                 thread=thread,
                 sender="user",
@@ -121,6 +330,85 @@ class ChatConsumer(AsyncWebsocketConsumer):
                 attachments=attachments,
             )
             return message
-        except ChatThread.DoesNotExist:
+        except (ChatThread.DoesNotExist, ValueError, ValidationError):
             return None
 
+
+class SupportAgentConsumer(BaseChatConsumer):
+    """
+    Support staff socket
+
+    Follows the agent's own inbox feed and the unassigned feed for
+    thread_activity events, and subscribes to individual threads (SUBSCRIBE /
+    UNSUBSCRIBE) to receive their messages, typing and presence.
+    """
+
+    role = "support"
+
+    def allowed(self, user):
+        return user.is_staff
+
+    async def initial_groups(self):
+        return [agent_group(self.user.id), UNASSIGNED_GROUP]
+
+    async def handle(self, message_type, data):
+        thread_id = data.get("threadId")
+        if not thread_id:
+            return
+
+        if message_type == "SUBSCRIBE":
+            member_id = await self.thread_member(thread_id)
+            if member_id is None:
+                await self.send(text_data=json.dumps({"error": "Thread not found"}))
+                return
+            await self.join(thread_group(thread_id))
+            await self.announce("online", [thread_group(thread_id)])
+            is_online = await database_sync_to_async(presence.online)([member_id])
+            await self.send(text_data=json.dumps({
+                "type": "PRESENCE",
+                "user": str(member_id),
+                "role": "member",
+                "status": "online" if is_online else "offline",
+                "threadId": thread_id,
+            }))
+        elif message_type == "UNSUBSCRIBE":
+            if thread_group(thread_id) in self.joined:
+                await self.announce("offline", [thread_group(thread_id)])
+                await self.leave(thread_group(thread_id))
+        elif message_type == "SEND":
+            body = data.get("body")
+            if body:
+                reply = await self.save_reply(
+                    thread_id, body, data.get("attachments", [])
+                )
+                if reply is None:
+                    await self.send(text_data=json.dumps({"error": "Thread not found"}))
+        elif message_type == "READ":
+            try:
+                await database_sync_to_async(mark_read)(thread_id, "support")
+            except ValidationError:
+                await self.send(text_data=json.dumps({"error": "Thread not found"}))
+
+    @database_sync_to_async
+    def thread_member(self, thread_id):
+        try:
+            return (
+                ChatThread.objects.filter(id=thread_id)
+                .values_list("user_id", flat=True)
+                .first()
+            )
+        except (ValueError, ValidationError):
+            return None
+
+    @database_sync_to_async
+    def save_reply(self, thread_id, body, attachments):
+        try:
+            thread = ChatThread.objects.get(id=thread_id)
+        except (ChatThread.DoesNotExist, ValueError, ValidationError):
+            return None
+        return ChatMessage.objects.create(
+            thread=thread,
+            sender="support",
+            body=body,
+            attachments=attachments,
+        )
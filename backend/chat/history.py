@@ -0,0 +1,76 @@
+"""
+Cursor pagination over a thread's message history
+
+Pages are anchored on a message id and walk the (thread, created_at, id)
+index, so a client can load the newest page first and scroll back with
+?before=<oldest id on screen>, or catch up with ?after=<newest id>, at the
+same cost whatever the thread length. Pages are always returned oldest
+first, the order a chat screen renders them in.
+"""
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from .models import ChatMessage
+
+
+def _page_size(limit):
+    if limit in (None, ""):
+        return settings.CHAT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid limit") from e
+    return min(max(limit, 1), settings.CHAT_MAX_PAGE_SIZE)
+
+
+def _anchor(thread, message_id):
+    try:
+        return (
+            ChatMessage.objects.filter(thread=thread, pk=message_id)
+            .values_list("created_at", "pk")
+            .get()
+        )
+    except (ChatMessage.DoesNotExist, ValidationError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def message_page(thread, before=None, after=None, since=None, limit=None):
+    """
+    Return (messages, has_more) for one page of a thread, oldest first
+
+    With no cursor this is the newest page. `before` pages back from a
+    message, `after` (or the older `since` timestamp) pages forward; has_more
+    says whether another page exists in that direction. Raises ValueError
+    for a malformed limit or a cursor outside the thread.
+    """
+    if before and after:
+        raise ValueError("Provide either before or after")
+    limit = _page_size(limit)
+    messages = ChatMessage.objects.filter(thread=thread)
+
+    forwards = bool(after or since)
+    if before:
+        created_at, pk = _anchor(thread, before)
+        # The range bound lets the index seek to the anchor; the OR only
+        # breaks ties between messages saved in the same instant
+        older = Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        messages = messages.filter(older, created_at__lte=created_at)
+    elif after:
+        created_at, pk = _anchor(thread, after)
+        newer = Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        messages = messages.filter(newer, created_at__gte=created_at)
+    elif since:
+        messages = messages.filter(created_at__gt=since)
+
+    if forwards:
+        messages = messages.order_by("created_at", "pk")
+    else:
+        messages = messages.order_by("-created_at", "-pk")
+
+    page = list(messages[: limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+    if not forwards:
+        page.reverse()
+    return page, has_more
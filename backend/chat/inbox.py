@@ -0,0 +1,87 @@
+"""
+Denormalized chat inbox maintenance
+
+Each message insert updates its thread's ChatInbox row with one UPDATE (a
+batched insert issues one per thread it touches): the unread counter for
+the other side is incremented with an F() expression and the preview only
+moves forward, so concurrent inserts from the REST API and the websocket
+consumer cannot lose counts or regress the preview.
+"""
+
+from django.db.models import Case, F, Q, Value, When
+from .models import ChatInbox
+
+PREVIEW_LENGTH = 140
+
+# Which side's unread counter a message from each sender increments
+UNREAD_FIELD = {
+    "user": "unread_by_support",
+    "support": "unread_by_user",
+}
+
+
+def preview(message):
+    text = " ".join((message.body or "").split())
+    if not text and message.attachments:
+        return "[attachment]"
+    return text[:PREVIEW_LENGTH]
+
+
+def open_inbox(thread):
+    """Create the inbox row for a new thread"""
+    ChatInbox.objects.get_or_create(
+        thread=thread,
+        defaults={"user_id": thread.user_id, "last_message_at": thread.created_at},
+    )
+
+
+def _fold(latest, count, unread):
+    newer = Q(last_message_at__lte=latest.created_at) | Q(message_count=0)
+
+    def pick(field, value):
+        output_field = ChatInbox._meta.get_field(field)
+        return Case(
+            When(newer, then=Value(value)), default=F(field), output_field=output_field
+        )
+
+    changes = {
+        "message_count": F("message_count") + count,
+        "last_message_at": pick("last_message_at", latest.created_at),
+        "last_message_preview": pick("last_message_preview", preview(latest)),
+        "last_message_sender": pick("last_message_sender", latest.sender),
+    }
+    for field, increment in unread.items():
+        changes[field] = F(field) + increment
+
+    if not ChatInbox.objects.filter(thread_id=latest.thread_id).update(**changes):
+        open_inbox(latest.thread)
+        ChatInbox.objects.filter(thread_id=latest.thread_id).update(**changes)
+
+
+def record_message(message):
+    """Fold a newly inserted message into its thread's inbox row"""
+    record_messages([message])
+
+
+def record_messages(messages):
+    """Fold a batch of inserted messages in with one UPDATE per thread"""
+    threads = {}
+    for message in messages:
+        latest, count, unread = threads.get(message.thread_id, (message, 0, {}))
+        if message.created_at >= latest.created_at:
+            latest = message
+        unread_field = UNREAD_FIELD.get(message.sender)
+        if unread_field:
+            unread[unread_field] = unread.get(unread_field, 0) + 1
+        threads[message.thread_id] = (latest, count + 1, unread)
+
+    for latest, count, unread in threads.values():
+        _fold(latest, count, unread)
+
+
+def mark_read(thread_id, side):
+    """Clear the unread counter for "user" or "support" on a thread"""
+    field = "unread_by_user" if side == "user" else "unread_by_support"
+    ChatInbox.objects.filter(thread_id=thread_id, **{f"{field}__gt": 0}).update(
+        **{field: 0}
+    )
@@ -0,0 +1,64 @@
+"""
+Sharded Redis channel layer for multi-node chat fan-out
+
+channels_redis already spreads groups and process channels across several
+Redis hosts, but it does so by cutting a 4096-slot CRC range into equal
+parts, so adding or removing a host moves most groups to a different
+shard (and live sockets stop receiving until they reconnect). This layer
+keeps the upstream wire format and swaps the host choice for a hash ring
+with virtual nodes, so resizing the pool only moves about 1/N of the keys.
+
+Backpressure: every channel holds at most `capacity` undelivered messages.
+group_send (which carries all chat, presence and typing events) already
+skips channels that are full rather than raising ChannelFull.
+"""
+
+import bisect
+import hashlib
+from channels_redis.core import RedisChannelLayer
+
+VIRTUAL_NODES = 160
+
+
+def _point(value):
+    return int.from_bytes(hashlib.md5(value.encode("utf8")).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent-hash ring mapping keys to node indexes"""
+
+    def __init__(self, nodes, replicas=VIRTUAL_NODES):
+        points = []
+        for index, node in enumerate(nodes):
+            for replica in range(replicas):
+                points.append((_point(f"{node}#{replica}"), index))
+        points.sort()
+        self._points = [point for point, _ in points]
+        self._indexes = [index for _, index in points]
+
+    def get(self, key):
+        if len(self._indexes) <= 1:
+            return 0
+        position = bisect.bisect(self._points, _point(key)) % len(self._points)
+        return self._indexes[position]
+
+
+def host_identity(host):
+    """Stable ring name for a decoded channels_redis host entry"""
+    if "address" in host:
+        return str(host["address"])
+    if "master_name" in host:
+        return f"sentinel:{host['master_name']}"
+    address = f"{host.get('host', 'localhost')}:{host.get('port', 6379)}"
+    return f"{address}/{host.get('db', 0)}"
+
+
+class ShardedRedisChannelLayer(RedisChannelLayer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.ring = HashRing([host_identity(host) for host in self.hosts])
+
+    def consistent_hash(self, value):
+        if isinstance(value, bytes):
+            value = value.decode("utf8")
+        return self.ring.get(value)
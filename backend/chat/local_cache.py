@@ -0,0 +1,40 @@
+"""
+Small in-process LRU with per-entry expiry
+
+For values a socket process looks up on hot paths (thread ownership,
+authenticated identities) where even a shared-cache round trip costs a hop
+through the sync thread pool. Entries are never shared between processes,
+so keep their lifetimes short.
+"""
+
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(str(key))
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires < time.monotonic():
+            del self.entries[str(key)]
+            return None
+        self.entries.move_to_end(str(key))
+        return value
+
+    def put(self, key, value, ttl=None):
+        """Store value for ttl seconds (at most the cache's own ttl)"""
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self.entries[str(key)] = (value, time.monotonic() + ttl)
+        self.entries.move_to_end(str(key))
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def forget(self, key):
+        self.entries.pop(str(key), None)
@@ -0,0 +1,217 @@
+"""
+Management command to benchmark chat fan-out through the Redis channel layer
+
+Starts several subscriber processes, each holding many simulated sockets
+joined to chat groups, plus publisher processes that group_send timestamped
+messages. Reports delivery, throughput and end-to-end latency percentiles.
+Keys use a throwaway prefix and expire on their own, but point it at a
+local or staging Redis, not production.
+
+Usage:
+    python manage.py benchmark_channel_layer \\
+        [--redis redis://localhost:6379/0 --redis redis://localhost:6380/0] \\
+        [--processes 4] [--sockets 250] [--groups 100] [--publishers 2] \\
+        [--messages 20000] [--rate 0]
+"""
+
+import asyncio
+import multiprocessing
+import statistics
+import time
+import uuid
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from chat.layers import ShardedRedisChannelLayer
+
+
+def _layer(options):
+    return ShardedRedisChannelLayer(
+        hosts=options["redis"],
+        prefix=options["prefix"],
+        capacity=options["capacity"],
+        expiry=options["expiry"],
+        group_expiry=300,
+    )
+
+
+def _group(index, prefix):
+    return f"{prefix}.group.{index}"
+
+
+def _expected(options, group):
+    """Messages a socket in the given group should receive"""
+    messages, groups = options["messages"], options["groups"]
+    return messages // groups + (1 if group < messages % groups else 0)
+
+
+async def _subscribe(options, worker, barrier, results):
+    layer = _layer(options)
+    sockets = []
+    for i in range(options["sockets"]):
+        group = (worker * options["sockets"] + i) % options["groups"]
+        channel = await layer.new_channel()
+        await layer.group_add(_group(group, options["prefix"]), channel)
+        sockets.append((channel, _expected(options, group)))
+
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    deadline = time.monotonic() + options["timeout"]
+    latencies = []
+
+    async def drain(channel, expected):
+        while expected and time.monotonic() < deadline:
+            try:
+                message = await asyncio.wait_for(
+                    layer.receive(channel), deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                return
+            latencies.append(time.time() - message["sent"])
+            expected -= 1
+
+    await asyncio.gather(*(drain(channel, expected) for channel, expected in sockets))
+    for i, (channel, _) in enumerate(sockets):
+        group = (worker * options["sockets"] + i) % options["groups"]
+        await layer.group_discard(_group(group, options["prefix"]), channel)
+    results.put(
+        {
+            "role": "subscriber",
+            "expected": sum(expected for _, expected in sockets),
+            "latencies": latencies,
+            "finished": time.time(),
+        }
+    )
+
+
+async def _publish(options, worker, barrier, results):
+    layer = _layer(options)
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+    interval = options["publishers"] / options["rate"] if options["rate"] else 0
+    started = time.time()
+    sent = 0
+    for i in range(worker, options["messages"], options["publishers"]):
+        await layer.group_send(
+            _group(i % options["groups"], options["prefix"]),
+            {"type": "chat_message", "sent": time.time(), "body": "x" * 64},
+        )
+        sent += 1
+        if interval:
+            await asyncio.sleep(max(started + sent * interval - time.time(), 0))
+    results.put(
+        {"role": "publisher", "sent": sent, "started": started, "finished": time.time()}
+    )
+
+
+def _run(target, options, worker, barrier, results):
+    try:
+        asyncio.run(target(options, worker, barrier, results))
+    except Exception as e:
+        # Release the other workers instead of leaving them at the barrier
+        barrier.abort()
+        results.put({"role": "error", "error": f"{type(e).__name__}: {e}"})
+
+
+def _percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = "Benchmark chat fan-out latency and throughput through Redis"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--redis",
+            action="append",
+            help="Redis URL of one shard (repeat for several); "
+            "defaults to CHANNEL_REDIS_URLS or redis://localhost:6379/0",
+        )
+        parser.add_argument("--processes", type=int, default=4)
+        parser.add_argument(
+            "--sockets", type=int, default=250, help="Sockets per subscriber process"
+        )
+        parser.add_argument("--groups", type=int, default=100)
+        parser.add_argument("--publishers", type=int, default=2)
+        parser.add_argument(
+            "--messages", type=int, default=20000, help="Total group sends"
+        )
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Total group sends per second (0 = as fast as possible)",
+        )
+        parser.add_argument(
+            "--capacity", type=int, default=settings.CHANNEL_LAYER_CAPACITY
+        )
+        parser.add_argument("--expiry", type=int, default=settings.CHANNEL_LAYER_EXPIRY)
+        parser.add_argument(
+            "--timeout", type=int, default=120, help="Seconds to wait for delivery"
+        )
+
+    def handle(self, *args, **options):
+        options["redis"] = (
+            options["redis"]
+            or settings.CHANNEL_REDIS_URLS
+            or ["redis://localhost:6379/0"]
+        )
+        options["prefix"] = f"bench{uuid.uuid4().hex[:8]}"
+        if min(options["processes"], options["publishers"], options["groups"]) < 1:
+            raise CommandError("processes, publishers and groups must be positive")
+
+        workers = options["processes"] + options["publishers"]
+        barrier = multiprocessing.Barrier(workers)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_run, args=(_subscribe, options, i, barrier, results)
+            )
+            for i in range(options["processes"])
+        ] + [
+            multiprocessing.Process(
+                target=_run, args=(_publish, options, i, barrier, results)
+            )
+            for i in range(options["publishers"])
+        ]
+        for process in processes:
+            process.start()
+        reports = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        errors = [r["error"] for r in reports if r["role"] == "error"]
+        if errors:
+            raise CommandError(f"Benchmark failed: {errors[0]}")
+
+        publishers = [r for r in reports if r["role"] == "publisher"]
+        subscribers = [r for r in reports if r["role"] == "subscriber"]
+        started = min(r["started"] for r in publishers)
+        publish_seconds = max(r["finished"] for r in publishers) - started
+        deliver_seconds = max(r["finished"] for r in subscribers) - started
+        latencies = sorted(latency for r in subscribers for latency in r["latencies"])
+        expected = sum(r["expected"] for r in subscribers)
+        if not latencies:
+            raise CommandError("No messages were delivered")
+
+        sockets = options["processes"] * options["sockets"]
+        self.stdout.write(
+            f"{len(options['redis'])} shard(s), {sockets} sockets in "
+            f"{options['groups']} groups, {options['processes']} subscriber and "
+            f"{options['publishers']} publisher processes"
+        )
+        self.stdout.write(
+            f"Published {sum(r['sent'] for r in publishers)} group sends in "
+            f"{publish_seconds:.2f}s "
+            f"({sum(r['sent'] for r in publishers) / publish_seconds:.0f}/s)"
+        )
+        self.stdout.write(
+            f"Delivered {len(latencies)}/{expected} messages "
+            f"({len(latencies) / deliver_seconds:.0f}/s)"
+        )
+        self.stdout.write(
+            "Latency ms: "
+            f"p50 {_percentile(latencies, 0.50) * 1000:.1f}  "
+            f"p95 {_percentile(latencies, 0.95) * 1000:.1f}  "
+            f"p99 {_percentile(latencies, 0.99) * 1000:.1f}  "
+            f"max {latencies[-1] * 1000:.1f}  "
+            f"mean {statistics.fmean(latencies) * 1000:.1f}"
+        )
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark complete"))
@@ -0,0 +1,138 @@
+"""
+Management command to load test message persistence on the member socket
+
+Opens many member sockets against the ASGI application in-process, sends a
+burst of SEND frames on each and times how long it takes until every
+message has been ACKed, once with each message saved before it is fanned
+out (CHAT_WRITE_BEHIND off) and once with the write-behind buffer. The
+benchmark members, threads and messages are created in the configured
+database and deleted afterwards, so run it against a local or staging
+database.
+
+Usage:
+    python manage.py benchmark_chat_writes [--sockets 50] [--messages 200] \\
+        [--mode both|direct|buffered]
+"""
+
+import asyncio
+import time
+import uuid
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from chat.models import ChatMessage, ChatThread
+from users.models import User
+
+
+async def _connect(application, token):
+    communicator = WebsocketCommunicator(
+        application,
+        f"/chat/ws?token={token}",
+        headers=[(b"host", b"localhost")],
+    )
+    connected, _ = await communicator.connect()
+    if not connected:
+        raise CommandError("Benchmark socket was refused")
+    await communicator.receive_json_from()  # CONNECTED
+    return communicator
+
+
+async def _burst(communicator, thread_id, count, timeout):
+    """Send count messages, returning how many were ACKed as saved"""
+    for i in range(count):
+        await communicator.send_json_to(
+            {
+                "type": "SEND",
+                "threadId": thread_id,
+                "body": f"Benchmark message {i}",
+                "clientId": str(i),
+            }
+        )
+    acked = saved = 0
+    while acked < count:
+        event = await communicator.receive_json_from(timeout)
+        if event["type"] == "ACK":
+            acked += 1
+            saved += event["ok"]
+    return saved
+
+
+async def _run(clients, count, timeout):
+    from membership_auto.asgi import application
+
+    sockets = [
+        (await _connect(application, token), thread_id)
+        for token, thread_id in clients
+    ]
+    started = time.perf_counter()
+    try:
+        saved = await asyncio.gather(
+            *(
+                _burst(communicator, thread_id, count, timeout)
+                for communicator, thread_id in sockets
+            )
+        )
+        elapsed = time.perf_counter() - started
+    finally:
+        for communicator, _ in sockets:
+            await communicator.disconnect()
+    return sum(saved), elapsed
+
+
+class Command(BaseCommand):
+    help = "Load test chat message persistence over member websockets"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sockets", type=int, default=50)
+        parser.add_argument(
+            "--messages", type=int, default=200, help="Messages sent per socket"
+        )
+        parser.add_argument(
+            "--mode", choices=["both", "direct", "buffered"], default="both"
+        )
+        parser.add_argument(
+            "--timeout", type=int, default=60, help="Seconds to wait for each ACK"
+        )
+
+    def handle(self, *args, **options):
+        if min(options["sockets"], options["messages"]) < 1:
+            raise CommandError("sockets and messages must be positive")
+        modes = [options["mode"]]
+        if options["mode"] == "both":
+            modes = ["direct", "buffered"]
+
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        members = User.objects.bulk_create(
+            User(email=f"{prefix}-{i}@example.invalid")
+            for i in range(options["sockets"])
+        )
+        try:
+            threads = ChatThread.objects.bulk_create(
+                ChatThread(user=member, subject="Benchmark") for member in members
+            )
+            clients = [
+                (str(AccessToken.for_user(member)), str(thread.id))
+                for member, thread in zip(members, threads)
+            ]
+            total = options["sockets"] * options["messages"]
+            self.stdout.write(
+                f"{options['sockets']} sockets x {options['messages']} messages"
+            )
+
+            for mode in modes:
+                with override_settings(CHAT_WRITE_BEHIND=mode == "buffered"):
+                    saved, elapsed = asyncio.run(
+                        _run(clients, options["messages"], options["timeout"])
+                    )
+                stored = ChatMessage.objects.filter(thread__in=threads).count()
+                ChatMessage.objects.filter(thread__in=threads).delete()
+                self.stdout.write(
+                    f"{mode:>8}: {total} messages in {elapsed:.2f}s "
+                    f"({total / elapsed:.0f} msg/s), {saved} acked as saved, "
+                    f"{stored} stored"
+                )
+        finally:
+            User.objects.filter(pk__in=[member.pk for member in members]).delete()
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark complete"))
@@ -0,0 +1,494 @@
+"""
+Management command to load test the chat websocket stack
+
+Opens thousands of authenticated member sockets (plus optional support
+agent sockets subscribed to slices of the threads) and drives SEND and
+TYPING frames at fixed per-socket rates. It reports connect latency,
+end-to-end delivery latency percentiles, dropped deliveries and the
+server's CPU and RSS.
+
+By default the sockets talk to membership_auto.asgi.application
+in-process, over whatever channel layer the settings configure; pass
+--redis to use a (local) Redis layer instead. Pass --url to drive a running
+daphne instead, and --server-pid to sample that process's CPU and RSS
+(in-process runs sample this process, which also hosts the clients, so
+their numbers are pessimistic). The benchmark members and threads are
+created in the configured database, which a remote server must share, and
+are deleted afterwards, so run it against a local or staging database.
+
+Usage:
+    python manage.py loadtest_chat [--connections 2000] [--agents 10] \\
+        [--send-rate 0.2] [--typing-rate 1] [--duration 30] \\
+        [--redis redis://localhost:6379/0] \\
+        [--url ws://localhost:8000 --server-pid 12345]
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import time
+import uuid
+from urllib.parse import urlparse
+from channels.testing import WebsocketCommunicator
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from chat.models import ChatThread
+from users.models import User
+
+# Bodies of harness messages: "loadtest|<sent at>|<socket>|<sequence>"
+MARKER = "loadtest"
+
+
+class LocalSocket:
+    """A socket connected to the ASGI application in this process"""
+
+    def __init__(self, path):
+        from membership_auto.asgi import application
+
+        self.communicator = WebsocketCommunicator(
+            application, path, headers=[(b"host", b"localhost")]
+        )
+
+    async def open(self):
+        connected, _ = await self.communicator.connect(timeout=30)
+        return connected
+
+    async def send(self, data):
+        await self.communicator.send_json_to(data)
+
+    async def receive(self):
+        """Next frame as a dict, or None once the socket is closed"""
+        try:
+            return await self.communicator.receive_json_from(timeout=3600)
+        except (AssertionError, asyncio.TimeoutError):
+            return None
+
+    async def close(self):
+        await self.communicator.disconnect()
+
+
+class RemoteSocket:
+    """
+    A socket connected to a running server
+
+    A minimal RFC 6455 client over asyncio streams (unfragmented text
+    frames, which is all daphne sends), so the harness needs nothing beyond
+    the standard library.
+    """
+
+    def __init__(self, url, path):
+        self.target = urlparse(f"{url.rstrip('/')}{path}")
+        self.reader = self.writer = None
+
+    async def open(self):
+        secure = self.target.scheme == "wss"
+        try:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.target.hostname,
+                self.target.port or (443 if secure else 80),
+                ssl=secure or None,
+            )
+            key = base64.b64encode(os.urandom(16)).decode()
+            self.writer.write(
+                (
+                    f"GET {self.target.path}?{self.target.query} HTTP/1.1\r\n"
+                    f"Host: {self.target.netloc}\r\n"
+                    "Upgrade: websocket\r\n"
+                    "Connection: Upgrade\r\n"
+                    f"Sec-WebSocket-Key: {key}\r\n"
+                    "Sec-WebSocket-Version: 13\r\n\r\n"
+                ).encode()
+            )
+            response = await self.reader.readuntil(b"\r\n\r\n")
+        except (OSError, asyncio.IncompleteReadError):
+            return False
+        return response.split(b" ", 2)[1] == b"101"
+
+    def frame(self, opcode, payload=b""):
+        # Client frames are always masked
+        length = len(payload)
+        if length < 126:
+            header = bytes([0x80 | opcode, 0x80 | length])
+        elif length < 65536:
+            header = bytes([0x80 | opcode, 0x80 | 126]) + length.to_bytes(2, "big")
+        else:
+            header = bytes([0x80 | opcode, 0x80 | 127]) + length.to_bytes(8, "big")
+        mask = os.urandom(4)
+        key = (mask * (length // 4 + 1))[:length]
+        masked = (
+            int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")
+        ).to_bytes(length, "big")
+        self.writer.write(header + mask + masked)
+
+    async def send(self, data):
+        self.frame(0x1, json.dumps(data).encode("utf8"))
+
+    async def receive(self):
+        while True:
+            try:
+                head = await self.reader.readexactly(2)
+                length = head[1] & 0x7F
+                if length == 126:
+                    length = int.from_bytes(await self.reader.readexactly(2), "big")
+                elif length == 127:
+                    length = int.from_bytes(await self.reader.readexactly(8), "big")
+                payload = await self.reader.readexactly(length)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                return None
+            opcode = head[0] & 0x0F
+            if opcode == 0x1:
+                return json.loads(payload)
+            if opcode == 0x8:
+                return None
+            if opcode == 0x9:
+                self.frame(0xA, payload)
+
+    async def close(self):
+        if self.writer is not None and not self.writer.is_closing():
+            self.frame(0x8)
+            self.writer.close()
+
+
+def _percentiles(values):
+    if len(values) < 2:
+        return "n/a"
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return (
+        f"p50 {cuts[49] * 1000:.1f}  p95 {cuts[94] * 1000:.1f}  "
+        f"p99 {cuts[98] * 1000:.1f}  max {max(values) * 1000:.1f}"
+    )
+
+
+class ProcessSampler:
+    """Samples a process's CPU share and RSS from /proc once a second"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.cpu = []
+        self.rss = []
+        self.ticks = os.sysconf("SC_CLK_TCK")
+        self.page = os.sysconf("SC_PAGE_SIZE")
+
+    def read(self):
+        """(cpu seconds, rss bytes) or None when /proc is unavailable"""
+        try:
+            with open(f"/proc/{self.pid}/stat") as stat:
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except OSError:
+            return None
+        # utime and stime are fields 14 and 15, rss (in pages) field 24
+        cpu = (int(fields[11]) + int(fields[12])) / self.ticks
+        return cpu, int(fields[21]) * self.page
+
+    async def run(self):
+        previous, at = self.read(), time.monotonic()
+        while previous is not None:
+            await asyncio.sleep(1)
+            current, now = self.read(), time.monotonic()
+            if current is None:
+                return
+            self.cpu.append((current[0] - previous[0]) / (now - at) * 100)
+            self.rss.append(current[1])
+            previous, at = current, now
+
+    def report(self):
+        if not self.cpu:
+            return f"Server CPU/RSS: unavailable for pid {self.pid}"
+        return (
+            f"Server pid {self.pid}: CPU mean {statistics.fmean(self.cpu):.0f}% "
+            f"peak {max(self.cpu):.0f}%, RSS peak {max(self.rss) / 2**20:.0f} MiB"
+        )
+
+
+class LoadTest:
+    def __init__(self, options, members, agents):
+        self.options = options
+        self.members = members  # [(token, thread id)]
+        self.agents = agents  # [(token, [thread ids])]
+        self.watchers = {}  # thread id -> agent sockets subscribed to it
+        self.connect_latency = []
+        self.failed_connects = 0
+        self.delivery_latency = []
+        self.counts = {
+            "sent": 0,
+            "expected": 0,
+            "delivered": 0,
+            "acked": 0,
+            "ack_failed": 0,
+            "typing_sent": 0,
+            "typing_received": 0,
+            "feed_events": 0,
+        }
+        self.running = True
+
+    def socket(self, path):
+        if self.options["url"]:
+            return RemoteSocket(self.options["url"], path)
+        return LocalSocket(path)
+
+    async def connect(self, path, token, limit):
+        async with limit:
+            socket = self.socket(f"{path}?token={token}")
+            started = time.perf_counter()
+            if not await socket.open():
+                self.failed_connects += 1
+                return None
+            hello = await socket.receive()
+            if not hello or hello.get("type") != "CONNECTED":
+                self.failed_connects += 1
+                return None
+            self.connect_latency.append(time.perf_counter() - started)
+            return socket
+
+    async def read(self, socket):
+        while True:
+            frame = await socket.receive()
+            if frame is None:
+                return
+            kind = frame.get("type")
+            if kind == "MESSAGE" and frame.get("body", "").startswith(MARKER):
+                sent_at = float(frame["body"].split("|")[1])
+                self.delivery_latency.append(time.time() - sent_at)
+                self.counts["delivered"] += 1
+            elif kind == "ACK":
+                self.counts["acked" if frame.get("ok") else "ack_failed"] += 1
+            elif kind == "TYPING":
+                self.counts["typing_received"] += 1
+            elif kind == "THREAD":
+                self.counts["feed_events"] += 1
+
+    async def paced(self, rate, action):
+        """Call action() rate times a second, from a random offset, until stopped"""
+        if rate <= 0:
+            return
+        interval = 1 / rate
+        next_at = time.monotonic() + random.uniform(0, interval)
+        while self.running:
+            await asyncio.sleep(max(next_at - time.monotonic(), 0))
+            if not self.running:
+                return
+            await action()
+            next_at += interval
+
+    def member_traffic(self, index, socket, thread_id):
+        sequence = iter(range(10**9))
+
+        async def send():
+            body = f"{MARKER}|{time.time()}|{index}|{next(sequence)}"
+            await socket.send({"type": "SEND", "threadId": thread_id, "body": body})
+            self.counts["sent"] += 1
+            # The sender's own socket is in the thread group too
+            self.counts["expected"] += 1 + self.watchers.get(thread_id, 0)
+
+        async def typing():
+            await socket.send(
+                {"type": "TYPING", "threadId": thread_id, "isTyping": True}
+            )
+            self.counts["typing_sent"] += 1
+
+        return [
+            self.paced(self.options["send_rate"], send),
+            self.paced(self.options["typing_rate"], typing),
+        ]
+
+    async def run(self):
+        limit = asyncio.Semaphore(self.options["connect_concurrency"])
+        sampler = ProcessSampler(self.options["server_pid"] or os.getpid())
+        sampling = asyncio.create_task(sampler.run())
+
+        agent_sockets = []
+        for token, thread_ids in self.agents:
+            socket = await self.connect("/chat/agent/ws", token, limit)
+            if socket is None:
+                continue
+            for thread_id in thread_ids:
+                await socket.send({"type": "SUBSCRIBE", "threadId": thread_id})
+                self.watchers[thread_id] = self.watchers.get(thread_id, 0) + 1
+            agent_sockets.append(socket)
+
+        connect_started = time.perf_counter()
+        member_sockets = await asyncio.gather(
+            *(self.connect("/chat/ws", token, limit) for token, _ in self.members)
+        )
+        connect_seconds = time.perf_counter() - connect_started
+
+        # Let SUBSCRIBE replies and presence chatter settle before measuring
+        readers = [
+            asyncio.create_task(self.read(socket))
+            for socket in agent_sockets + [s for s in member_sockets if s]
+        ]
+        await asyncio.sleep(1)
+        for key in self.counts:
+            self.counts[key] = 0
+
+        traffic = []
+        for index, (socket, (_, thread_id)) in enumerate(
+            zip(member_sockets, self.members)
+        ):
+            if socket is not None:
+                traffic.extend(self.member_traffic(index, socket, thread_id))
+        started = time.perf_counter()
+        driving = asyncio.gather(*traffic)
+        await asyncio.sleep(self.options["duration"])
+        self.running = False
+        await driving
+        sending_seconds = time.perf_counter() - started
+
+        # Wait for stragglers, but no longer than --drain
+        deadline = time.monotonic() + self.options["drain"]
+        while time.monotonic() < deadline and (
+            self.counts["delivered"] < self.counts["expected"]
+            or self.counts["acked"] + self.counts["ack_failed"] < self.counts["sent"]
+        ):
+            await asyncio.sleep(0.1)
+
+        for socket in agent_sockets + [s for s in member_sockets if s]:
+            await socket.close()
+        for reader in readers:
+            reader.cancel()
+        sampling.cancel()
+        return {
+            "connected": sum(1 for s in member_sockets if s) + len(agent_sockets),
+            "connect_seconds": connect_seconds,
+            "sending_seconds": sending_seconds,
+            "sampler": sampler,
+        }
+
+
+class Command(BaseCommand):
+    help = "Load test chat websockets: connect latency, delivery latency, drops"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument(
+            "--agents",
+            type=int,
+            default=0,
+            help="Support agent sockets, each subscribed to a slice of threads",
+        )
+        parser.add_argument(
+            "--send-rate", type=float, default=0.2, help="SENDs per member per second"
+        )
+        parser.add_argument(
+            "--typing-rate",
+            type=float,
+            default=1.0,
+            help="TYPING frames per member per second",
+        )
+        parser.add_argument(
+            "--duration", type=float, default=30, help="Seconds of traffic"
+        )
+        parser.add_argument(
+            "--drain", type=float, default=10, help="Seconds to wait for stragglers"
+        )
+        parser.add_argument("--connect-concurrency", type=int, default=200)
+        parser.add_argument(
+            "--redis",
+            action="append",
+            help="Run in-process over a Redis channel layer at this URL "
+            "(repeat for several shards)",
+        )
+        parser.add_argument(
+            "--url", help="Drive a running server, e.g. ws://localhost:8000"
+        )
+        parser.add_argument(
+            "--server-pid", type=int, help="Process to sample for CPU and RSS"
+        )
+
+    def handle(self, *args, **options):
+        if options["connections"] < 1 or options["agents"] < 0:
+            raise CommandError("connections must be positive")
+        if options["url"] and options["redis"]:
+            raise CommandError("--redis only applies in-process; a server uses its own")
+
+        prefix = f"loadtest-{uuid.uuid4().hex[:8]}"
+        users = User.objects.bulk_create(
+            [
+                User(email=f"{prefix}-member-{i}@example.invalid")
+                for i in range(options["connections"])
+            ]
+            + [
+                User(email=f"{prefix}-agent-{i}@example.invalid", is_staff=True)
+                for i in range(options["agents"])
+            ]
+        )
+        members, staff = users[: options["connections"]], users[options["connections"]:]
+        try:
+            threads = ChatThread.objects.bulk_create(
+                ChatThread(user=member, subject="Load test") for member in members
+            )
+            thread_ids = [str(thread.id) for thread in threads]
+            test = LoadTest(
+                options,
+                [
+                    (str(AccessToken.for_user(member)), thread_id)
+                    for member, thread_id in zip(members, thread_ids)
+                ],
+                [
+                    (str(AccessToken.for_user(agent)), thread_ids[i :: len(staff)])
+                    for i, agent in enumerate(staff)
+                ],
+            )
+            with override_settings(**self.layer_settings(options)):
+                result = asyncio.run(test.run())
+        finally:
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        self.report(options, test, result)
+
+    def layer_settings(self, options):
+        if not options["redis"]:
+            return {}
+        return {
+            "CHANNEL_LAYERS": {
+                "default": {
+                    "BACKEND": "chat.layers.ShardedRedisChannelLayer",
+                    "CONFIG": {
+                        "hosts": options["redis"],
+                        "prefix": f"loadtest{uuid.uuid4().hex[:8]}",
+                        "capacity": settings.CHANNEL_LAYER_CAPACITY,
+                        "expiry": settings.CHANNEL_LAYER_EXPIRY,
+                        "group_expiry": settings.CHANNEL_LAYER_GROUP_EXPIRY,
+                    },
+                }
+            }
+        }
+
+    def report(self, options, test, result):
+        counts = test.counts
+        target = options["url"] or "in-process"
+        layer = (
+            f"Redis x{len(options['redis'])}"
+            if options["redis"]
+            else settings.CHANNEL_LAYERS["default"]["BACKEND"].rsplit(".", 1)[-1]
+        )
+        if options["url"]:
+            layer = "server's channel layer"
+        self.stdout.write(
+            f"{target}, {layer}: {result['connected']} sockets connected, "
+            f"{test.failed_connects} failed, in {result['connect_seconds']:.2f}s"
+        )
+        self.stdout.write(f"Connect latency ms: {_percentiles(test.connect_latency)}")
+        self.stdout.write(
+            f"Sent {counts['sent']} messages in {result['sending_seconds']:.1f}s "
+            f"({counts['sent'] / result['sending_seconds']:.0f}/s), "
+            f"{counts['acked']} acked, {counts['ack_failed']} failed"
+        )
+        dropped = max(counts["expected"] - counts["delivered"], 0)
+        self.stdout.write(
+            f"Delivered {counts['delivered']}/{counts['expected']} "
+            f"({dropped} dropped, {dropped / max(counts['expected'], 1):.2%})"
+        )
+        self.stdout.write(f"Delivery latency ms: {_percentiles(test.delivery_latency)}")
+        self.stdout.write(
+            f"Typing: {counts['typing_sent']} frames sent, "
+            f"{counts['typing_received']} events delivered; "
+            f"{counts['feed_events']} inbox feed events"
+        )
+        self.stdout.write(result["sampler"].report())
+        self.stdout.write(self.style.SUCCESS("✅ Load test complete"))
@@ -0,0 +1,28 @@
+"""
+Management command to rebuild the SQLite chat search index
+
+Only needed on SQLite, and only if chat_messages_fts drifted from the
+messages table (for example after restoring a database copy); triggers keep
+it current otherwise. The PostgreSQL GIN index needs no maintenance.
+
+Usage:
+    python manage.py rebuild_chat_search
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from chat.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the SQLite full-text index over chat messages"
+
+    def handle(self, *args, **options):
+        if connection.vendor == "postgresql":
+            self.stdout.write("PostgreSQL searches a GIN index; nothing to rebuild")
+            return
+
+        indexed = rebuild_index()
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Indexed {indexed} chat messages for search")
+        )
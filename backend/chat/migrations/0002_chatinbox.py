@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:31
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_inbox(apps, schema_editor):
+    ChatThread = apps.get_model("chat", "ChatThread")
+    ChatMessage = apps.get_model("chat", "ChatMessage")
+    ChatInbox = apps.get_model("chat", "ChatInbox")
+
+    # Messages had no read state before, so existing threads start fully read
+    rows = []
+    for thread in ChatThread.objects.iterator():
+        messages = ChatMessage.objects.filter(thread=thread)
+        last = messages.order_by("-created_at").first()
+        preview = " ".join((last.body or "").split())[:140] if last else ""
+        if last and not preview and last.attachments:
+            preview = "[attachment]"
+        rows.append(
+            ChatInbox(
+                thread=thread,
+                user_id=thread.user_id,
+                last_message_at=last.created_at if last else thread.created_at,
+                last_message_preview=preview,
+                last_message_sender=last.sender if last else "",
+                message_count=messages.count(),
+            )
+        )
+    ChatInbox.objects.bulk_create(rows, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChatInbox",
+            fields=[
+                ("thread", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="inbox", serialize=False, to="chat.chatthread")),
+                ("last_message_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("last_message_preview", models.TextField(blank=True, default="")),
+                ("last_message_sender", models.TextField(blank=True, default="")),
+                ("message_count", models.IntegerField(default=0)),
+                ("unread_by_user", models.IntegerField(default=0)),
+                ("unread_by_support", models.IntegerField(default=0)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="chat_inbox", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "db_table": "chat_inbox",
+                "indexes": [models.Index(fields=["last_message_at", "thread"], name="chat_inbox_last_me_79f6ca_idx"), models.Index(fields=["user", "last_message_at"], name="chat_inbox_user_id_7a0856_idx")],
+            },
+        ),
+        migrations.RunPython(backfill_inbox, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0002_chatinbox"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="chatthread",
+            name="assigned_to",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="assigned_chat_threads", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name="chatthread",
+            name="status",
+            field=models.TextField(choices=[("open", "Open"), ("pending", "Pending"), ("closed", "Closed")], default="open"),
+        ),
+        migrations.AddIndex(
+            model_name="chatthread",
+            index=models.Index(fields=["assigned_to", "status"], name="chat_thread_assigne_729c20_idx"),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0003_chatthread_assignment"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="chatmessage",
+            index=models.Index(fields=["thread", "created_at", "id"], name="chat_messag_thread__edfae4_idx"),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Full-text search over chat message bodies: a GIN tsvector index on
+# PostgreSQL, an FTS5 table kept in step by triggers on SQLite
+
+from django.db import migrations
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(body, "
+    "content='chat_messages', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert "
+    "AFTER INSERT ON chat_messages "
+    "BEGIN INSERT INTO chat_messages_fts(rowid, body) "
+    "VALUES (new.rowid, new.body); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete "
+    "AFTER DELETE ON chat_messages "
+    "BEGIN INSERT INTO chat_messages_fts(chat_messages_fts, rowid, body) "
+    "VALUES ('delete', old.rowid, old.body); END",
+    "CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update "
+    "AFTER UPDATE OF body ON chat_messages "
+    "BEGIN INSERT INTO chat_messages_fts(chat_messages_fts, rowid, body) "
+    "VALUES ('delete', old.rowid, old.body); "
+    "INSERT INTO chat_messages_fts(rowid, body) VALUES (new.rowid, new.body); END",
+    "INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS chat_messages_fts_insert",
+    "DROP TRIGGER IF EXISTS chat_messages_fts_delete",
+    "DROP TRIGGER IF EXISTS chat_messages_fts_update",
+    "DROP TABLE IF EXISTS chat_messages_fts",
+]
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS chat_messages_body_fts "
+            "ON chat_messages USING gin (to_tsvector('english', body))"
+        )
+    elif vendor == "sqlite":
+        for statement in SQLITE_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS chat_messages_body_fts")
+    elif vendor == "sqlite":
+        for statement in SQLITE_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("chat", "0004_chatmessage_history_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
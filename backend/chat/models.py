@@ -5,14 +5,31 @@ from users.models import User
 
 
 class ChatThread(models.Model):
+    STATUS_CHOICES = [
+        ("open", "Open"),
+        ("pending", "Pending"),
+        ("closed", "Closed"),
+    ]
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_threads")
     subject = models.TextField(blank=True, null=True)
     metadata = models.JSONField(default=dict, blank=True)
+    status = models.TextField(choices=STATUS_CHOICES, default="open")
+    assigned_to = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="assigned_chat_threads",
+    )
     created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         db_table = "chat_threads"
+        indexes = [
+            models.Index(fields=["assigned_to", "status"]),
+        ]
 
     def __str__(self):
         return f"Chat thread for {self.user.email}"
@@ -29,6 +46,37 @@ class ChatMessage(models.Model):
     class Meta:
         db_table = "chat_messages"
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["thread", "created_at", "id"]),
+        ]
 
     def __str__(self):
         return f"Message from {self.sender} in thread {self.thread.id}"
+
+
+class ChatInbox(models.Model):
+    """
+    One row per thread with the latest message and unread counts, kept
+    current by chat.signals so inbox listings never touch chat_messages.
+    """
+
+    thread = models.OneToOneField(
+        ChatThread, on_delete=models.CASCADE, primary_key=True, related_name="inbox"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="chat_inbox")
+    last_message_at = models.DateTimeField(default=timezone.now)
+    last_message_preview = models.TextField(blank=True, default="")
+    last_message_sender = models.TextField(blank=True, default="")
+    message_count = models.IntegerField(default=0)
+    unread_by_user = models.IntegerField(default=0)  # Support replies not yet seen
+    unread_by_support = models.IntegerField(default=0)  # Member messages not yet seen
+
+    class Meta:
+        db_table = "chat_inbox"
+        indexes = [
+            models.Index(fields=["last_message_at", "thread"]),
+            models.Index(fields=["user", "last_message_at"]),
+        ]
+
+    def __str__(self):
+        return f"Inbox for thread {self.thread_id}"
@@ -0,0 +1,36 @@
+"""
+Chat presence with heartbeat expiry
+
+A user is online while their presence key exists in the cache. Sockets
+refresh it on connect and on every HEARTBEAT; the key expires after
+CHAT_PRESENCE_TTL seconds, so a crashed node or a dropped mobile
+connection goes offline on its own without any cleanup job. With several
+sockets open, closing one clears the key and the next heartbeat from
+another socket brings the user back online.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _key(user_id):
+    return f"chat:presence:{user_id}"
+
+
+def heartbeat(user_id):
+    """Refresh presence, returning True if the user just came online"""
+    timeout = settings.CHAT_PRESENCE_TTL
+    if cache.add(_key(user_id), 1, timeout=timeout):
+        return True
+    cache.touch(_key(user_id), timeout=timeout)
+    return False
+
+
+def leave(user_id):
+    cache.delete(_key(user_id))
+
+
+def online(user_ids):
+    """Subset of user_ids currently online, in one cache round-trip"""
+    keys = {_key(user_id): user_id for user_id in user_ids}
+    return {keys[key] for key in cache.get_many(list(keys))}
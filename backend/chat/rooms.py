@@ -0,0 +1,125 @@
+"""
+Channel-layer groups for chat fan-out
+
+chat_thread_<id>      every socket watching one thread: the member's own
+                      sockets and any agent who has the thread open
+chat_<user id>        all sockets of one member, for thread-level events
+support_agent_<id>    inbox feed of one agent's assigned threads
+support_unassigned    inbox feed of threads nobody has picked up
+
+Messages go to the thread group; agents' inbox feeds only get a small
+thread_activity event, so an agent never receives the same message twice
+and nobody re-fetches a thread's history to notice new activity.
+"""
+
+import logging
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+UNASSIGNED_GROUP = "support_unassigned"
+
+
+def thread_group(thread_id):
+    return f"chat_thread_{thread_id}"
+
+
+def user_group(user_id):
+    return f"chat_{user_id}"
+
+
+def agent_group(agent_id):
+    return f"support_agent_{agent_id}"
+
+
+def feed_group(assigned_to_id):
+    """Inbox feed that should hear about a thread with this assignee"""
+    return agent_group(assigned_to_id) if assigned_to_id else UNASSIGNED_GROUP
+
+
+def message_payload(message):
+    return {
+        "id": str(message.id),
+        "threadId": str(message.thread_id),
+        "body": message.body,
+        "attachments": message.attachments,
+        "sender": message.sender,
+        "timestamp": message.created_at.isoformat(),
+    }
+
+
+def thread_activity(thread, **extra):
+    return {
+        "type": "thread_activity",
+        "thread": {
+            "threadId": str(thread.id),
+            "memberId": str(thread.user_id),
+            "subject": thread.subject,
+            "status": thread.status,
+            "assignedTo": (
+                str(thread.assigned_to_id) if thread.assigned_to_id else None
+            ),
+            **extra,
+        },
+    }
+
+
+async def _send_all(layer, events):
+    for group, event in events:
+        await layer.group_send(group, event)
+
+
+def send_to_groups(events):
+    """group_send each (group, event) pair with a single hop into the loop"""
+    layer = get_channel_layer()
+    if layer is None or not events:
+        return
+    try:
+        async_to_sync(_send_all)(layer, events)
+    except Exception as e:
+        # Real-time delivery is best effort; the message is already saved
+        logger.error(f"Failed to publish chat events: {str(e)}")
+
+
+def message_events(message):
+    """(group, event) pairs announcing a message to its thread and inbox feed"""
+    thread = message.thread
+    payload = message_payload(message)
+    return [
+        (thread_group(thread.id), {"type": "chat_message", "message": payload}),
+        (
+            feed_group(thread.assigned_to_id),
+            thread_activity(thread, lastMessage=payload),
+        ),
+    ]
+
+
+def publish_message(message):
+    """Push a saved message to its thread and the responsible inbox feed"""
+    events = message_events(message)
+    transaction.on_commit(lambda: send_to_groups(events))
+
+
+def publish_thread_opened(thread):
+    """Let the member's sockets join the new thread and agents see it"""
+    events = [
+        (
+            user_group(thread.user_id),
+            {"type": "thread_opened", "threadId": str(thread.id)},
+        ),
+        (feed_group(thread.assigned_to_id), thread_activity(thread)),
+    ]
+    transaction.on_commit(lambda: send_to_groups(events))
+
+
+def publish_assignment(thread, previous_assignee_id):
+    """Move a thread between inbox feeds after (re)assignment"""
+    events = [(feed_group(thread.assigned_to_id), thread_activity(thread))]
+    if feed_group(previous_assignee_id) != feed_group(thread.assigned_to_id):
+        events.append(
+            (feed_group(previous_assignee_id), thread_activity(thread, removed=True))
+        )
+    events.append((thread_group(thread.id), thread_activity(thread)))
+    transaction.on_commit(lambda: send_to_groups(events))
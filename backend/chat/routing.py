@@ -2,6 +2,7 @@ from django.urls import re_path
 from . import consumers
 
 websocket_urlpatterns = [
+    re_path(r"chat/agent/ws", consumers.SupportAgentConsumer.as_asgi()),
     re_path(r"chat/ws", consumers.ChatConsumer.as_asgi()),
 ]
 
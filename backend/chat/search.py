@@ -0,0 +1,136 @@
+"""
+Full-text search over chat message bodies
+
+PostgreSQL matches to_tsvector('english', body) against a prefix tsquery,
+served by the chat_messages_body_fts GIN index. SQLite (development) uses
+the chat_messages_fts FTS5 table, an external-content index over
+chat_messages that triggers keep current on insert, update and delete, so
+bulk_create from the websocket writer is indexed too. Both are created by
+chat migration 0005.
+
+Every term is prefix-matched ("brak pad" finds "Braking pads squeal"), and
+results come newest first through users.pagination's keyset cursor, so the
+member and admin endpoints page the same way as the admin inbox.
+"""
+
+import html
+import re
+from django.db import connection
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+from .models import ChatMessage
+
+TERM_RE = re.compile(r"[^\W_]+")
+MAX_TERMS = 8
+SNIPPET_WORDS = 16
+
+# Placeholders the database wraps around matches; swapped for <mark> tags
+# after the snippet has been HTML-escaped
+START, STOP = "\x02", "\x03"
+
+
+def terms(query):
+    return TERM_RE.findall((query or "").lower())[:MAX_TERMS]
+
+
+def _tsquery(words):
+    return " & ".join(f"{word}:*" for word in words)
+
+
+def _fts_query(words):
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def matching(queryset, words):
+    """Filter a ChatMessage queryset to messages containing every term"""
+    if connection.vendor == "postgresql":
+        condition = RawSQL(
+            "to_tsvector('english', chat_messages.body) @@ to_tsquery('english', %s)",
+            [_tsquery(words)],
+            output_field=BooleanField(),
+        )
+    else:
+        condition = RawSQL(
+            "chat_messages.rowid IN "
+            "(SELECT rowid FROM chat_messages_fts WHERE chat_messages_fts MATCH %s)",
+            [_fts_query(words)],
+            output_field=BooleanField(),
+        )
+    return queryset.filter(condition)
+
+
+def search_messages(queryset, query):
+    """Messages from queryset matching query, or None if it has no terms"""
+    words = terms(query)
+    if not words:
+        return None
+    return matching(queryset, words)
+
+
+def highlights(messages, query):
+    """
+    Return {message id: snippet} for the given page of results
+
+    Snippets are HTML-escaped message text around the matches, with each
+    match wrapped in <mark></mark>.
+    """
+    words = terms(query)
+    ids = [message.pk for message in messages]
+    if not words or not ids:
+        return {}
+
+    if connection.vendor == "postgresql":
+        from django.contrib.postgres.search import SearchHeadline, SearchQuery
+
+        rows = (
+            ChatMessage.objects.filter(pk__in=ids)
+            .annotate(
+                snippet=SearchHeadline(
+                    "body",
+                    SearchQuery(_tsquery(words), config="english", search_type="raw"),
+                    config="english",
+                    start_sel=START,
+                    stop_sel=STOP,
+                    max_words=SNIPPET_WORDS * 2,
+                    min_words=SNIPPET_WORDS,
+                )
+            )
+            .values_list("pk", "snippet")
+        )
+    else:
+        pk_field = ChatMessage._meta.pk
+        placeholders = ", ".join(["%s"] * len(ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT m.id, snippet(chat_messages_fts, 0, %s, %s, '…', %s) "
+                "FROM chat_messages_fts JOIN chat_messages m "
+                "ON m.rowid = chat_messages_fts.rowid "
+                f"WHERE chat_messages_fts MATCH %s AND m.id IN ({placeholders})",
+                [
+                    START,
+                    STOP,
+                    SNIPPET_WORDS,
+                    _fts_query(words),
+                    *[pk_field.get_db_prep_value(pk, connection) for pk in ids],
+                ],
+            )
+            rows = [
+                (pk_field.to_python(pk), snippet)
+                for pk, snippet in cursor.fetchall()
+            ]
+
+    return {
+        pk: html.escape(snippet).replace(START, "<mark>").replace(STOP, "</mark>")
+        for pk, snippet in rows
+    }
+
+
+def rebuild_index():
+    """Repopulate the SQLite FTS table, returning the number of messages"""
+    if connection.vendor == "postgresql":
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO chat_messages_fts(chat_messages_fts) VALUES ('rebuild')"
+        )
+    return ChatMessage.objects.count()
@@ -34,8 +34,9 @@ class ChatThreadSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "user", "created_at"]
 
     def get_last_message(self, obj):
-        last_msg = obj.messages.last()
-        if last_msg:
-            return ChatMessageSerializer(last_msg).data
+        # Read from the prefetched messages rather than querying per thread
+        messages = obj.messages.all()
+        if messages:
+            return ChatMessageSerializer(list(messages)[-1]).data
         return None
 
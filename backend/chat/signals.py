@@ -0,0 +1,28 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .inbox import open_inbox, record_message
+from .models import ChatMessage, ChatThread
+from .rooms import publish_message, publish_thread_opened
+from .writer import threads
+
+
+@receiver(post_save, sender=ChatThread)
+def thread_created(sender, instance, created, **kwargs):
+    if created:
+        open_inbox(instance)
+        publish_thread_opened(instance)
+
+
+@receiver(post_save, sender=ChatMessage)
+def message_created(sender, instance, created, **kwargs):
+    """Keep the thread's inbox row in step and push the message to sockets"""
+    if created:
+        record_message(instance)
+        publish_message(instance)
+
+
+@receiver(post_save, sender=ChatThread)
+def thread_changed(sender, instance, created, **kwargs):
+    """Drop the socket process's cached copy after a status or assignment change"""
+    if not created:
+        threads.forget(instance.id)
@@ -1,9 +1,13 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
+from channels.db import database_sync_to_async
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
 from users.models import User
-from .models import ChatThread, ChatMessage
+from .models import ChatInbox, ChatThread, ChatMessage
 
 
 class ChatAPITest(TestCase):
@@ -94,3 +98,705 @@ class ChatAPITest(TestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+    def test_message_history_pages(self):
+        """Newest page first, then scroll back and forward by message id"""
+        start = timezone.now() - timedelta(hours=1)
+        messages = [
+            ChatMessage.objects.create(
+                thread=self.thread,
+                sender="user",
+                body=f"Message {i}",
+                created_at=start + timedelta(seconds=i // 2),
+            )
+            for i in range(7)
+        ]
+        ordered = sorted(messages, key=lambda m: (m.created_at, m.id))
+        ids = [str(m.id) for m in ordered]
+        url = reverse("chat-message-list", kwargs={"thread_id": self.thread.id})
+
+        response = self.client.get(url, {"limit": 3})
+        self.assertEqual([m["id"] for m in response.data], ids[4:])
+        self.assertEqual(response["X-Has-More"], "true")
+
+        response = self.client.get(url, {"limit": 3, "before": ids[4]})
+        self.assertEqual([m["id"] for m in response.data], ids[1:4])
+        response = self.client.get(url, {"limit": 3, "before": ids[1]})
+        self.assertEqual([m["id"] for m in response.data], ids[:1])
+        self.assertEqual(response["X-Has-More"], "false")
+
+        response = self.client.get(url, {"limit": 4, "after": ids[2]})
+        self.assertEqual([m["id"] for m in response.data], ids[3:])
+        self.assertEqual(response["X-Has-More"], "false")
+
+    def test_message_history_rejects_foreign_cursor(self):
+        other = ChatThread.objects.create(user=self.user, subject="Other")
+        message = ChatMessage.objects.create(thread=other, sender="user", body="Hi")
+        url = reverse("chat-message-list", kwargs={"thread_id": self.thread.id})
+
+        for cursor in (str(message.id), "not-a-uuid"):
+            response = self.client.get(url, {"before": cursor})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ChatInboxTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse("list_chat_threads")
+
+        self.members = [
+            User.objects.create_user(
+                email=f"inbox{i}@example.com", password="testpass123"
+            )
+            for i in range(3)
+        ]
+        self.threads = [
+            ChatThread.objects.create(user=member, subject=f"Issue {i}")
+            for i, member in enumerate(self.members)
+        ]
+
+    def test_inbox_tracks_latest_message_and_unread(self):
+        """Test message inserts keep the preview and unread counts current"""
+        thread = self.threads[0]
+        ChatMessage.objects.create(
+            thread=thread, sender="user", body="My car   won't\\nstart"
+        )
+        ChatMessage.objects.create(thread=thread, sender="user", body="Any update?")
+        ChatMessage.objects.create(thread=thread, sender="support", body="On it")
+
+        inbox = ChatInbox.objects.get(thread=thread)
+        self.assertEqual(inbox.message_count, 3)
+        self.assertEqual(inbox.unread_by_support, 2)
+        self.assertEqual(inbox.unread_by_user, 1)
+        self.assertEqual(inbox.last_message_preview, "On it")
+        self.assertEqual(inbox.last_message_sender, "support")
+
+        # An older message arriving late does not replace the preview
+        ChatMessage.objects.create(
+            thread=thread,
+            sender="user",
+            body="Sent offline",
+            created_at=inbox.last_message_at - timedelta(minutes=5),
+        )
+        inbox.refresh_from_db()
+        self.assertEqual(inbox.last_message_preview, "On it")
+        self.assertEqual(inbox.unread_by_support, 3)
+
+        # The member reading the thread clears their side only
+        member_client = APIClient()
+        member_client.force_authenticate(user=self.members[0])
+        member_client.get(
+            reverse("chat-message-list", kwargs={"thread_id": thread.id})
+        )
+        inbox.refresh_from_db()
+        self.assertEqual(inbox.unread_by_user, 0)
+        self.assertEqual(inbox.unread_by_support, 3)
+
+    def test_inbox_is_sorted_by_recency_in_one_query(self):
+        """Test the admin inbox pages by last activity with a constant query count"""
+        for i, thread in enumerate(self.threads):
+            for _ in range(i + 1):
+                ChatMessage.objects.create(
+                    thread=thread, sender="user", body=f"Hi {i}"
+                )
+        # Oldest thread becomes the most recent
+        ChatMessage.objects.create(
+            thread=self.threads[0], sender="support", body="Latest reply"
+        )
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {"per_page": 2})
+        data = response.json()
+        self.assertEqual(
+            [row["id"] for row in data["results"]],
+            [str(self.threads[0].id), str(self.threads[2].id)],
+        )
+        self.assertEqual(data["results"][0]["last_message"], "Latest reply")
+        self.assertEqual(data["results"][1]["unread_count"], 3)
+
+        response = self.client.get(
+            self.url, {"per_page": 2, "cursor": data["next_cursor"]}
+        )
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]], [str(self.threads[1].id)]
+        )
+
+        response = self.client.get(self.url, {"unread": "true"})
+        self.assertEqual(len(response.json()["results"]), 3)
+
+        response = self.client.get(self.url, {"member": self.members[1].id})
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]], [str(self.threads[1].id)]
+        )
+        response = self.client.get(self.url, {"member": "zzz"})
+        self.assertEqual(response.status_code, 400)
+
+
+class ChatSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        self.other = User.objects.create_user(
+            email="other@example.com", password="testpass123"
+        )
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        self.thread = ChatThread.objects.create(user=self.member, subject="Brakes")
+        other_thread = ChatThread.objects.create(user=self.other, subject="Noise")
+        start = timezone.now() - timedelta(hours=1)
+        for i, body in enumerate([
+            "My brakes squeal when braking <loudly>",
+            "Also the brake pads look worn",
+            "Thanks, see you Monday",
+        ]):
+            ChatMessage.objects.create(
+                thread=self.thread,
+                sender="user",
+                body=body,
+                created_at=start + timedelta(minutes=i),
+            )
+        ChatMessage.objects.create(
+            thread=other_thread, sender="user", body="Brake light is on"
+        )
+
+    def test_member_search_is_scoped_and_highlighted(self):
+        """Test members only find their own messages, with escaped highlights"""
+        self.client.force_authenticate(user=self.member)
+        response = self.client.get(reverse("chat-search"), {"q": "brak"})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bodies = [result["body"] for result in response.data["results"]]
+        self.assertEqual(
+            bodies,
+            ["Also the brake pads look worn", "My brakes squeal when braking <loudly>"],
+        )
+        highlight = response.data["results"][1]["highlight"]
+        self.assertIn("<mark>brakes</mark>", highlight)
+        self.assertIn("&lt;loudly&gt;", highlight)
+        self.assertEqual(response.data["results"][0]["thread_subject"], "Brakes")
+
+        # Every term has to match
+        response = self.client.get(reverse("chat-search"), {"q": "brake pads"})
+        self.assertEqual(len(response.data["results"]), 1)
+
+        response = self.client.get(reverse("chat-search"), {"q": "  "})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        response = self.client.get(
+            reverse("chat-search"), {"q": "brake", "cursor": "not-a-cursor"}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_search_spans_members_and_pages(self):
+        """Test staff search every thread, filter and follow the cursor"""
+        self.client.force_authenticate(user=self.admin)
+        url = reverse("search_chat_messages")
+
+        response = self.client.get(url, {"q": "brake", "per_page": 2})
+        data = response.json()
+        self.assertEqual(len(data["results"]), 2)
+        self.assertEqual(data["results"][0]["member"]["email"], "other@example.com")
+        response = self.client.get(
+            url, {"q": "brake", "per_page": 2, "cursor": data["next_cursor"]}
+        )
+        self.assertEqual(len(response.json()["results"]), 1)
+        self.assertIsNone(response.json()["next_cursor"])
+
+        response = self.client.get(url, {"q": "brake", "member": self.member.id})
+        self.assertEqual(len(response.json()["results"]), 2)
+        for name in ["thread", "member"]:
+            response = self.client.get(url, {"q": "brake", name: "zzz"})
+            self.assertEqual(response.status_code, 400)
+
+        # Edits and deletes keep the index in step
+        ChatMessage.objects.filter(body__startswith="Also").update(body="Pads fine")
+        ChatMessage.objects.filter(body__startswith="Brake light").delete()
+        response = self.client.get(url, {"q": "brake"})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+        self.client.force_authenticate(user=self.member)
+        self.assertEqual(self.client.get(url, {"q": "brake"}).status_code, 403)
+
+class ShardedChannelLayerTest(TestCase):
+    def test_ring_moves_few_keys_when_a_shard_is_added(self):
+        """Test adding a shard only remaps about 1/N of the groups"""
+        from chat.layers import HashRing
+
+        keys = [f"chat_{i}" for i in range(4000)]
+        three = HashRing(["redis://a", "redis://b", "redis://c"])
+        four = HashRing(["redis://a", "redis://b", "redis://c", "redis://d"])
+
+        before = [three.get(key) for key in keys]
+        counts = [before.count(index) for index in range(3)]
+        self.assertGreater(min(counts), 4000 / 3 * 0.8)
+
+        moved = sum(1 for key, index in zip(keys, before) if four.get(key) != index)
+        self.assertLess(moved, 4000 * 0.35)
+        # Only keys claimed by the new shard move
+        for key, index in zip(keys, before):
+            if four.get(key) != index:
+                self.assertEqual(four.get(key), 3)
+
+    def test_layer_routes_through_ring(self):
+        """Test the channel layer picks shards from its hash ring"""
+        from chat.layers import ShardedRedisChannelLayer
+
+        layer = ShardedRedisChannelLayer(
+            hosts=["redis://shard-1:6379/0", "redis://shard-2:6379/0"]
+        )
+        for key in ("chat_1", b"chat_2", "specific.a!b"):
+            name = key.decode("utf8") if isinstance(key, bytes) else key
+            self.assertEqual(layer.consistent_hash(key), layer.ring.get(name))
+
+
+class SupportRealtimeTest(TestCase):
+    def setUp(self):
+        from asgiref.sync import async_to_sync
+        from channels.layers import get_channel_layer
+
+        self.client = APIClient()
+        self.agent = User.objects.create_superuser(
+            email="agent@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.agent)
+        self.member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        self.thread = ChatThread.objects.create(user=self.member, subject="Brakes")
+
+        self.layer = get_channel_layer()
+        self.socket = async_to_sync(self.layer.new_channel)()
+
+    def listen(self, *groups):
+        from asgiref.sync import async_to_sync
+
+        for group in groups:
+            async_to_sync(self.layer.group_add)(group, self.socket)
+
+    def received(self):
+        import asyncio
+        from asgiref.sync import async_to_sync
+
+        async def drain():
+            events = []
+            while True:
+                try:
+                    events.append(
+                        await asyncio.wait_for(self.layer.receive(self.socket), 0.05)
+                    )
+                except asyncio.TimeoutError:
+                    return events
+
+        return async_to_sync(drain)()
+
+    def test_assignment_and_reply_are_pushed(self):
+        """Test assigning a thread moves it between feeds and pushes the reply"""
+        from chat.rooms import UNASSIGNED_GROUP, agent_group, thread_group
+
+        self.listen(thread_group(self.thread.id), agent_group(self.agent.id))
+        url = reverse("assign_chat_thread", args=[self.thread.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url, {"message": "We can see you at 3pm", "status": "pending"}
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["assigned_to"], str(self.agent.id))
+
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.assigned_to, self.agent)
+        self.assertEqual(self.thread.status, "pending")
+
+        events = self.received()
+        messages = [e["message"] for e in events if e["type"] == "chat_message"]
+        self.assertEqual(len(messages), 1)
+        self.assertEqual(messages[0]["body"], "We can see you at 3pm")
+        self.assertEqual(messages[0]["sender"], "support")
+        activity = [e["thread"] for e in events if e["type"] == "thread_activity"]
+        self.assertTrue(any(a.get("lastMessage") for a in activity))
+        self.assertTrue(all(a["assignedTo"] == str(self.agent.id) for a in activity))
+
+        # The detail view no longer trips over a missing status field
+        response = self.client.get(reverse("chat_thread_detail", args=[self.thread.id]))
+        self.assertEqual(response.json()["thread"]["status"], "pending")
+
+        # Member messages on an assigned thread skip the unassigned feed
+        self.listen(UNASSIGNED_GROUP)
+        with self.captureOnCommitCallbacks(execute=True):
+            ChatMessage.objects.create(thread=self.thread, sender="user", body="Thanks")
+        feeds = [e for e in self.received() if e["type"] == "thread_activity"]
+        self.assertEqual(len(feeds), 1)
+
+    def test_presence_expires_without_heartbeat(self):
+        """Test presence follows heartbeats and shows in the admin inbox"""
+        from django.core.cache import cache
+        from chat import presence
+
+        self.assertTrue(presence.heartbeat(self.member.id))
+        self.assertFalse(presence.heartbeat(self.member.id))
+        self.assertEqual(presence.online([self.member.id, self.agent.id]), {self.member.id})
+
+        response = self.client.get(reverse("list_chat_threads"), {"assigned": "none"})
+        self.assertTrue(response.json()["results"][0]["member_online"])
+
+        # Simulate the TTL lapsing after the socket vanished without closing
+        cache.delete(f"chat:presence:{self.member.id}")
+        self.assertEqual(presence.online([self.member.id]), set())
+
+
+class SupportAgentConsumerTest(TransactionTestCase):
+    def test_agent_follows_unassigned_threads_and_subscribes(self):
+        """Test the agent socket hears new activity and a subscribed thread"""
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from membership_auto.asgi import application
+
+        agent = User.objects.create_superuser(
+            email="agent@example.com", password="adminpass123"
+        )
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        thread = ChatThread.objects.create(user=member, subject="Noise")
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                application,
+                f"/chat/agent/ws?token={AccessToken.for_user(agent)}",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            hello = await communicator.receive_json_from()
+            self.assertEqual(hello["type"], "CONNECTED")
+
+            await database_sync_to_async(ChatMessage.objects.create)(
+                thread=thread, sender="user", body="Rattle at 40mph"
+            )
+            activity = await communicator.receive_json_from()
+            self.assertEqual(activity["type"], "THREAD")
+            self.assertEqual(activity["lastMessage"]["body"], "Rattle at 40mph")
+
+            await communicator.send_json_to(
+                {"type": "SUBSCRIBE", "threadId": str(thread.id)}
+            )
+            status = await communicator.receive_json_from()
+            self.assertEqual(status["type"], "PRESENCE")
+            self.assertEqual(status["status"], "offline")
+
+            await communicator.send_json_to(
+                {"type": "SEND", "threadId": str(thread.id), "body": "On it"}
+            )
+            events = [await communicator.receive_json_from() for _ in range(2)]
+            types = sorted(event["type"] for event in events)
+            self.assertEqual(types, ["MESSAGE", "THREAD"])
+
+            # A malformed thread id gets an error frame, not a dropped socket
+            for message_type in ["SUBSCRIBE", "SEND", "READ"]:
+                await communicator.send_json_to(
+                    {"type": message_type, "threadId": "zzz", "body": "Hello"}
+                )
+                error = await communicator.receive_json_from()
+                self.assertEqual(error, {"error": "Thread not found"})
+            await communicator.disconnect()
+
+        async_to_sync(scenario)()
+
+        # Non-staff tokens are refused
+        async def member_tries():
+            communicator = WebsocketCommunicator(
+                application,
+                f"/chat/agent/ws?token={AccessToken.for_user(member)}",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            self.assertFalse(connected)
+
+        async_to_sync(member_tries)()
+
+
+class WriteBehindConsumerTest(TransactionTestCase):
+    def test_member_messages_are_fanned_out_then_saved_in_batches(self):
+        """Test SEND fans out at once, saves in one batch and ACKs the sender"""
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from membership_auto.asgi import application
+        from chat import writer
+
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        other = User.objects.create_user(email="other@example.com", password="pass")
+        thread = ChatThread.objects.create(user=member, subject="Brakes")
+        foreign = ChatThread.objects.create(user=other, subject="Not yours")
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                application,
+                f"/chat/ws?token={AccessToken.for_user(member)}",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_json_from()  # CONNECTED
+
+            for i in range(3):
+                await communicator.send_json_to({
+                    "type": "SEND",
+                    "threadId": str(thread.id),
+                    "body": f"Squeal {i}",
+                    "clientId": f"c{i}",
+                })
+            await communicator.send_json_to({
+                "type": "SEND",
+                "threadId": str(foreign.id),
+                "body": "Hello?",
+                "clientId": "nope",
+            })
+            events = [await communicator.receive_json_from() for _ in range(7)]
+            await communicator.disconnect()
+            return events
+
+        # A full batch flushes at once; the timer alone never fires here
+        with patch.object(writer.writer, "batch_size", 3), patch.object(
+            writer.writer, "interval", 60
+        ), patch("chat.writer.persist", wraps=writer.persist) as persist:
+            events = async_to_sync(scenario)()
+
+        messages = [e for e in events if e["type"] == "MESSAGE"]
+        self.assertEqual(
+            [m["body"] for m in messages], ["Squeal 0", "Squeal 1", "Squeal 2"]
+        )
+        acks = {e["clientId"]: e for e in events if e["type"] == "ACK"}
+        self.assertEqual(set(acks), {"c0", "c1", "c2", "nope"})
+        self.assertFalse(acks["nope"]["ok"])
+        self.assertTrue(all(acks[f"c{i}"]["ok"] for i in range(3)))
+        self.assertEqual(acks["c0"]["id"], messages[0]["id"])
+
+        # All three went down in a single batch, inbox included
+        self.assertEqual(persist.call_count, 1)
+        self.assertEqual(ChatMessage.objects.filter(thread=thread).count(), 3)
+        self.assertFalse(ChatMessage.objects.filter(thread=foreign).exists())
+        inbox = ChatInbox.objects.get(thread=thread)
+        self.assertEqual(inbox.message_count, 3)
+        self.assertEqual(inbox.unread_by_support, 3)
+        self.assertEqual(inbox.last_message_preview, "Squeal 2")
+
+        # Status changes evict the cached thread
+        self.assertIsNotNone(writer.threads.get(thread.id))
+        thread.status = "closed"
+        thread.save()
+        self.assertIsNone(writer.threads.get(thread.id))
+
+    @override_settings(CHAT_WRITE_BEHIND=False)
+    def test_inline_send_to_malformed_thread_is_refused(self):
+        """Test a saved-inline SEND with a malformed thread id is NACKed"""
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from membership_auto.asgi import application
+
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+
+        async def scenario():
+            communicator = WebsocketCommunicator(
+                application,
+                f"/chat/ws?token={AccessToken.for_user(member)}",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_json_from()  # CONNECTED
+            await communicator.send_json_to(
+                {"type": "SEND", "threadId": "zzz", "body": "Hi", "clientId": "c0"}
+            )
+            ack = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return ack
+
+        ack = async_to_sync(scenario)()
+        self.assertEqual(ack["type"], "ACK")
+        self.assertFalse(ack["ok"])
+
+
+class TypingCoalescingTest(TransactionTestCase):
+    @override_settings(CHAT_TYPING_INTERVAL=60, CHAT_TYPING_TIMEOUT=0.2)
+    def test_typing_frames_are_coalesced_and_expire(self):
+        """Test a burst of TYPING frames reaches the agent as one start and one stop"""
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from membership_auto.asgi import application
+
+        agent = User.objects.create_superuser(
+            email="agent@example.com", password="adminpass123"
+        )
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        thread = ChatThread.objects.create(user=member, subject="Wipers")
+
+        async def connect(path, user):
+            communicator = WebsocketCommunicator(
+                application,
+                f"{path}?token={AccessToken.for_user(user)}",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            await communicator.receive_json_from()  # CONNECTED
+            return communicator
+
+        async def typing_events(communicator):
+            events = []
+            while not await communicator.receive_nothing(0.5):
+                event = await communicator.receive_json_from()
+                if event["type"] == "TYPING":
+                    events.append(event)
+            return events
+
+        async def scenario():
+            agent_socket = await connect("/chat/agent/ws", agent)
+            await agent_socket.send_json_to(
+                {"type": "SUBSCRIBE", "threadId": str(thread.id)}
+            )
+            member_socket = await connect("/chat/ws", member)
+            await typing_events(agent_socket)
+
+            typing = {"type": "TYPING", "threadId": str(thread.id), "isTyping": True}
+            for _ in range(10):
+                await member_socket.send_json_to(typing)
+            expired = await typing_events(agent_socket)
+
+            # Typing followed by a message needs no separate stop event
+            await member_socket.send_json_to(typing)
+            await member_socket.send_json_to(
+                {"type": "SEND", "threadId": str(thread.id), "body": "Fixed"}
+            )
+            sent = await typing_events(agent_socket)
+
+            await member_socket.disconnect()
+            await agent_socket.disconnect()
+            return expired, sent
+
+        expired, sent = async_to_sync(scenario)()
+        self.assertEqual([event["isTyping"] for event in expired], [True, False])
+        self.assertEqual(expired[0]["user"], str(member.id))
+        self.assertEqual([event["isTyping"] for event in sent], [True])
+
+
+class SocketAuthCacheTest(TransactionTestCase):
+    def test_reconnects_skip_the_database(self):
+        """Test a token's user is loaded once, then served from the caches"""
+        from asgiref.sync import async_to_sync
+        from channels.testing import WebsocketCommunicator
+        from rest_framework_simplejwt.tokens import AccessToken
+        from membership_auto.asgi import application
+        from chat import auth
+
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        token = AccessToken.for_user(member)
+
+        async def connect(token):
+            communicator = WebsocketCommunicator(
+                application,
+                f"/chat/ws?token={token}&v=2",
+                headers=[(b"host", b"localhost")],
+            )
+            connected, _ = await communicator.connect()
+            if connected:
+                await communicator.disconnect()
+            return connected
+
+        with patch("chat.auth.load_identity", wraps=auth.load_identity) as load:
+            self.assertTrue(async_to_sync(connect)(token))
+            self.assertTrue(async_to_sync(connect)(token))
+            # A fresh process still finds the identity in the shared cache
+            auth.identities.forget(token["jti"])
+            self.assertTrue(async_to_sync(connect)(token))
+            self.assertEqual(load.call_count, 1)
+
+            self.assertFalse(async_to_sync(connect)("not-a-token"))
+            self.assertEqual(load.call_count, 1)
+
+        member.is_active = False
+        member.save()
+        self.assertFalse(async_to_sync(connect)(AccessToken.for_user(member)))
+
+    def test_shared_identities_stay_on_the_event_loop(self):
+        """Test the Redis-backed shared store is used through an async client"""
+        from asgiref.sync import async_to_sync
+        from rest_framework_simplejwt.tokens import AccessToken
+        from chat import auth
+
+        class FakeRedis:
+            def __init__(self):
+                self.values = {}
+
+            async def get(self, key):
+                return self.values.get(key)
+
+            async def set(self, key, value, ex):
+                self.values[key] = value.encode()
+
+        member = User.objects.create_user(
+            email="member@example.com", password="testpass123"
+        )
+        token = AccessToken.for_user(member)
+        redis = FakeRedis()
+        shared = auth.SharedIdentities("redis://shared:6379/0")
+
+        with patch("chat.auth.shared_identities", shared), patch(
+            "chat.auth.aioredis.Redis.from_url", return_value=redis
+        ), patch("chat.auth.cache") as django_cache, patch(
+            "chat.auth.load_identity", wraps=auth.load_identity
+        ) as load:
+            self.assertEqual(async_to_sync(auth.authenticate)(str(token)).id, member.id)
+            # Another process, with an empty LRU, is answered by Redis
+            auth.identities.forget(token["jti"])
+            self.assertEqual(async_to_sync(auth.authenticate)(str(token)).id, member.id)
+
+        self.assertEqual(load.call_count, 1)
+        self.assertIn(f"chat:auth:{token['jti']}", redis.values)
+        django_cache.aget.assert_not_called()
+        django_cache.aset.assert_not_called()
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    def test_loadtest_reports_delivery_and_cleans_up(self):
+        """Test the load harness drives sockets in-process and removes its users"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command(
+            "loadtest_chat",
+            connections=5,
+            agents=1,
+            send_rate=4,
+            typing_rate=4,
+            duration=0.5,
+            drain=5,
+            stdout=out,
+        )
+        output = out.getvalue()
+
+        self.assertIn("6 sockets connected, 0 failed", output)
+        self.assertIn("(0 dropped", output)
+        self.assertIn("Delivery latency ms: p50", output)
+        self.assertFalse(User.objects.filter(email__startswith="loadtest-").exists())
+        self.assertFalse(ChatThread.objects.exists())
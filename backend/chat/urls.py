@@ -1,8 +1,9 @@
 from django.urls import path
-from .views import ChatThreadListView, ChatMessageListView
+from .views import ChatThreadListView, ChatMessageListView, ChatSearchView
 
 urlpatterns = [
     path("threads/", ChatThreadListView.as_view(), name="chat-thread-list"),
     path("threads/<uuid:thread_id>/messages/", ChatMessageListView.as_view(), name="chat-message-list"),
+    path("search/", ChatSearchView.as_view(), name="chat-search"),
 ]
 
@@ -1,8 +1,14 @@
+from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_datetime
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from users.pagination import paginate
+from .history import message_page
+from .inbox import mark_read
 from .models import ChatThread, ChatMessage
+from .search import highlights, search_messages
 from .serializers import ChatThreadSerializer, ChatMessageSerializer
 
 
@@ -41,7 +47,13 @@ class ChatMessageListView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request, thread_id):
-        """List messages in a thread"""
+        """
+        List messages in a thread, newest page first
+
+        ?before=<message id> pages back through older history and
+        ?after=<message id> (or ?since=<timestamp>) fetches newer messages;
+        ?limit= sets the page size.
+        """
         try:
             thread = ChatThread.objects.get(id=thread_id, user=request.user)
         except ChatThread.DoesNotExist:
@@ -50,21 +62,32 @@ class ChatMessageListView(APIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        since = request.query_params.get("since")
-        messages = thread.messages.all()
-
+        params = request.query_params
+        since = params.get("since")
         if since:
             try:
-                from django.utils.dateparse import parse_datetime
-
-                since_dt = parse_datetime(since)
-                if since_dt:
-                    messages = messages.filter(created_at__gt=since_dt)
+                since = parse_datetime(since)
             except (ValueError, TypeError):
-                pass
+                since = None
+
+        try:
+            messages, has_more = message_page(
+                thread,
+                before=params.get("before"),
+                after=params.get("after"),
+                since=since,
+                limit=params.get("limit"),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = ChatMessageSerializer(messages, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        mark_read(thread.id, "user")
+        response = Response(serializer.data, status=status.HTTP_200_OK)
+        # The body stays a plain list for older clients; the header tells
+        # newer ones whether to keep scrolling in the requested direction
+        response["X-Has-More"] = "true" if has_more else "false"
+        return response
 
     def post(self, request, thread_id):
         """Send a message in a thread"""
@@ -94,3 +117,40 @@ class ChatMessageListView(APIView):
 
         serializer = ChatMessageSerializer(message)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class ChatSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        Search the user's own chat messages, newest first
+
+        ?q= is required; pages with ?cursor= and ?per_page= like the admin
+        listings. Each result carries a highlighted snippet.
+        """
+        query = request.query_params.get("q", "")
+        messages = search_messages(
+            ChatMessage.objects.filter(thread__user=request.user), query
+        )
+        if messages is None:
+            return Response(
+                {"error": "Search query is required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            page, meta = paginate(messages.select_related("thread"), request)
+        except (ValueError, ValidationError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        snippets = highlights(page, query)
+        results = [
+            {
+                **ChatMessageSerializer(message).data,
+                "thread_subject": message.thread.subject,
+                "highlight": snippets.get(message.pk, ""),
+            }
+            for message in page
+        ]
+        return Response({"results": results, **meta}, status=status.HTTP_200_OK)
@@ -0,0 +1,123 @@
+"""
+Write-behind persistence for messages sent over the member socket
+
+Saving each SEND with its own database_sync_to_async hop costs a trip
+through the sync thread pool plus a thread lookup and an INSERT, and under
+load the pool becomes the bottleneck. Instead the consumer checks
+ownership against a small per-process thread cache, fans the message out to
+the thread group straight away and queues it here. The queue is written
+with one bulk_create (and one inbox UPDATE per thread) when it reaches
+CHAT_WRITE_BATCH_SIZE messages or CHAT_WRITE_INTERVAL_MS after the first
+message arrived, and each sender then gets an ACK saying whether its
+message was saved.
+
+Messages still queued when a process dies are lost, which is why the window
+is kept to milliseconds and clients resend anything that was never ACKed.
+"""
+
+import asyncio
+import logging
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from .inbox import record_messages
+from .local_cache import LocalCache
+from .models import ChatMessage
+
+logger = logging.getLogger(__name__)
+
+
+def _insert(messages):
+    with transaction.atomic():
+        ChatMessage.objects.bulk_create(messages)
+        record_messages(messages)
+
+
+def persist(messages):
+    """Save a batch, returning the ids of messages that could not be saved"""
+    try:
+        _insert(messages)
+        return set()
+    except DatabaseError as e:
+        # One bad row (say, a thread deleted a moment ago) must not sink the
+        # rest of the batch: retry the messages one at a time
+        logger.warning(f"Chat batch of {len(messages)} failed, retrying: {str(e)}")
+
+    failed = set()
+    for message in messages:
+        try:
+            _insert([message])
+        except DatabaseError as e:
+            logger.error(f"Failed to save chat message {message.id}: {str(e)}")
+            failed.add(message.id)
+    return failed
+
+
+class MessageWriter:
+    """Buffers unsaved ChatMessage instances and saves them in batches"""
+
+    def __init__(self, batch_size, interval):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.loop = None
+        self.reset()
+
+    def reset(self):
+        self.pending = []
+        self.timer = None
+        self.writing = set()
+
+    def submit(self, message):
+        """Queue a message; the returned future resolves to True once saved"""
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            # First use, or a new event loop whose predecessor took its
+            # timers and tasks with it
+            self.loop = loop
+            self.reset()
+
+        saved = loop.create_future()
+        self.pending.append((message, saved))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.interval, self.flush)
+        return saved
+
+    def flush(self):
+        """Start writing everything queued so far"""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        task = self.loop.create_task(self.write(batch))
+        self.writing.add(task)
+        task.add_done_callback(self.writing.discard)
+
+    async def drain(self):
+        """Flush and wait until every queued message has been written"""
+        if self.loop is not asyncio.get_running_loop():
+            return
+        self.flush()
+        if self.writing:
+            await asyncio.gather(*self.writing, return_exceptions=True)
+
+    async def write(self, batch):
+        try:
+            failed = await database_sync_to_async(persist)(
+                [message for message, _ in batch]
+            )
+        except Exception as e:
+            logger.error(f"Failed to save chat messages: {str(e)}")
+            failed = {message.id for message, _ in batch}
+        for message, saved in batch:
+            if not saved.done():
+                saved.set_result(message.id not in failed)
+
+
+threads = LocalCache(settings.CHAT_THREAD_CACHE_SIZE, settings.CHAT_THREAD_CACHE_TTL)
+writer = MessageWriter(
+    settings.CHAT_WRITE_BATCH_SIZE, settings.CHAT_WRITE_INTERVAL_MS / 1000
+)
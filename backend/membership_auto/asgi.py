@@ -9,7 +9,6 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 
 import os
 
-from channels.auth import AuthMiddlewareStack
 from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.security.websocket import AllowedHostsOriginValidator
 from django.core.asgi import get_asgi_application
@@ -21,11 +20,12 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "membership_auto.settings")
 django_asgi_app = get_asgi_application()
 
 from chat import routing
+from chat.auth import TokenAuthMiddleware
 
 application = ProtocolTypeRouter({
     "http": django_asgi_app,
     "websocket": AllowedHostsOriginValidator(
-        AuthMiddlewareStack(
+        TokenAuthMiddleware(
             URLRouter(routing.websocket_urlpatterns)
         )
     ),
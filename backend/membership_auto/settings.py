@@ -64,6 +64,7 @@ INSTALLED_APPS = [
     "settings",
     "payments",
     "notifications",
+    "analytics",
 ]
 
 MIDDLEWARE = [
@@ -243,11 +244,103 @@ SPECTACULAR_SETTINGS = {
 # Channels Configuration (for WebSocket support)
 ASGI_APPLICATION = "membership_auto.asgi.application"
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
-    },
-}
+# Channel layer shards: a comma-separated list of Redis URLs (one database
+# each), e.g. redis://redis-1:6379/0,redis://redis-2:6379/0. Every daphne
+# node must list the same shards in the same form. Without it the in-memory
+# layer is used, which only reaches sockets on the same process.
+CHANNEL_REDIS_URLS = [
+    url.strip() for url in os.getenv("CHANNEL_REDIS_URLS", "").split(",") if url.strip()
+]
+# Undelivered messages held per socket before further group sends skip it
+CHANNEL_LAYER_CAPACITY = int(os.getenv("CHANNEL_LAYER_CAPACITY", "200"))
+# Seconds an undelivered message survives
+CHANNEL_LAYER_EXPIRY = int(os.getenv("CHANNEL_LAYER_EXPIRY", "30"))
+# Seconds a group membership survives without being refreshed. Consumers
+# refresh theirs while connected, so this only bounds how long a crashed
+# node's sockets linger in group fan-out.
+CHANNEL_LAYER_GROUP_EXPIRY = int(os.getenv("CHANNEL_LAYER_GROUP_EXPIRY", "3600"))
+
+if CHANNEL_REDIS_URLS:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "chat.layers.ShardedRedisChannelLayer",
+            "CONFIG": {
+                "hosts": CHANNEL_REDIS_URLS,
+                "capacity": CHANNEL_LAYER_CAPACITY,
+                "expiry": CHANNEL_LAYER_EXPIRY,
+                "group_expiry": CHANNEL_LAYER_GROUP_EXPIRY,
+            },
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer",
+        },
+    }
+
+# Seconds a chat socket stays "online" without a heartbeat; clients are told
+# to send one every half period
+CHAT_PRESENCE_TTL = int(os.getenv("CHAT_PRESENCE_TTL", "60"))
+
+# A socket forwards at most one typing event per thread every
+# CHAT_TYPING_INTERVAL seconds and reports "stopped" after CHAT_TYPING_TIMEOUT
+# seconds without a TYPING frame
+CHAT_TYPING_INTERVAL = float(os.getenv("CHAT_TYPING_INTERVAL", "3"))
+CHAT_TYPING_TIMEOUT = float(os.getenv("CHAT_TYPING_TIMEOUT", "5"))
+
+# Messages per page of chat history, and the most a client may ask for
+CHAT_PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "50"))
+CHAT_MAX_PAGE_SIZE = int(os.getenv("CHAT_MAX_PAGE_SIZE", "200"))
+
+# Member socket messages are fanned out at once and saved in batches of up to
+# CHAT_WRITE_BATCH_SIZE, at most CHAT_WRITE_INTERVAL_MS after they arrive.
+# Set CHAT_WRITE_BEHIND=false to save each message before fanning it out.
+CHAT_WRITE_BEHIND = os.getenv("CHAT_WRITE_BEHIND", "true").lower() == "true"
+CHAT_WRITE_BATCH_SIZE = int(os.getenv("CHAT_WRITE_BATCH_SIZE", "100"))
+CHAT_WRITE_INTERVAL_MS = int(os.getenv("CHAT_WRITE_INTERVAL_MS", "10"))
+# Threads whose ownership a socket process remembers, and for how long
+CHAT_THREAD_CACHE_SIZE = int(os.getenv("CHAT_THREAD_CACHE_SIZE", "10000"))
+CHAT_THREAD_CACHE_TTL = int(os.getenv("CHAT_THREAD_CACHE_TTL", "30"))
+# Seconds a socket process and the shared cache trust a verified access
+# token's user (never past the token's own expiry), and how many to keep
+CHAT_AUTH_CACHE_TTL = int(os.getenv("CHAT_AUTH_CACHE_TTL", "300"))
+CHAT_AUTH_CACHE_SIZE = int(os.getenv("CHAT_AUTH_CACHE_SIZE", "10000"))
+# Redis shared by socket processes for verified identities (read with
+# redis.asyncio); without it the Django cache is used. settings_production
+# points it at REDIS_HOST.
+CHAT_AUTH_REDIS_URL = os.getenv("CHAT_AUTH_REDIS_URL", os.getenv("REDIS_URL", ""))
+
+# Cache Configuration
+# Use Redis if REDIS_URL is set, otherwise fall back to a local-memory cache
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+            "KEY_PREFIX": "membership_auto",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "membership-auto",
+        }
+    }
+
+# How long computed appointment availability stays cached (seconds).
+# Entries are also invalidated whenever an appointment for that day changes.
+AVAILABILITY_CACHE_TIMEOUT = int(os.getenv("AVAILABILITY_CACHE_TIMEOUT", "300"))
+
+# How long revenue/MRR reports stay cached (seconds); payment, membership and
+# plan changes invalidate them immediately
+REVENUE_ANALYTICS_CACHE_TIMEOUT = int(
+    os.getenv("REVENUE_ANALYTICS_CACHE_TIMEOUT", "900")
+)
+
+# Wall-clock budget for one admin search; slower lookups return partial results
+ADMIN_SEARCH_TIME_BUDGET_MS = int(os.getenv("ADMIN_SEARCH_TIME_BUDGET_MS", "500"))
 
 # AWS S3 Configuration
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID", "")
@@ -266,3 +359,39 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@membershipauto.com
 SERVER_EMAIL = os.getenv("SERVER_EMAIL", "noreply@membershipauto.com")
 FRONTEND_URL = os.getenv("FRONTEND_URL", "https://membershipauto.com")
 FIREBASE_SERVICE_ACCOUNT_PATH = os.path.join(BASE_DIR, 'firebase-service-account.json')
+
+# Push sends share one keep-alive HTTP session. A multicast keeps up to
+# PUSH_WORKERS requests in flight, each retried up to PUSH_RETRIES times on
+# 429/5xx and given PUSH_CONNECT_TIMEOUT/PUSH_TIMEOUT seconds to connect/respond.
+PUSH_WORKERS = int(os.getenv("PUSH_WORKERS", "32"))
+PUSH_RETRIES = int(os.getenv("PUSH_RETRIES", "2"))
+PUSH_CONNECT_TIMEOUT = float(os.getenv("PUSH_CONNECT_TIMEOUT", "3"))
+PUSH_TIMEOUT = float(os.getenv("PUSH_TIMEOUT", "10"))
+
+# Notifications raised by requests and jobs are queued in the outbox table and
+# sent by `manage.py run_notification_outbox`. A worker claims up to
+# NOTIFICATION_OUTBOX_BATCH_SIZE at a time for NOTIFICATION_OUTBOX_LEASE
+# seconds; sends that reach no device are retried after
+# NOTIFICATION_OUTBOX_RETRY_DELAY seconds, doubling each time, up to
+# NOTIFICATION_OUTBOX_MAX_ATTEMPTS attempts. Every deployment needs a worker
+# (the notification-worker container in docker-compose and the ECS task); set
+# NOTIFICATION_OUTBOX=false to send inline where none runs.
+NOTIFICATION_OUTBOX = os.getenv("NOTIFICATION_OUTBOX", "true").lower() == "true"
+NOTIFICATION_OUTBOX_BATCH_SIZE = int(os.getenv("NOTIFICATION_OUTBOX_BATCH_SIZE", "200"))
+NOTIFICATION_OUTBOX_LEASE = int(os.getenv("NOTIFICATION_OUTBOX_LEASE", "300"))
+NOTIFICATION_OUTBOX_RETRY_DELAY = int(
+    os.getenv("NOTIFICATION_OUTBOX_RETRY_DELAY", "30")
+)
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = int(
+    os.getenv("NOTIFICATION_OUTBOX_MAX_ATTEMPTS", "6")
+)
+
+# Seconds after an Expo push before `manage.py poll_expo_receipts` asks for its
+# delivery receipt (Expo usually has it within 15 minutes)
+EXPO_RECEIPT_DELAY = int(os.getenv("EXPO_RECEIPT_DELAY", "900"))
+
+# Broadcast workers send BROADCAST_BATCH_SIZE devices at a time, saving
+# progress after each batch; a running broadcast with no progress for
+# BROADCAST_STALE_AFTER seconds is taken over and resumed by another worker
+BROADCAST_BATCH_SIZE = int(os.getenv("BROADCAST_BATCH_SIZE", "1000"))
+BROADCAST_STALE_AFTER = int(os.getenv("BROADCAST_STALE_AFTER", "300"))
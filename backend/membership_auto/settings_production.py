@@ -27,16 +27,37 @@ DATABASES = {
     }
 }
 
-# Channel Layers - Redis (ElastiCache for WebSocket)
+# Channel Layers - Redis (ElastiCache for WebSocket), sharded when
+# CHANNEL_REDIS_URLS lists several nodes
 CHANNEL_LAYERS = {
     'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
+        'BACKEND': 'chat.layers.ShardedRedisChannelLayer',
         'CONFIG': {
-            "hosts": [(os.environ.get('REDIS_HOST', 'localhost'), 6379)],
+            "hosts": CHANNEL_REDIS_URLS or [
+                f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/0"
+            ],
+            "capacity": CHANNEL_LAYER_CAPACITY,
+            "expiry": CHANNEL_LAYER_EXPIRY,
+            "group_expiry": CHANNEL_LAYER_GROUP_EXPIRY,
         },
     },
 }
 
+# Cache - Redis (ElastiCache, separate DB from the channel layer)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/1",
+        'KEY_PREFIX': 'membership_auto',
+    }
+}
+
+# Chat socket identities - read with redis.asyncio, its own DB on the same host
+CHAT_AUTH_REDIS_URL = os.environ.get(
+    'CHAT_AUTH_REDIS_URL',
+    f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:6379/2",
+)
+
 # CORS - Update with your Amplify frontend domain
 CORS_ALLOWED_ORIGINS = os.environ.get('CORS_ALLOWED_ORIGINS', '').split(',')
 
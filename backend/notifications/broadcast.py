@@ -0,0 +1,297 @@
+"""
+Segmented push broadcasts for offers and announcements
+
+A Broadcast names an audience instead of a list of members. Its filters
+combine with AND:
+
+- plan_tiers: members whose active membership is on one of these tiers
+- active_membership: members with an active membership of any plan
+- vehicle_makes: members with a vehicle of one of these makes (any case)
+- location_ids / near {lat, lng, radius_km}: members who have booked at one
+  of these locations, or at a location within the radius
+
+The audience is resolved into one Device query, with EXISTS subqueries for
+the filters, and streamed with iterator() in push token order. The same
+token registered to two accounts is therefore seen twice in a row and sent
+once, without keeping a set of every token. Tokens go to
+fcm_service.send_each in batches of BROADCAST_BATCH_SIZE, each batch is
+logged with one insert, and the broadcast row records progress and the last
+token sent. A worker that dies leaves the broadcast "running" with a stale
+updated_at; the next worker claims it and carries on after that token.
+
+Each claim stores a fresh claim_token, and every progress update is
+conditional on it. A worker that was only slow, and lost its broadcast to
+another, therefore stops after the batch it has in flight instead of
+sending the rest of the audience a second time.
+"""
+
+import logging
+import uuid
+from datetime import timedelta
+from itertools import islice
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from django.conf import settings
+from django.db.models import Exists, F, OuterRef, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from appointments.geo import get_location_index
+from appointments.models import Appointment
+from users.models import Membership
+from vehicles.models import Vehicle
+from .fcm_service import fcm_service
+from .models import Broadcast, Device, NotificationLog
+from .utils import log_entry, prune_dead_devices
+
+logger = logging.getLogger(__name__)
+
+MAX_RADIUS_KM = 500
+
+
+def _strings(value, name):
+    if not isinstance(value, list) or not all(
+        isinstance(item, str) and item.strip() for item in value
+    ):
+        raise ValueError(f"{name} must be a list of strings")
+    return [item.strip() for item in value]
+
+
+def clean_audience(data) -> Dict:
+    """
+    Validate audience filters from an API request
+
+    Raises:
+        ValueError: if a filter is unknown or malformed
+    """
+    if data is None:
+        return {}
+    if not isinstance(data, dict):
+        raise ValueError("audience must be an object")
+    unknown = set(data) - {
+        "plan_tiers",
+        "active_membership",
+        "vehicle_makes",
+        "location_ids",
+        "near",
+    }
+    if unknown:
+        raise ValueError(f"Unsupported audience filter: {', '.join(sorted(unknown))}")
+
+    audience = {}
+    for name in ["plan_tiers", "vehicle_makes", "location_ids"]:
+        if data.get(name):
+            audience[name] = _strings(data[name], name)
+    try:
+        for location_id in audience.get("location_ids", []):
+            uuid.UUID(location_id)
+    except ValueError:
+        raise ValueError("location_ids must be location UUIDs")
+    if data.get("active_membership"):
+        audience["active_membership"] = True
+
+    near = data.get("near")
+    if near:
+        if not isinstance(near, dict):
+            raise ValueError("near must be an object with lat, lng and radius_km")
+        try:
+            lat, lng = float(near["lat"]), float(near["lng"])
+            radius_km = float(near.get("radius_km", 25))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError("near needs numeric lat, lng and radius_km")
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            raise ValueError("near coordinates out of range")
+        if not 0 < radius_km <= MAX_RADIUS_KM:
+            raise ValueError(f"radius_km must be between 0 and {MAX_RADIUS_KM}")
+        audience["near"] = {"lat": lat, "lng": lng, "radius_km": radius_km}
+    return audience
+
+
+def _location_ids(audience) -> Optional[set]:
+    """Locations the audience is limited to, or None for anywhere"""
+    if "location_ids" not in audience and "near" not in audience:
+        return None
+    location_ids = set(audience.get("location_ids", []))
+    near = audience.get("near")
+    if near:
+        location_ids.update(
+            str(location_id)
+            for location_id, _ in get_location_index().nearest(
+                near["lat"], near["lng"], radius_km=near["radius_km"]
+            )
+        )
+    return location_ids
+
+
+def audience_devices(audience: Dict, now=None):
+    """Active devices of active members matching every audience filter"""
+    now = now or timezone.now()
+    devices = Device.objects.filter(is_active=True, user__is_active=True)
+
+    if audience.get("active_membership") or audience.get("plan_tiers"):
+        memberships = Membership.objects.filter(
+            Q(next_billing_at__isnull=True) | Q(next_billing_at__gt=now),
+            user=OuterRef("user_id"),
+            status="active",
+        )
+        if audience.get("plan_tiers"):
+            memberships = memberships.filter(plan__tier__in=audience["plan_tiers"])
+        devices = devices.filter(Exists(memberships))
+
+    if audience.get("vehicle_makes"):
+        vehicles = Vehicle.objects.annotate(make_lower=Lower("make")).filter(
+            user=OuterRef("user_id"),
+            make_lower__in=[make.lower() for make in audience["vehicle_makes"]],
+        )
+        devices = devices.filter(Exists(vehicles))
+
+    location_ids = _location_ids(audience)
+    if location_ids is not None:
+        if not location_ids:
+            return devices.none()
+        bookings = Appointment.objects.filter(
+            user=OuterRef("user_id"), location_id__in=location_ids
+        ).exclude(status="cancelled")
+        devices = devices.filter(Exists(bookings))
+
+    return devices
+
+
+def audience_size(audience: Dict) -> int:
+    """Number of distinct push tokens the audience resolves to"""
+    return audience_devices(audience).values("push_token").distinct().count()
+
+
+def audience_tokens(
+    audience: Dict, after: Optional[str] = None, chunk_size: int = 2000
+) -> Iterator[Tuple]:
+    """
+    Stream (device_id, user_id, push_token) in token order, once per token
+
+    Args:
+        after: only tokens after this one (a broadcast's cursor)
+    """
+    devices = audience_devices(audience)
+    if after is not None:
+        devices = devices.filter(push_token__gt=after)
+    rows = devices.order_by("push_token", "user_id").values_list(
+        "id", "user_id", "push_token"
+    )
+    previous = None
+    for row in rows.iterator(chunk_size=chunk_size):
+        if row[2] == previous:
+            continue
+        previous = row[2]
+        yield row
+
+
+def claim_broadcast(now=None) -> Optional[Broadcast]:
+    """
+    Take the oldest pending broadcast, or a running one whose worker has
+    made no progress for BROADCAST_STALE_AFTER seconds
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.BROADCAST_STALE_AFTER)
+    candidates = Broadcast.objects.filter(
+        Q(status="pending") | Q(status="running", updated_at__lt=stale)
+    ).order_by("created_at")
+    for broadcast in candidates[:10]:
+        # Conditional on the row being unchanged, so only one worker wins
+        claimed = Broadcast.objects.filter(
+            pk=broadcast.pk, status=broadcast.status, updated_at=broadcast.updated_at
+        ).update(status="running", updated_at=now, claim_token=uuid.uuid4())
+        if claimed:
+            Broadcast.objects.filter(pk=broadcast.pk, started_at__isnull=True).update(
+                started_at=now
+            )
+            if broadcast.started_at:
+                logger.warning(
+                    f"Resuming broadcast {broadcast.pk} after {broadcast.cursor}"
+                )
+            broadcast.refresh_from_db()
+            return broadcast
+    return None
+
+
+def _send_batch(broadcast: Broadcast, batch: List[Tuple]) -> Dict:
+    results = fcm_service.send_each(
+        [
+            {
+                "token": token,
+                "title": broadcast.title,
+                "body": broadcast.body,
+                "data": broadcast.data,
+                "image_url": broadcast.image_url,
+            }
+            for _, _, token in batch
+        ]
+    )
+    logs = []
+    for (device_id, user_id, _), result in zip(batch, results):
+        log = log_entry(
+            user_id,
+            None,
+            broadcast.notification_type,
+            broadcast.title,
+            broadcast.body,
+            broadcast.data,
+            result,
+        )
+        log.device_id = device_id
+        logs.append(log)
+    NotificationLog.objects.bulk_create(logs)
+    prune_dead_devices(
+        (device_id, result) for (device_id, _, _), result in zip(batch, results)
+    )
+    success_count = sum(1 for result in results if result.get("success"))
+    return {
+        "success_count": success_count,
+        "failure_count": len(results) - success_count,
+    }
+
+
+def run_broadcast(
+    broadcast: Broadcast,
+    batch_size: Optional[int] = None,
+    keep_going: Optional[Callable[[], bool]] = None,
+) -> Broadcast:
+    """
+    Send a claimed broadcast from its cursor to the end of the audience
+
+    Stops early, leaving the cursor in place, if the broadcast is cancelled
+    or taken over by another worker. When keep_going returns False between
+    batches (the worker is shutting down) the broadcast goes back to pending
+    so any worker can resume it straight away.
+    """
+    batch_size = batch_size or settings.BROADCAST_BATCH_SIZE
+    # Every update below only applies while this worker still holds the claim
+    mine = Broadcast.objects.filter(
+        pk=broadcast.pk, status="running", claim_token=broadcast.claim_token
+    )
+    tokens = audience_tokens(broadcast.audience, after=broadcast.cursor)
+    while True:
+        if keep_going is not None and not keep_going():
+            mine.update(status="pending", claim_token=None, updated_at=timezone.now())
+            break
+
+        batch = list(islice(tokens, batch_size))
+        if not batch:
+            now = timezone.now()
+            mine.update(status="completed", completed_at=now, updated_at=now)
+            break
+
+        counts = _send_batch(broadcast, batch)
+        # Saving progress doubles as the cancellation and takeover check
+        progressed = mine.update(
+            cursor=batch[-1][2],
+            recipients=F("recipients") + len(batch),
+            success_count=F("success_count") + counts["success_count"],
+            failure_count=F("failure_count") + counts["failure_count"],
+            updated_at=timezone.now(),
+        )
+        if not progressed:
+            logger.warning(
+                f"Broadcast {broadcast.pk} was cancelled or taken over; stopping"
+            )
+            break
+
+    broadcast.refresh_from_db()
+    return broadcast
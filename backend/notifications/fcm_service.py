@@ -8,29 +8,94 @@ Setup:
 1. Download service account JSON from Firebase Console
 2. Set FIREBASE_SERVICE_ACCOUNT_PATH in settings to the path of the JSON file
 3. Install required packages: pip install google-auth google-api-python-client
+
+Every send goes through one keep-alive requests.Session, so a multicast
+reuses a handful of TLS connections instead of opening one per device, and
+send_multicast/send_each spread the requests over a bounded worker pool of
+PUSH_WORKERS threads. Throttling (429) and server errors (5xx) are retried
+with backoff up to PUSH_RETRIES times.
+
+Expo push tokens are sent through Expo's push API, which takes up to 100
+messages per request: send_each groups them into chunks of EXPO_BATCH_SIZE
+and maps each returned ticket back to the message it belongs to.
+
+Failed results carry the provider's error code as error_code when there is
+one; is_dead_token tells whether it means the token will never work again.
 """
 
 import json
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from pathlib import Path
 from django.conf import settings
 from google.oauth2 import service_account
 from google.auth.transport.requests import Request
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import requests
 
 logger = logging.getLogger(__name__)
 
 
+def build_session(pool_size: int, retries: int) -> requests.Session:
+    """Keep-alive session with room for pool_size connections per host"""
+    retry = Retry(
+        total=retries,
+        # A request that timed out may already have been delivered, so only
+        # connection failures and retryable statuses are tried again
+        read=0,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["POST"],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=4, pool_maxsize=pool_size, max_retries=retry, pool_block=True
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _failed(error: str, count: int) -> List[Dict]:
+    return [{"success": False, "error": error} for _ in range(count)]
+
+
+# Error codes meaning the device token is gone for good (the app was
+# uninstalled or the token was never valid), as opposed to a failed attempt
+DEAD_TOKEN_ERRORS = {"UNREGISTERED", "INVALID_ARGUMENT", "DeviceNotRegistered"}
+
+
+def is_dead_token(result: Dict) -> bool:
+    return result.get("error_code") in DEAD_TOKEN_ERRORS
+
+
+def is_expo_token(token: str) -> bool:
+    return token.startswith("ExponentPushToken[") or token.startswith("ExpoPushToken[")
+
+
 class FCMService:
     """Firebase Cloud Messaging v1 API Service"""
 
     FCM_ENDPOINT = "https://fcm.googleapis.com/v1/projects/{project_id}/messages:send"
     SCOPES = ["https://www.googleapis.com/auth/firebase.messaging"]
+    EXPO_ENDPOINT = "https://exp.host/--/api/v2/push/send"
+    EXPO_BATCH_SIZE = 100
+    EXPO_RECEIPTS_ENDPOINT = "https://exp.host/--/api/v2/push/getReceipts"
+    EXPO_RECEIPT_BATCH_SIZE = 1000
 
     def __init__(self):
         self.project_id = None
         self.credentials = None
+        self.token_lock = threading.Lock()
+        self.session = build_session(settings.PUSH_WORKERS, settings.PUSH_RETRIES)
+        self.timeout = (settings.PUSH_CONNECT_TIMEOUT, settings.PUSH_TIMEOUT)
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.PUSH_WORKERS, thread_name_prefix="push"
+        )
         self._initialize()
 
     def _initialize(self):
@@ -71,15 +136,17 @@ class FCMService:
         if not self.credentials:
             return None
 
-        try:
-            # Refresh token if expired
-            if not self.credentials.valid:
-                self.credentials.refresh(Request())
+        # Workers share the credentials, so only one of them refreshes
+        with self.token_lock:
+            try:
+                # Refresh token if expired
+                if not self.credentials.valid:
+                    self.credentials.refresh(Request(self.session))
 
-            return self.credentials.token
-        except Exception as e:
-            logger.error(f"Failed to get access token: {str(e)}")
-            return None
+                return self.credentials.token
+            except Exception as e:
+                logger.error(f"Failed to get access token: {str(e)}")
+                return None
 
     def send_notification(
         self,
@@ -104,6 +171,10 @@ class FCMService:
         Returns:
             Dict with success status and message/error
         """
+        # Handle Expo push tokens (send via Expo's service instead)
+        if is_expo_token(token):
+            return self._send_expo_notification(token, title, body, data)
+
         if not self.credentials or not self.project_id:
             return {
                 "success": False,
@@ -114,10 +185,6 @@ class FCMService:
         if not access_token:
             return {"success": False, "error": "Failed to get access token"}
 
-        # Handle Expo push tokens (send via Expo's service instead)
-        if token.startswith("ExponentPushToken[") or token.startswith("ExpoPushToken["):
-            return self._send_expo_notification(token, title, body, data)
-
         # Build FCM message
         message = {
             "message": {
@@ -159,17 +226,32 @@ class FCMService:
                 "Content-Type": "application/json",
             }
 
-            response = requests.post(url, headers=headers, json=message, timeout=10)
+            response = self.session.post(
+                url, headers=headers, json=message, timeout=self.timeout
+            )
 
             if response.status_code == 200:
                 logger.info(f"Notification sent successfully to {token[:20]}...")
                 return {"success": True, "message_id": response.json().get("name")}
             else:
-                error_msg = response.json().get("error", {}).get("message", "Unknown error")
+                error = response.json().get("error", {})
+                error_msg = error.get("message", "Unknown error")
                 logger.error(
                     f"Failed to send notification: {response.status_code} - {error_msg}"
                 )
-                return {"success": False, "error": error_msg}
+                result = {"success": False, "error": error_msg}
+                # FCM puts the specific reason (e.g. UNREGISTERED) in details
+                error_code = next(
+                    (
+                        detail["errorCode"]
+                        for detail in error.get("details", [])
+                        if detail.get("errorCode")
+                    ),
+                    error.get("status"),
+                )
+                if error_code:
+                    result["error_code"] = error_code
+                return result
 
         except Exception as e:
             logger.error(f"Exception sending notification: {str(e)}")
@@ -179,38 +261,155 @@ class FCMService:
         self, token: str, title: str, body: str, data: Optional[Dict] = None
     ) -> Dict:
         """Send notification via Expo push service"""
-        try:
+        return self.send_expo_batch(
+            [{"token": token, "title": title, "body": body, "data": data}]
+        )[0]
+
+    def send_expo_batch(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Send up to EXPO_BATCH_SIZE notifications in one Expo push request
+
+        Each message is a dict of send_notification keyword arguments.
+
+        Returns:
+            List of results in the order of messages. Successful sends carry
+            the Expo ticket id as message_id; failures carry Expo's error
+            code (e.g. DeviceNotRegistered) as error_code when it gives one.
+        """
+        expo_messages = []
+        for message in messages:
             expo_message = {
-                "to": token,
-                "title": title,
-                "body": body,
+                "to": message["token"],
+                "title": message["title"],
+                "body": message["body"],
                 "sound": "default",
-                "priority": "high",
+                "priority": message.get("priority") or "high",
             }
+            if message.get("data"):
+                expo_message["data"] = message["data"]
+            expo_messages.append(expo_message)
 
-            if data:
-                expo_message["data"] = data
-
-            response = requests.post(
-                "https://exp.host/--/api/v2/push/send",
-                json=expo_message,
+        try:
+            response = self.session.post(
+                self.EXPO_ENDPOINT,
+                json=expo_messages,
                 headers={"Content-Type": "application/json"},
-                timeout=10,
+                timeout=self.timeout,
             )
 
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("data", {}).get("status") == "ok":
-                    return {"success": True, "message_id": result.get("data", {}).get("id")}
-                else:
-                    error = result.get("data", {}).get("message", "Unknown error")
-                    return {"success": False, "error": error}
-            else:
-                return {"success": False, "error": f"HTTP {response.status_code}"}
+            if response.status_code != 200:
+                logger.error(
+                    f"Expo push request failed: {response.status_code} - "
+                    f"{response.text[:200]}"
+                )
+                return _failed(f"HTTP {response.status_code}", len(messages))
+
+            tickets = response.json().get("data") or []
+            if len(tickets) != len(messages):
+                error = f"Expected {len(messages)} Expo tickets, got {len(tickets)}"
+                logger.error(error)
+                return _failed(error, len(messages))
 
         except Exception as e:
-            logger.error(f"Exception sending Expo notification: {str(e)}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"Exception sending Expo notifications: {str(e)}")
+            return _failed(str(e), len(messages))
+
+        return [self._expo_result(ticket) for ticket in tickets]
+
+    def _expo_result(self, ticket: Dict) -> Dict:
+        """Convert an Expo push ticket or receipt into a send result"""
+        if ticket.get("status") == "ok":
+            result = {"success": True}
+            if ticket.get("id"):
+                result["message_id"] = ticket["id"]
+            return result
+        result = {"success": False, "error": ticket.get("message", "Unknown error")}
+        error_code = (ticket.get("details") or {}).get("error")
+        if error_code:
+            result["error_code"] = error_code
+        return result
+
+    def get_expo_receipts(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch Expo push receipts, EXPO_RECEIPT_BATCH_SIZE ids per request
+
+        Returns:
+            Dict of ticket id to result ({"success": True}, or a failure with
+            error and error_code). Tickets whose receipt is not ready yet, or
+            whose request failed, are left out.
+        """
+        batches = [
+            ticket_ids[start : start + self.EXPO_RECEIPT_BATCH_SIZE]
+            for start in range(0, len(ticket_ids), self.EXPO_RECEIPT_BATCH_SIZE)
+        ]
+        receipts = {}
+        for batch in self.executor.map(self._fetch_expo_receipts, batches):
+            receipts.update(batch)
+        return receipts
+
+    def _fetch_expo_receipts(self, ticket_ids: List[str]) -> Dict[str, Dict]:
+        try:
+            response = self.session.post(
+                self.EXPO_RECEIPTS_ENDPOINT,
+                json={"ids": ticket_ids},
+                headers={"Content-Type": "application/json"},
+                timeout=self.timeout,
+            )
+            if response.status_code != 200:
+                logger.error(
+                    f"Expo receipt request failed: {response.status_code} - "
+                    f"{response.text[:200]}"
+                )
+                return {}
+            receipts = response.json().get("data") or {}
+        except Exception as e:
+            logger.error(f"Exception fetching Expo receipts: {str(e)}")
+            return {}
+        return {
+            ticket_id: self._expo_result(receipt)
+            for ticket_id, receipt in receipts.items()
+        }
+
+    def send_each(self, messages: List[Dict]) -> List[Dict]:
+        """
+        Send many notifications concurrently
+
+        Each message is a dict of send_notification keyword arguments. Expo
+        tokens go out EXPO_BATCH_SIZE per request and FCM tokens one per
+        request, with at most PUSH_WORKERS requests in flight at once.
+
+        Returns:
+            List of send_notification results, in the order of messages
+        """
+        expo = [
+            i for i, message in enumerate(messages) if is_expo_token(message["token"])
+        ]
+        jobs = [
+            (expo[start : start + self.EXPO_BATCH_SIZE], self.send_expo_batch)
+            for start in range(0, len(expo), self.EXPO_BATCH_SIZE)
+        ]
+        jobs += [
+            ([i], lambda batch: [self.send_notification(**batch[0])])
+            for i, message in enumerate(messages)
+            if not is_expo_token(message["token"])
+        ]
+
+        if len(jobs) < 2:
+            sent = [send([messages[i] for i in indexes]) for indexes, send in jobs]
+        else:
+            sent = [
+                future.result()
+                for future in [
+                    self.executor.submit(send, [messages[i] for i in indexes])
+                    for indexes, send in jobs
+                ]
+            ]
+
+        results = [None] * len(messages)
+        for (indexes, _), batch_results in zip(jobs, sent):
+            for i, result in zip(indexes, batch_results):
+                results[i] = result
+        return results
 
     def send_multicast(
         self,
@@ -226,12 +425,24 @@ class FCMService:
         Returns:
             Dict with success_count, failure_count, and results list
         """
+        sent = self.send_each(
+            [
+                {
+                    "token": token,
+                    "title": title,
+                    "body": body,
+                    "data": data,
+                    "image_url": image_url,
+                }
+                for token in tokens
+            ]
+        )
+
         results = []
         success_count = 0
         failure_count = 0
 
-        for token in tokens:
-            result = self.send_notification(token, title, body, data, image_url)
+        for token, result in zip(tokens, sent):
             results.append({"token": token[:20] + "...", "result": result})
 
             if result.get("success"):
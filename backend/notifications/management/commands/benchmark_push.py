@@ -0,0 +1,160 @@
+"""
+Management command to measure push notification throughput
+
+Starts a mock FCM v1 endpoint on localhost that answers every send after
+--latency milliseconds (standing in for the round trip to Google), then
+sends --messages notifications to it: once with a bare requests.post per
+message, which opens a new connection each time as push sends used to, and
+once through FCMService.send_multicast with its keep-alive session and
+worker pool. With --tokens expo the mock plays Expo's push API instead, and
+the pooled run sends EXPO_BATCH_SIZE messages per request. Nothing is
+written to the database and no device is contacted.
+
+Usage:
+    python manage.py benchmark_push [--messages 1000] [--latency 20] \\
+        [--workers 32] [--mode both|serial|pooled] [--tokens fcm|expo]
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+from notifications.fcm_service import FCMService, is_expo_token
+
+
+class MockFCMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length))
+        time.sleep(self.server.latency)
+        count = len(body) if isinstance(body, list) else 1
+        with self.server.lock:
+            first = self.server.received + 1
+            self.server.received += count
+            self.server.requests += 1
+        if isinstance(body, list):
+            # Expo push API: one ticket per message
+            tickets = [
+                {"status": "ok", "id": f"ticket-{first + i}"} for i in range(count)
+            ]
+            payload = json.dumps({"data": tickets}).encode()
+        else:
+            name = f"projects/benchmark/messages/{first}"
+            payload = json.dumps({"name": name}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BenchmarkCredentials:
+    """Stands in for service account credentials; the mock never checks them"""
+
+    valid = True
+    token = "benchmark-access-token"
+
+
+def _message(token, i):
+    if is_expo_token(token):
+        return [{"to": token, "title": "Benchmark", "body": f"Notification {i}"}]
+    return {
+        "message": {
+            "token": token,
+            "notification": {"title": "Benchmark", "body": f"Notification {i}"},
+        }
+    }
+
+
+class Command(BaseCommand):
+    help = "Measure push notification throughput against a mock push server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1000)
+        parser.add_argument(
+            "--latency",
+            type=int,
+            default=20,
+            help="Milliseconds the mock server takes to answer each send",
+        )
+        parser.add_argument(
+            "--workers", type=int, help="Concurrent sends (default PUSH_WORKERS)"
+        )
+        parser.add_argument(
+            "--mode", choices=["both", "serial", "pooled"], default="both"
+        )
+        parser.add_argument("--tokens", choices=["fcm", "expo"], default="fcm")
+
+    def handle(self, *args, **options):
+        if options["messages"] < 1 or options["latency"] < 0:
+            raise CommandError("messages must be positive and latency not negative")
+        modes = [options["mode"]]
+        if options["mode"] == "both":
+            modes = ["serial", "pooled"]
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), MockFCMHandler)
+        server.daemon_threads = True
+        server.latency = options["latency"] / 1000
+        server.lock = threading.Lock()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = f"http://127.0.0.1:{server.server_port}"
+        if options["tokens"] == "expo":
+            endpoint = f"{host}/--/api/v2/push/send"
+            token = "ExponentPushToken[benchmark-{}]"
+        else:
+            endpoint = host + "/v1/projects/{project_id}/messages:send"
+            token = "benchmark-device-{}"
+        tokens = [token.format(i) for i in range(options["messages"])]
+
+        try:
+            for mode in modes:
+                server.received = server.requests = 0
+                started = time.perf_counter()
+                if mode == "serial":
+                    sent = self.send_serial(endpoint, tokens)
+                else:
+                    sent = self.send_pooled(endpoint, tokens, options["workers"])
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f"{mode:>6}: {len(tokens)} messages in {elapsed:.2f}s "
+                    f"({len(tokens) / elapsed:.0f} msg/s), {sent} sent, "
+                    f"{server.received} received in {server.requests} requests"
+                )
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        self.stdout.write(self.style.SUCCESS("✅ Benchmark complete"))
+
+    def send_serial(self, endpoint, tokens):
+        url = endpoint.format(project_id="benchmark")
+        headers = {"Authorization": f"Bearer {BenchmarkCredentials.token}"}
+        sent = 0
+        for i, token in enumerate(tokens):
+            response = requests.post(
+                url, headers=headers, json=_message(token, i), timeout=10
+            )
+            sent += response.status_code == 200
+        return sent
+
+    def send_pooled(self, endpoint, tokens, workers):
+        overrides = {"PUSH_WORKERS": workers} if workers else {}
+        with override_settings(**overrides):
+            service = FCMService()
+        service.FCM_ENDPOINT = service.EXPO_ENDPOINT = endpoint
+        service.project_id = "benchmark"
+        service.credentials = BenchmarkCredentials()
+        try:
+            result = service.send_multicast(tokens, "Benchmark", "Notification")
+        finally:
+            service.executor.shutdown()
+            service.session.close()
+        return result["success_count"]
@@ -0,0 +1,45 @@
+"""
+Management command to record Expo delivery receipts
+This should be run as a cron job every 15 minutes
+
+Looks up receipts for Expo notifications logged as sent, marks them
+delivered or failed and deactivates devices Expo reports as unregistered.
+
+Usage: python manage.py poll_expo_receipts [--batch-size 10000]
+Cron: */15 * * * * cd /path/to/project && python manage.py poll_expo_receipts
+"""
+
+from django.core.management.base import BaseCommand
+from notifications.receipts import poll_expo_receipts
+
+
+class Command(BaseCommand):
+    help = "Fetch Expo push receipts and update notification logs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Notifications checked per pass",
+        )
+
+    def handle(self, *args, **options):
+        totals = dict.fromkeys(["checked", "delivered", "failed", "deactivated"], 0)
+        while True:
+            result = poll_expo_receipts(limit=options["batch_size"])
+            for key in totals:
+                totals[key] += result[key]
+            # A full pass may have left more behind; stop once a pass finds
+            # nothing more it can resolve
+            resolved = result["delivered"] + result["failed"]
+            if result["checked"] < options["batch_size"] or not resolved:
+                break
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Checked {totals['checked']} receipts: {totals['delivered']} "
+                f"delivered, {totals['failed']} failed, {totals['deactivated']} "
+                f"devices deactivated"
+            )
+        )
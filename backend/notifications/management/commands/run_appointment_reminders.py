@@ -0,0 +1,91 @@
+"""
+Long-running management command that sends appointment reminders
+
+Keeps upcoming reminders in an in-memory timer wheel and refreshes it
+incrementally, instead of polling the whole appointments table from cron.
+Run it as a single supervised process (extra instances are safe - each
+reminder is claimed atomically before sending).
+
+Usage: python manage.py run_appointment_reminders
+       python manage.py run_appointment_reminders --once   # single pass, for cron
+"""
+
+import signal
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.scheduler import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Run the appointment reminder scheduler"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--lead-hours",
+            type=float,
+            default=24,
+            help="Hours before the appointment to send the reminder",
+        )
+        parser.add_argument(
+            "--tick",
+            type=int,
+            default=30,
+            help="Timer wheel resolution in seconds",
+        )
+        parser.add_argument(
+            "--refresh",
+            type=int,
+            default=60,
+            help="Seconds between incremental refreshes from the database",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Load, send due reminders and exit",
+        )
+
+    def handle(self, *args, **options):
+        tick = options["tick"]
+        scheduler = ReminderScheduler(
+            lead=timedelta(hours=options["lead_hours"]),
+            tick=timedelta(seconds=tick),
+        )
+        scheduler.load()
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {len(scheduler.pending)} upcoming reminders")
+        )
+
+        if options["once"]:
+            sent = scheduler.fire_due()
+            self.stdout.write(self.style.SUCCESS(f"✅ Sent {sent} reminders"))
+            return
+
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        last_refresh = time.monotonic()
+        while self.running:
+            try:
+                if time.monotonic() - last_refresh >= options["refresh"]:
+                    close_old_connections()
+                    scheduler.refresh()
+                    last_refresh = time.monotonic()
+
+                sent = scheduler.fire_due()
+                if sent:
+                    self.stdout.write(f"Sent {sent} reminders ({scheduler.sent} total)")
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Scheduler error: {str(e)}"))
+                close_old_connections()
+
+            time.sleep(tick)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Stopped after sending {scheduler.sent} reminders")
+        )
+
+    def stop(self, signum, frame):
+        self.running = False
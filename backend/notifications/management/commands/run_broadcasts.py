@@ -0,0 +1,87 @@
+"""
+Long-running management command that sends push broadcasts
+
+Takes pending broadcasts oldest first and streams each one to its audience,
+saving progress after every batch. A broadcast left running by a worker that
+died is picked up again after BROADCAST_STALE_AFTER seconds and resumed from
+its cursor, so several workers can run side by side. SIGTERM stops a worker
+after its current batch and hands the broadcast back to the queue.
+
+Usage: python manage.py run_broadcasts
+       python manage.py run_broadcasts --once   # send what is queued and exit, for cron
+"""
+
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.broadcast import claim_broadcast, run_broadcast
+
+
+class Command(BaseCommand):
+    help = "Send queued push broadcasts"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.BROADCAST_BATCH_SIZE,
+            help="Devices sent to between progress updates",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=5,
+            help="Seconds to wait when nothing is queued",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Send every queued broadcast and exit",
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        sent = 0
+        while self.running:
+            try:
+                broadcast = claim_broadcast()
+                if broadcast is None:
+                    if options["once"]:
+                        break
+                    close_old_connections()
+                    time.sleep(options["poll"])
+                    continue
+
+                self.stdout.write(
+                    f"Sending broadcast {broadcast.id} \"{broadcast.title}\" to "
+                    f"~{broadcast.audience_size} devices"
+                )
+                started = time.monotonic()
+                # A stop signal takes effect between batches
+                broadcast = run_broadcast(
+                    broadcast, options["batch_size"], keep_going=lambda: self.running
+                )
+                elapsed = time.monotonic() - started
+                sent += 1
+                self.stdout.write(
+                    f"Broadcast {broadcast.id} {broadcast.status} in {elapsed:.1f}s: "
+                    f"{broadcast.recipients} devices, {broadcast.success_count} sent, "
+                    f"{broadcast.failure_count} failed"
+                )
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Broadcast error: {str(e)}"))
+                close_old_connections()
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Processed {sent} broadcasts"))
+
+    def stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,87 @@
+"""
+Long-running management command that delivers queued push notifications
+
+Claims due rows from the notification outbox in batches and sends them on
+the push worker pool. Any number of workers can run side by side (each batch
+is claimed with SELECT ... FOR UPDATE SKIP LOCKED), so throughput scales by
+adding processes.
+
+Usage: python manage.py run_notification_outbox
+       python manage.py run_notification_outbox --once   # drain what is due, for cron
+"""
+
+import signal
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from notifications.outbox import process
+
+
+class Command(BaseCommand):
+    help = "Deliver notifications queued in the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=settings.NOTIFICATION_OUTBOX_BATCH_SIZE,
+            help="Notifications claimed at a time",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1,
+            help="Seconds to wait when nothing is due",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Deliver everything currently due and exit",
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, self.stop)
+            signal.signal(signal.SIGINT, self.stop)
+
+        totals = dict.fromkeys(
+            ["claimed", "success_count", "failure_count", "retry_count"], 0
+        )
+        while self.running:
+            try:
+                result = process(options["batch_size"])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"Outbox error: {str(e)}"))
+                close_old_connections()
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+                continue
+
+            if result is None:
+                if options["once"]:
+                    break
+                close_old_connections()
+                time.sleep(options["poll"])
+                continue
+
+            for key in totals:
+                totals[key] += result[key]
+            self.stdout.write(
+                f"Delivered {result['claimed']} notifications: "
+                f"{result['success_count']} sent, {result['failure_count']} failed, "
+                f"{result['retry_count']} to retry"
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Processed {totals['claimed']} notifications "
+                f"({totals['success_count']} sent, {totals['failure_count']} failed, "
+                f"{totals['retry_count']} to retry)"
+            )
+        )
+
+    def stop(self, signum, frame):
+        self.running = False
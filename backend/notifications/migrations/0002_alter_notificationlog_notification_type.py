@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="notificationlog",
+            name="notification_type",
+            field=models.CharField(choices=[("appointment_reminder", "Appointment Reminder"), ("appointment_update", "Appointment Update"), ("service_due", "Service Due"), ("parking_reminder", "Parking Reminder"), ("offer", "Special Offer"), ("membership_update", "Membership Update"), ("chat", "Chat Message"), ("general", "General")], max_length=50),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0002_alter_notificationlog_notification_type"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notificationlog",
+            name="message_id",
+            field=models.CharField(blank=True, help_text="FCM message name or Expo push ticket id", max_length=255, null=True),
+        ),
+    ]
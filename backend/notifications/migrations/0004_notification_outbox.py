@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:21
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0003_notificationlog_message_id"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxNotification",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("notification_type", models.CharField(choices=[("appointment_reminder", "Appointment Reminder"), ("appointment_update", "Appointment Update"), ("service_due", "Service Due"), ("parking_reminder", "Parking Reminder"), ("offer", "Special Offer"), ("membership_update", "Membership Update"), ("chat", "Chat Message"), ("general", "General")], max_length=50)),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                ("data", models.JSONField(blank=True, default=dict)),
+                ("image_url", models.TextField(blank=True, null=True)),
+                ("attempts", models.PositiveIntegerField(default=0)),
+                ("available_at", models.DateTimeField(default=django.utils.timezone.now, help_text="When a worker may next claim this notification")),
+                ("last_error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("user", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="outbox_notifications", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "db_table": "notification_outbox",
+                "ordering": ["available_at"],
+                "indexes": [models.Index(fields=["available_at"], name="notificatio_availab_6d2459_idx")],
+            },
+        ),
+    ]
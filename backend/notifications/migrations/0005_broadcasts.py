@@ -0,0 +1,73 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:29
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0004_notification_outbox"),
+        ("offers", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Broadcast",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("title", models.CharField(max_length=255)),
+                ("body", models.TextField()),
+                ("notification_type", models.CharField(choices=[("appointment_reminder", "Appointment Reminder"), ("appointment_update", "Appointment Update"), ("service_due", "Service Due"), ("parking_reminder", "Parking Reminder"), ("offer", "Special Offer"), ("membership_update", "Membership Update"), ("announcement", "Announcement"), ("chat", "Chat Message"), ("general", "General")], default="announcement", max_length=50)),
+                ("data", models.JSONField(blank=True, default=dict)),
+                ("image_url", models.TextField(blank=True, null=True)),
+                ("audience", models.JSONField(blank=True, default=dict, help_text="Segment filters, see broadcast.py")),
+                ("status", models.CharField(choices=[("pending", "Pending"), ("running", "Running"), ("completed", "Completed"), ("cancelled", "Cancelled")], default="pending", max_length=20)),
+                ("audience_size", models.IntegerField(default=0, help_text="Devices in the audience when the broadcast was created")),
+                ("cursor", models.TextField(blank=True, help_text="Last push token sent to, for resuming", null=True)),
+                ("recipients", models.IntegerField(default=0)),
+                ("success_count", models.IntegerField(default=0)),
+                ("failure_count", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                ("updated_at", models.DateTimeField(default=django.utils.timezone.now, help_text="Last progress from the sending worker")),
+            ],
+            options={
+                "db_table": "notification_broadcasts",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.AlterField(
+            model_name="notificationlog",
+            name="notification_type",
+            field=models.CharField(choices=[("appointment_reminder", "Appointment Reminder"), ("appointment_update", "Appointment Update"), ("service_due", "Service Due"), ("parking_reminder", "Parking Reminder"), ("offer", "Special Offer"), ("membership_update", "Membership Update"), ("announcement", "Announcement"), ("chat", "Chat Message"), ("general", "General")], max_length=50),
+        ),
+        migrations.AlterField(
+            model_name="outboxnotification",
+            name="notification_type",
+            field=models.CharField(choices=[("appointment_reminder", "Appointment Reminder"), ("appointment_update", "Appointment Update"), ("service_due", "Service Due"), ("parking_reminder", "Parking Reminder"), ("offer", "Special Offer"), ("membership_update", "Membership Update"), ("announcement", "Announcement"), ("chat", "Chat Message"), ("general", "General")], max_length=50),
+        ),
+        migrations.AddIndex(
+            model_name="device",
+            index=models.Index(fields=["push_token"], name="devices_push_to_29bc25_idx"),
+        ),
+        migrations.AddField(
+            model_name="broadcast",
+            name="created_by",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="broadcasts", to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name="broadcast",
+            name="offer",
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name="broadcasts", to="offers.offer"),
+        ),
+        migrations.AddIndex(
+            model_name="broadcast",
+            index=models.Index(fields=["status", "updated_at"], name="notificatio_status_51cc8d_idx"),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-19 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("notifications", "0005_broadcasts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="broadcast",
+            name="claim_token",
+            field=models.UUIDField(blank=True, help_text="Set by the worker currently sending", null=True),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from users.models import User
 import uuid
 
@@ -28,6 +29,8 @@ class Device(models.Model):
         db_table = "devices"
         unique_together = ["user", "push_token"]
         ordering = ["-last_used_at"]
+        # Broadcasts walk devices in token order
+        indexes = [models.Index(fields=["push_token"])]
 
     def __str__(self):
         return f"{self.user.email} - {self.platform} - {self.push_token[:20]}..."
@@ -45,10 +48,12 @@ class NotificationLog(models.Model):
 
     TYPE_CHOICES = [
         ("appointment_reminder", "Appointment Reminder"),
+        ("appointment_update", "Appointment Update"),
         ("service_due", "Service Due"),
         ("parking_reminder", "Parking Reminder"),
         ("offer", "Special Offer"),
         ("membership_update", "Membership Update"),
+        ("announcement", "Announcement"),
         ("chat", "Chat Message"),
         ("general", "General"),
     ]
@@ -66,6 +71,12 @@ class NotificationLog(models.Model):
         max_length=20, choices=STATUS_CHOICES, default="pending"
     )
     error_message = models.TextField(blank=True, null=True)
+    message_id = models.CharField(
+        max_length=255,
+        blank=True,
+        null=True,
+        help_text="FCM message name or Expo push ticket id",
+    )
     sent_at = models.DateTimeField(null=True, blank=True)
     delivered_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -81,3 +92,98 @@ class NotificationLog(models.Model):
 
     def __str__(self):
         return f"{self.notification_type} - {self.user.email} - {self.status}"
+
+
+class OutboxNotification(models.Model):
+    """A notification waiting to be sent by the outbox worker"""
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="outbox_notifications"
+    )
+    notification_type = models.CharField(
+        max_length=50, choices=NotificationLog.TYPE_CHOICES
+    )
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    data = models.JSONField(default=dict, blank=True)
+    image_url = models.TextField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        help_text="When a worker may next claim this notification",
+    )
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = "notification_outbox"
+        ordering = ["available_at"]
+        indexes = [models.Index(fields=["available_at"])]
+
+    def __str__(self):
+        return f"{self.notification_type} - {self.user_id} - attempt {self.attempts}"
+
+
+class Broadcast(models.Model):
+    """A push campaign to every device in an audience segment"""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("cancelled", "Cancelled"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=255)
+    body = models.TextField()
+    notification_type = models.CharField(
+        max_length=50, choices=NotificationLog.TYPE_CHOICES, default="announcement"
+    )
+    data = models.JSONField(default=dict, blank=True)
+    image_url = models.TextField(blank=True, null=True)
+    offer = models.ForeignKey(
+        "offers.Offer",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="broadcasts",
+    )
+    audience = models.JSONField(
+        default=dict, blank=True, help_text="Segment filters, see broadcast.py"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    audience_size = models.IntegerField(
+        default=0, help_text="Devices in the audience when the broadcast was created"
+    )
+    cursor = models.TextField(
+        blank=True, null=True, help_text="Last push token sent to, for resuming"
+    )
+    recipients = models.IntegerField(default=0)
+    success_count = models.IntegerField(default=0)
+    failure_count = models.IntegerField(default=0)
+    created_by = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="broadcasts",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(
+        default=timezone.now, help_text="Last progress from the sending worker"
+    )
+    claim_token = models.UUIDField(
+        null=True, blank=True, help_text="Set by the worker currently sending"
+    )
+
+    class Meta:
+        db_table = "notification_broadcasts"
+        ordering = ["-created_at"]
+        indexes = [models.Index(fields=["status", "updated_at"])]
+
+    def __str__(self):
+        return f"{self.title} - {self.status}"
@@ -0,0 +1,198 @@
+"""
+Durable outbox for push notifications
+
+Requests and jobs do not talk to FCM or Expo themselves. They add one row per
+recipient to the notification_outbox table (a single INSERT however many
+members are notified), ideally in the same transaction as the change being
+announced, and `manage.py run_notification_outbox` workers deliver them:
+
+1. A batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED and each row's
+   available_at is pushed forward by a lease, so concurrent workers take
+   different rows and the rows of a worker that dies come back on their own.
+2. Active devices for every recipient are loaded in one query and sent to
+   concurrently through fcm_service.send_each.
+3. NotificationLog rows are written with one bulk_create, finished rows are
+   deleted and the rest are rescheduled with exponential backoff.
+
+A notification that reached none of its member's devices is retried unless
+every failure was a dead token (those devices are deactivated instead); one
+that reached at least one device, or has run out of attempts, is finished.
+"""
+
+import logging
+from datetime import timedelta
+from typing import Dict, List, Optional
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .fcm_service import fcm_service, is_dead_token
+from .models import Device, NotificationLog, OutboxNotification
+from .utils import log_entry, prune_dead_devices
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(messages: List[Dict], notification_type: str) -> int:
+    """
+    Queue a batch of per-member notifications in one insert
+
+    Each message is a dict with user_id, title, body and optional data and
+    image_url.
+
+    Returns:
+        Number of notifications queued
+    """
+    rows = OutboxNotification.objects.bulk_create(
+        [
+            OutboxNotification(
+                user_id=message["user_id"],
+                notification_type=notification_type,
+                title=message["title"],
+                body=message["body"],
+                data=message.get("data") or {},
+                image_url=message.get("image_url"),
+            )
+            for message in messages
+        ],
+        batch_size=500,
+    )
+    return len(rows)
+
+
+def enqueue_notification(
+    user,
+    title: str,
+    body: str,
+    notification_type: str = "general",
+    data: Optional[Dict] = None,
+    image_url: Optional[str] = None,
+) -> int:
+    """Queue a notification for every active device of one user"""
+    return enqueue(
+        [
+            {
+                "user_id": user.id,
+                "title": title,
+                "body": body,
+                "data": data,
+                "image_url": image_url,
+            }
+        ],
+        notification_type,
+    )
+
+
+def retry_delay(attempts: int) -> int:
+    """Seconds to wait after the given number of failed attempts"""
+    return settings.NOTIFICATION_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+def claim(batch_size: int, now=None) -> List[OutboxNotification]:
+    """Lease up to batch_size due notifications to this worker"""
+    now = now or timezone.now()
+    lease = timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE)
+    with transaction.atomic():
+        rows = list(
+            OutboxNotification.objects.select_for_update(skip_locked=True)
+            .filter(available_at__lte=now)
+            .order_by("available_at")[:batch_size]
+        )
+        if rows:
+            OutboxNotification.objects.filter(pk__in=[row.pk for row in rows]).update(
+                attempts=F("attempts") + 1,
+                available_at=now + lease,
+            )
+    for row in rows:
+        row.attempts += 1
+    return rows
+
+
+def deliver(rows: List[OutboxNotification], now=None) -> Dict:
+    """
+    Send claimed notifications and record the outcome
+
+    Returns:
+        Dict with success_count and failure_count (devices) and retry_count
+        (notifications rescheduled)
+    """
+    now = now or timezone.now()
+    devices = {}
+    for device in Device.objects.filter(
+        user_id__in={row.user_id for row in rows}, is_active=True
+    ):
+        devices.setdefault(device.user_id, []).append(device)
+
+    targets = [(row, device) for row in rows for device in devices.get(row.user_id, [])]
+    results = fcm_service.send_each(
+        [
+            {
+                "token": device.push_token,
+                "title": row.title,
+                "body": row.body,
+                "data": row.data,
+                "image_url": row.image_url,
+            }
+            for row, device in targets
+        ]
+    )
+    outcomes = {}
+    for (row, device), result in zip(targets, results):
+        outcomes.setdefault(row.pk, []).append((device, result))
+
+    logs = []
+    finished = []
+    retry = []
+    for row in rows:
+        sent = outcomes.get(row.pk, [])
+        if sent and not any(result.get("success") for _, result in sent):
+            transient = [result for _, result in sent if not is_dead_token(result)]
+            if transient and row.attempts < settings.NOTIFICATION_OUTBOX_MAX_ATTEMPTS:
+                row.available_at = now + timedelta(seconds=retry_delay(row.attempts))
+                row.last_error = transient[0].get("error")
+                retry.append(row)
+                continue
+            logger.warning(
+                f"Giving up on {row.notification_type} notification {row.pk} "
+                f"after {row.attempts} attempts"
+            )
+        finished.append(row.pk)
+        logs.extend(
+            log_entry(
+                row.user_id,
+                device,
+                row.notification_type,
+                row.title,
+                row.body,
+                row.data,
+                result,
+            )
+            for device, result in sent
+        )
+
+    with transaction.atomic():
+        NotificationLog.objects.bulk_create(logs, batch_size=500)
+        OutboxNotification.objects.filter(pk__in=finished).delete()
+        OutboxNotification.objects.bulk_update(
+            retry, ["available_at", "last_error"], batch_size=500
+        )
+        prune_dead_devices(
+            (device.id, result) for (_, device), result in zip(targets, results)
+        )
+
+    success_count = sum(1 for log in logs if log.status == "sent")
+    return {
+        "success_count": success_count,
+        "failure_count": len(logs) - success_count,
+        "retry_count": len(retry),
+    }
+
+
+def process(batch_size: Optional[int] = None) -> Optional[Dict]:
+    """Claim and deliver one batch, or return None if nothing is due"""
+    rows = claim(batch_size or settings.NOTIFICATION_OUTBOX_BATCH_SIZE)
+    if not rows:
+        return None
+    result = deliver(rows)
+    result["claimed"] = len(rows)
+    return result
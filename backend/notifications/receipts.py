@@ -0,0 +1,84 @@
+"""
+Expo push receipt polling
+
+An Expo push ticket only says Expo accepted the message; whether Apple or
+Google then delivered it is reported in a receipt that becomes available a
+few minutes later and is kept for about a day. poll_expo_receipts looks up
+the receipts of Expo notifications logged as sent at least
+EXPO_RECEIPT_DELAY seconds ago, and marks each log row delivered (with
+delivered_at) or failed. Devices whose receipt says DeviceNotRegistered are
+deactivated.
+"""
+
+from datetime import timedelta
+from typing import Dict
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .fcm_service import fcm_service
+from .models import NotificationLog
+from .utils import prune_dead_devices
+
+# Expo keeps receipts for 24 hours; older tickets can no longer be checked
+RECEIPT_RETENTION = timedelta(hours=24)
+
+
+def pending_expo_logs(now):
+    """Sent Expo notifications whose receipt should be ready"""
+    delay = timedelta(seconds=settings.EXPO_RECEIPT_DELAY)
+    return NotificationLog.objects.filter(
+        Q(device__push_token__startswith="ExponentPushToken[")
+        | Q(device__push_token__startswith="ExpoPushToken["),
+        status="sent",
+        message_id__isnull=False,
+        sent_at__lte=now - delay,
+        sent_at__gt=now - RECEIPT_RETENTION,
+    )
+
+
+def poll_expo_receipts(limit: int = 10000, now=None) -> Dict:
+    """
+    Resolve up to limit sent Expo notifications, oldest first
+
+    Returns:
+        Dict with checked, delivered, failed and deactivated counts
+    """
+    now = now or timezone.now()
+    logs = list(
+        pending_expo_logs(now)
+        .order_by("sent_at")
+        .only("id", "device_id", "message_id")[:limit]
+    )
+    receipts = fcm_service.get_expo_receipts([log.message_id for log in logs])
+
+    delivered = []
+    failed = []
+    outcomes = []
+    for log in logs:
+        result = receipts.get(log.message_id)
+        if result is None:
+            continue  # Not ready yet; checked again on the next poll
+        if result.get("success"):
+            delivered.append(log.pk)
+        else:
+            log.status = "failed"
+            log.error_message = result.get("error")
+            failed.append(log)
+            outcomes.append((log.device_id, result))
+
+    with transaction.atomic():
+        NotificationLog.objects.filter(pk__in=delivered).update(
+            status="delivered", delivered_at=now
+        )
+        NotificationLog.objects.bulk_update(
+            failed, ["status", "error_message"], batch_size=500
+        )
+        deactivated = prune_dead_devices(outcomes)
+
+    return {
+        "checked": len(logs),
+        "delivered": len(delivered),
+        "failed": len(failed),
+        "deactivated": deactivated,
+    }
@@ -0,0 +1,185 @@
+"""
+Appointment reminder scheduling with a hashed timer wheel
+
+The scheduler keeps upcoming reminders in memory instead of re-scanning the
+appointments table on every run:
+
+- Reminders whose fire time falls inside a rolling horizon are loaded once,
+  then the horizon is extended incrementally with a start_time range query.
+- Changes (new bookings, cancellations, edits) are picked up from an
+  updated_at cursor and simply re-scheduled; stale wheel entries are skipped
+  lazily when their slot comes round.
+- Each reminder is claimed with a conditional UPDATE on reminder_sent_at
+  before it is sent, so it fires exactly once even with several schedulers.
+"""
+
+import logging
+import math
+from datetime import timedelta
+from django.utils import timezone
+from appointments.models import Appointment
+from .utils import send_appointment_reminder
+
+logger = logging.getLogger(__name__)
+
+
+class HashedTimerWheel:
+    """
+    Hashed timer wheel keyed on absolute tick numbers
+
+    Insert and expire are O(1) per entry; timers further out than one
+    revolution stay in their slot until their tick comes round.
+    """
+
+    def __init__(self, start, tick=timedelta(seconds=30), slots=512):
+        self.origin = start
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.current_tick = 0
+
+    def _tick_for(self, when):
+        ticks = math.ceil((when - self.origin) / self.tick)
+        # Anything already due fires on the next advance
+        return max(ticks, self.current_tick)
+
+    def schedule(self, when, key):
+        """Schedule key to expire at datetime `when`"""
+        tick = self._tick_for(when)
+        self.slots[tick % len(self.slots)].append((tick, when, key))
+
+    def advance(self, now):
+        """Expire every timer due at or before now, yielding (when, key)"""
+        target = math.floor((now - self.origin) / self.tick)
+        while self.current_tick <= target:
+            slot = self.slots[self.current_tick % len(self.slots)]
+            if slot:
+                remaining = []
+                for entry in slot:
+                    if entry[0] <= self.current_tick:
+                        yield entry[1], entry[2]
+                    else:
+                        remaining.append(entry)
+                slot[:] = remaining
+            self.current_tick += 1
+
+    def __len__(self):
+        return sum(len(slot) for slot in self.slots)
+
+
+class ReminderScheduler:
+    """Fires appointment reminders `lead` before each appointment starts"""
+
+    # Re-read rows updated slightly before the cursor to tolerate late commits
+    CURSOR_OVERLAP = timedelta(minutes=5)
+
+    def __init__(
+        self,
+        lead=timedelta(hours=24),
+        horizon=timedelta(hours=6),
+        tick=timedelta(seconds=30),
+        now=None,
+    ):
+        now = now or timezone.now()
+        self.lead = lead
+        self.horizon = horizon
+        self.wheel = HashedTimerWheel(now, tick=tick)
+        # appointment id -> reminder time currently scheduled
+        self.pending = {}
+        self.horizon_end = now
+        self.cursor = now
+        self.sent = 0
+
+    def _reminder_time(self, start_time):
+        return start_time - self.lead
+
+    def _track(self, appointment_id, start_time, status, reminder_sent_at, now):
+        """Schedule, reschedule or drop one appointment's reminder"""
+        remind_at = self._reminder_time(start_time)
+        if (
+            status != "scheduled"
+            or reminder_sent_at is not None
+            or start_time <= now
+            or remind_at >= self.horizon_end
+        ):
+            # Outside the horizon rows are loaded again when it extends
+            self.pending.pop(appointment_id, None)
+            return
+
+        if self.pending.get(appointment_id) != remind_at:
+            self.pending[appointment_id] = remind_at
+            self.wheel.schedule(remind_at, appointment_id)
+
+    def load(self, now=None):
+        """Initial load of reminders due within the horizon"""
+        now = now or timezone.now()
+        self.horizon_end = now + self.horizon
+        self.cursor = now
+        rows = Appointment.objects.filter(
+            status="scheduled",
+            reminder_sent_at__isnull=True,
+            start_time__gt=now,
+            start_time__lt=self.horizon_end + self.lead,
+        ).values_list("id", "start_time", "status", "reminder_sent_at")
+        for row in rows.iterator():
+            self._track(*row, now)
+
+    def refresh(self, now=None):
+        """Pick up changed appointments and extend the horizon"""
+        now = now or timezone.now()
+
+        # Newly created or modified appointments since the last refresh
+        changed = Appointment.objects.filter(
+            updated_at__gte=self.cursor - self.CURSOR_OVERLAP
+        ).values_list("id", "start_time", "status", "reminder_sent_at", "updated_at")
+        cursor = self.cursor
+        for appointment_id, start_time, status, sent_at, updated_at in changed.iterator():
+            self._track(appointment_id, start_time, status, sent_at, now)
+            cursor = max(cursor, updated_at)
+        self.cursor = cursor
+
+        # Appointments whose reminder time has moved into the horizon
+        previous_end = self.horizon_end
+        self.horizon_end = now + self.horizon
+        if self.horizon_end > previous_end:
+            entering = Appointment.objects.filter(
+                status="scheduled",
+                reminder_sent_at__isnull=True,
+                start_time__gte=previous_end + self.lead,
+                start_time__lt=self.horizon_end + self.lead,
+            ).values_list("id", "start_time", "status", "reminder_sent_at")
+            for row in entering.iterator():
+                self._track(*row, now)
+
+    def fire_due(self, now=None):
+        """Send every reminder that is due, returning how many were sent"""
+        now = now or timezone.now()
+        sent = 0
+        for remind_at, appointment_id in self.wheel.advance(now):
+            # Lazily skip entries superseded by a reschedule or cancellation
+            if self.pending.get(appointment_id) != remind_at:
+                continue
+            del self.pending[appointment_id]
+            if self._claim_and_send(appointment_id, remind_at, now):
+                sent += 1
+        self.sent += sent
+        return sent
+
+    def _claim_and_send(self, appointment_id, remind_at, now):
+        # The conditional update is the exactly-once guard
+        claimed = Appointment.objects.filter(
+            id=appointment_id,
+            status="scheduled",
+            reminder_sent_at__isnull=True,
+            start_time=remind_at + self.lead,
+        ).update(reminder_sent_at=now)
+        if not claimed:
+            return False
+
+        appointment = Appointment.objects.select_related("user", "location").get(
+            id=appointment_id
+        )
+        try:
+            send_appointment_reminder(appointment)
+        except Exception as e:
+            logger.error(f"Failed to send reminder for {appointment_id}: {str(e)}")
+        return True
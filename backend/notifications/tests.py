@@ -0,0 +1,692 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import Mock, patch
+from django.conf import settings
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from users.models import Membership, Plan, User
+from appointments.models import Appointment, Location
+from offers.models import Offer
+from vehicles.models import Vehicle
+from . import broadcast as broadcast_module
+from .broadcast import audience_size, audience_tokens, claim_broadcast, run_broadcast
+from .fcm_service import FCMService
+from .models import Broadcast, Device, NotificationLog, OutboxNotification
+from .outbox import claim, deliver, enqueue
+from .receipts import poll_expo_receipts
+from .scheduler import HashedTimerWheel, ReminderScheduler
+from .utils import notify_user, send_notification_to_user
+
+
+class HashedTimerWheelTest(TestCase):
+    def test_expires_in_order_across_revolutions(self):
+        """Test timers fire once they are due, including after a full revolution"""
+        start = timezone.now()
+        wheel = HashedTimerWheel(start, tick=timedelta(seconds=10), slots=8)
+        wheel.schedule(start + timedelta(seconds=25), "soon")
+        wheel.schedule(start + timedelta(seconds=95), "next-revolution")
+        wheel.schedule(start - timedelta(seconds=5), "overdue")
+
+        fired = [key for _, key in wheel.advance(start + timedelta(seconds=30))]
+        self.assertEqual(fired, ["overdue", "soon"])
+
+        fired = [key for _, key in wheel.advance(start + timedelta(seconds=90))]
+        self.assertEqual(fired, [])
+
+        fired = [key for _, key in wheel.advance(start + timedelta(seconds=100))]
+        self.assertEqual(fired, ["next-revolution"])
+        self.assertEqual(len(wheel), 0)
+
+
+@patch("notifications.scheduler.send_appointment_reminder")
+class ReminderSchedulerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            email="reminder@example.com",
+            password="testpass123",
+        )
+        self.location = Location.objects.create(name="Main Service Center")
+        self.now = timezone.now()
+
+    def book(self, hours_ahead, **kwargs):
+        return Appointment.objects.create(
+            user=self.user,
+            location=self.location,
+            start_time=self.now + timedelta(hours=hours_ahead),
+            **kwargs,
+        )
+
+    def test_fires_due_reminders_exactly_once(self, send_reminder):
+        """Test reminders fire at lead time and are never sent twice"""
+        due = self.book(24.5)
+        later = self.book(29)
+        self.book(20, status="cancelled")
+
+        scheduler = ReminderScheduler(now=self.now)
+        scheduler.load(now=self.now)
+        self.assertEqual(set(scheduler.pending), {due.id, later.id})
+
+        self.assertEqual(scheduler.fire_due(now=self.now), 0)
+        self.assertEqual(scheduler.fire_due(now=self.now + timedelta(hours=1)), 1)
+        send_reminder.assert_called_once()
+        self.assertEqual(send_reminder.call_args[0][0].id, due.id)
+
+        due.refresh_from_db()
+        self.assertIsNotNone(due.reminder_sent_at)
+
+        # A second scheduler must not resend it
+        other = ReminderScheduler(now=self.now + timedelta(hours=1))
+        other.load(now=self.now + timedelta(hours=1))
+        self.assertNotIn(due.id, other.pending)
+        self.assertEqual(other.fire_due(now=self.now + timedelta(hours=2)), 0)
+        self.assertEqual(send_reminder.call_count, 1)
+
+    def test_refresh_picks_up_changes_and_horizon(self, send_reminder):
+        """Test incremental refresh schedules new bookings and drops cancellations"""
+        scheduler = ReminderScheduler(now=self.now, horizon=timedelta(hours=6))
+        scheduler.load(now=self.now)
+
+        cancelled = self.book(25)
+        booked = self.book(26)
+        far = self.book(36)
+        scheduler.refresh(now=self.now)
+        self.assertEqual(set(scheduler.pending), {cancelled.id, booked.id})
+
+        cancelled.status = "cancelled"
+        cancelled.save()
+        scheduler.refresh(now=self.now + timedelta(hours=5))
+        self.assertEqual(set(scheduler.pending), {booked.id})
+
+        scheduler.refresh(now=self.now + timedelta(hours=8))
+        self.assertIn(far.id, scheduler.pending)
+
+        self.assertEqual(scheduler.fire_due(now=self.now + timedelta(hours=8)), 1)
+        self.assertEqual(send_reminder.call_args[0][0].id, booked.id)
+
+
+def fcm_response(url, headers, json, timeout):
+    """Answer a send like FCM or Expo: unknown tokens are rejected"""
+    if url == FCMService.EXPO_ENDPOINT:
+        tickets = [
+            {
+                "status": "error",
+                "message": f"{message['to']} is not a registered recipient",
+                "details": {"error": "DeviceNotRegistered"},
+            }
+            if "dead" in message["to"]
+            else {"status": "ok", "id": f"ticket-{message['to'][18:-1]}"}
+            for message in json
+        ]
+        return Mock(status_code=200, json=lambda: {"data": tickets})
+
+    token = json["message"]["token"]
+    if token.startswith("dead"):
+        error = {
+            "code": 404,
+            "message": "Requested entity was not found.",
+            "status": "NOT_FOUND",
+            "details": [
+                {
+                    "@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError",
+                    "errorCode": "UNREGISTERED",
+                }
+            ],
+        }
+        return Mock(status_code=404, json=lambda: {"error": error})
+    if token.startswith("flaky"):
+        error = {
+            "code": 503,
+            "message": "The service is currently unavailable.",
+            "status": "UNAVAILABLE",
+        }
+        return Mock(status_code=503, json=lambda: {"error": error})
+    return Mock(status_code=200, json=lambda: {"name": f"messages/{token}"})
+
+
+class FCMServiceTest(TestCase):
+    def setUp(self):
+        self.service = FCMService()
+        self.service.project_id = "test-project"
+        self.service.credentials = Mock(valid=True, token="access-token")
+        self.user = User.objects.create_user(
+            email="push@example.com",
+            password="testpass123",
+        )
+
+    def test_multicast_uses_pooled_session(self):
+        """Test multicast results keep token order over the shared session"""
+        tokens = [f"token-{i}" for i in range(20)] + ["dead-token"]
+        session = self.service.session
+        with patch.object(session, "post", side_effect=fcm_response) as post:
+            result = self.service.send_multicast(tokens, "Title", "Body")
+
+        self.assertEqual(post.call_count, 21)
+        self.assertEqual(result["success_count"], 20)
+        self.assertEqual(result["failure_count"], 1)
+        self.assertEqual(
+            result["results"][3]["result"],
+            {"success": True, "message_id": "messages/token-3"},
+        )
+        self.assertFalse(result["results"][-1]["result"]["success"])
+        self.assertEqual(
+            post.call_args.kwargs["timeout"],
+            (settings.PUSH_CONNECT_TIMEOUT, settings.PUSH_TIMEOUT),
+        )
+
+        adapter = self.service.session.get_adapter("https://fcm.googleapis.com")
+        self.assertEqual(adapter.max_retries.total, settings.PUSH_RETRIES)
+        self.assertIn(503, adapter.max_retries.status_forcelist)
+
+    def test_send_to_user_logs_every_device(self):
+        """Test each device is sent to and logged in one insert"""
+        Device.objects.create(user=self.user, platform="ios", push_token="token-a")
+        Device.objects.create(user=self.user, platform="android", push_token="dead-b")
+        Device.objects.create(
+            user=self.user, platform="ios", push_token="token-c", is_active=False
+        )
+
+        with patch("notifications.utils.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ):
+            with self.assertNumQueries(3):
+                result = send_notification_to_user(self.user, "Title", "Body")
+
+        self.assertEqual(result, {"success_count": 1, "failure_count": 1})
+        logs = {log.device.push_token: log for log in NotificationLog.objects.all()}
+        self.assertEqual(set(logs), {"token-a", "dead-b"})
+        self.assertEqual(logs["token-a"].status, "sent")
+        self.assertIsNotNone(logs["token-a"].sent_at)
+        self.assertEqual(logs["dead-b"].status, "failed")
+        self.assertEqual(
+            logs["dead-b"].error_message, "Requested entity was not found."
+        )
+
+        # The unregistered token is deactivated, the others are left alone
+        active = Device.objects.filter(is_active=True)
+        self.assertEqual(
+            set(active.values_list("push_token", flat=True)), {"token-a"}
+        )
+
+    def test_expo_tokens_are_sent_in_batches(self):
+        """Test Expo tokens go out 100 per request with tickets mapped back"""
+        tokens = [f"ExponentPushToken[{i}]" for i in range(250)]
+        tokens[120] = "ExponentPushToken[dead]"
+        tokens.insert(5, "fcm-token")
+
+        session = self.service.session
+        with patch.object(session, "post", side_effect=fcm_response) as post:
+            result = self.service.send_multicast(tokens, "Title", "Body")
+
+        batches = [
+            len(call.kwargs["json"])
+            for call in post.call_args_list
+            if call.args[0] == FCMService.EXPO_ENDPOINT
+        ]
+        self.assertEqual(sorted(batches), [50, 100, 100])
+        self.assertEqual(post.call_count, 4)
+        self.assertEqual(result["success_count"], 250)
+        results = [entry["result"] for entry in result["results"]]
+        self.assertEqual(results[5]["message_id"], "messages/fcm-token")
+        self.assertEqual(results[200]["message_id"], "ticket-199")
+        self.assertEqual(results[121]["error_code"], "DeviceNotRegistered")
+
+    def test_expo_ticket_ids_are_logged(self):
+        """Test each Expo ticket lands on the log row of its device"""
+        for name in ["a", "dead", "b"]:
+            Device.objects.create(
+                user=self.user, platform="ios", push_token=f"ExponentPushToken[{name}]"
+            )
+
+        with patch("notifications.utils.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ) as post:
+            result = send_notification_to_user(self.user, "Title", "Body")
+
+        post.assert_called_once()
+        self.assertEqual(result, {"success_count": 2, "failure_count": 1})
+        logs = {log.device.push_token: log for log in NotificationLog.objects.all()}
+        self.assertEqual(logs["ExponentPushToken[a]"].message_id, "ticket-a")
+        self.assertEqual(logs["ExponentPushToken[b]"].message_id, "ticket-b")
+        self.assertEqual(logs["ExponentPushToken[dead]"].status, "failed")
+        self.assertIsNone(logs["ExponentPushToken[dead]"].message_id)
+        self.assertFalse(logs["ExponentPushToken[dead]"].device.is_active)
+        self.assertTrue(logs["ExponentPushToken[a]"].device.is_active)
+
+
+@override_settings(
+    NOTIFICATION_OUTBOX_RETRY_DELAY=30, NOTIFICATION_OUTBOX_MAX_ATTEMPTS=2
+)
+class NotificationOutboxTest(TestCase):
+    def setUp(self):
+        self.service = FCMService()
+        self.service.project_id = "test-project"
+        self.service.credentials = Mock(valid=True, token="access-token")
+        self.members = [
+            User.objects.create_user(
+                email=f"outbox{i}@example.com", password="testpass123"
+            )
+            for i in range(3)
+        ]
+        reachable, unreachable, uninstalled = self.members
+        Device.objects.create(user=reachable, platform="ios", push_token="token-a")
+        Device.objects.create(user=reachable, platform="ios", push_token="dead-a")
+        Device.objects.create(
+            user=unreachable, platform="android", push_token="flaky-b"
+        )
+        Device.objects.create(user=uninstalled, platform="ios", push_token="dead-c")
+
+    def send(self, now):
+        with patch("notifications.outbox.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ):
+            return deliver(claim(10, now=now), now=now)
+
+    def test_notify_user_only_queues(self):
+        """Test callers insert one outbox row and never contact a push service"""
+        with patch.object(self.service.session, "post") as post:
+            with self.assertNumQueries(1):
+                result = notify_user(self.members[0], "Title", "Body", "offer")
+        post.assert_not_called()
+        self.assertEqual(result, {"queued": 1})
+        queued = OutboxNotification.objects.get()
+        self.assertEqual(queued.notification_type, "offer")
+        self.assertEqual(queued.attempts, 0)
+
+    def test_worker_sends_retries_and_gives_up(self):
+        """Test delivery logs in bulk and backs off until attempts run out"""
+        enqueue(
+            [
+                {"user_id": member.id, "title": "Offer", "body": "Half price"}
+                for member in self.members
+            ],
+            "offer",
+        )
+        now = timezone.now()
+
+        result = self.send(now)
+        self.assertEqual(
+            result, {"success_count": 1, "failure_count": 2, "retry_count": 1}
+        )
+        logs = NotificationLog.objects.all()
+        self.assertEqual(
+            {(log.device.push_token, log.status) for log in logs},
+            {("token-a", "sent"), ("dead-a", "failed"), ("dead-c", "failed")},
+        )
+        # Dead tokens are deactivated rather than retried
+        inactive = Device.objects.filter(is_active=False)
+        self.assertEqual(
+            set(inactive.values_list("push_token", flat=True)), {"dead-a", "dead-c"}
+        )
+
+        # Only the member whose device failed temporarily is still queued
+        pending = OutboxNotification.objects.get()
+        self.assertEqual(pending.user, self.members[1])
+        self.assertEqual(pending.attempts, 1)
+        self.assertEqual(pending.available_at, now + timedelta(seconds=30))
+        self.assertEqual(pending.last_error, "The service is currently unavailable.")
+
+        # Not due again until the backoff has passed
+        self.assertEqual(claim(10, now=now + timedelta(seconds=29)), [])
+        result = self.send(now + timedelta(seconds=30))
+        self.assertEqual(
+            result, {"success_count": 0, "failure_count": 1, "retry_count": 0}
+        )
+        self.assertFalse(OutboxNotification.objects.exists())
+        self.assertEqual(
+            NotificationLog.objects.get(device__push_token="flaky-b").status, "failed"
+        )
+        self.assertTrue(Device.objects.get(push_token="flaky-b").is_active)
+
+    def test_claimed_rows_are_leased(self):
+        """Test a claimed batch is hidden from other workers until the lease ends"""
+        enqueue([{"user_id": self.members[0].id, "title": "Hi", "body": "Hi"}], "offer")
+        now = timezone.now()
+        self.assertEqual(len(claim(10, now=now)), 1)
+        self.assertEqual(claim(10, now=now), [])
+
+        lease = timedelta(seconds=settings.NOTIFICATION_OUTBOX_LEASE)
+        reclaimed = claim(10, now=now + lease)
+        self.assertEqual(len(reclaimed), 1)
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_worker_command_drains_outbox(self):
+        """Test --once delivers everything due and exits"""
+        enqueue([{"user_id": self.members[0].id, "title": "Hi", "body": "Hi"}], "offer")
+        with patch("notifications.outbox.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ):
+            call_command("run_notification_outbox", "--once", stdout=StringIO())
+        self.assertFalse(OutboxNotification.objects.exists())
+        self.assertEqual(NotificationLog.objects.filter(status="sent").count(), 1)
+
+
+class ExpoReceiptTest(TestCase):
+    def setUp(self):
+        self.service = FCMService()
+        self.user = User.objects.create_user(
+            email="receipts@example.com",
+            password="testpass123",
+        )
+        self.now = timezone.now()
+
+    def sent_log(self, token, ticket, minutes_ago=20):
+        device = Device.objects.create(user=self.user, platform="ios", push_token=token)
+        return NotificationLog.objects.create(
+            user=self.user,
+            device=device,
+            notification_type="offer",
+            title="Offer",
+            body="Half price",
+            status="sent",
+            message_id=ticket,
+            sent_at=self.now - timedelta(minutes=minutes_ago),
+        )
+
+    def receipts(self, url, headers, json, timeout):
+        self.assertEqual(url, FCMService.EXPO_RECEIPTS_ENDPOINT)
+        known = {
+            "ticket-ok": {"status": "ok"},
+            "ticket-gone": {
+                "status": "error",
+                "message": "The device cannot receive push notifications anymore",
+                "details": {"error": "DeviceNotRegistered"},
+            },
+            "ticket-big": {
+                "status": "error",
+                "message": "Message too big",
+                "details": {"error": "MessageTooBig"},
+            },
+        }
+        data = {ticket: known[ticket] for ticket in json["ids"] if ticket in known}
+        return Mock(status_code=200, json=lambda: {"data": data})
+
+    def test_receipts_update_logs_and_prune_devices(self):
+        """Test receipts mark logs delivered or failed and deactivate dead devices"""
+        ok = self.sent_log("ExponentPushToken[ok]", "ticket-ok")
+        gone = self.sent_log("ExponentPushToken[gone]", "ticket-gone")
+        big = self.sent_log("ExpoPushToken[big]", "ticket-big")
+        waiting = self.sent_log("ExponentPushToken[wait]", "ticket-wait")
+        recent = self.sent_log("ExponentPushToken[new]", "ticket-ok-2", minutes_ago=5)
+        fcm = self.sent_log("fcm-token", "projects/p/messages/1")
+
+        with patch("notifications.receipts.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=self.receipts
+        ) as post:
+            result = poll_expo_receipts(now=self.now)
+
+        post.assert_called_once()
+        self.assertEqual(
+            sorted(post.call_args.kwargs["json"]["ids"]),
+            ["ticket-big", "ticket-gone", "ticket-ok", "ticket-wait"],
+        )
+        self.assertEqual(
+            result, {"checked": 4, "delivered": 1, "failed": 2, "deactivated": 1}
+        )
+
+        for log in [ok, gone, big, waiting, recent, fcm]:
+            log.refresh_from_db()
+        self.assertEqual(ok.status, "delivered")
+        self.assertEqual(ok.delivered_at, self.now)
+        self.assertEqual(gone.status, "failed")
+        self.assertEqual(big.error_message, "Message too big")
+        self.assertEqual([waiting.status, recent.status, fcm.status], ["sent"] * 3)
+
+        # Only the unregistered token is pruned
+        self.assertFalse(gone.device.is_active)
+        self.assertTrue(big.device.is_active)
+
+    def test_receipts_are_requested_in_batches(self):
+        """Test ticket ids are sent at most EXPO_RECEIPT_BATCH_SIZE per request"""
+        with patch.object(FCMService, "EXPO_RECEIPT_BATCH_SIZE", 2), patch.object(
+            self.service.session, "post", side_effect=self.receipts
+        ) as post:
+            receipts = self.service.get_expo_receipts(
+                ["ticket-ok", "ticket-gone", "ticket-big", "ticket-wait", "ticket-x"]
+            )
+
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(set(receipts), {"ticket-ok", "ticket-gone", "ticket-big"})
+        self.assertEqual(receipts["ticket-gone"]["error_code"], "DeviceNotRegistered")
+
+
+class BroadcastTest(TestCase):
+    def setUp(self):
+        self.service = FCMService()
+        self.service.project_id = "test-project"
+        self.service.credentials = Mock(valid=True, token="access-token")
+        gold = Plan.objects.create(name="Gold", price_monthly=4999, tier="gold")
+        basic = Plan.objects.create(name="Basic", price_monthly=1999, tier="basic")
+        self.downtown = Location.objects.create(
+            name="Downtown", lat=40.7128, lng=-74.0060
+        )
+        self.faraway = Location.objects.create(
+            name="Denver", lat=39.7392, lng=-104.9903
+        )
+        now = timezone.now()
+
+        def member(name, plan, make, location, tokens):
+            user = User.objects.create_user(
+                email=f"{name}@example.com", password="testpass123"
+            )
+            Membership.objects.create(user=user, plan=plan, status="active")
+            Vehicle.objects.create(user=user, make=make)
+            Appointment.objects.create(user=user, location=location, start_time=now)
+            for token in tokens:
+                Device.objects.create(user=user, platform="ios", push_token=token)
+            return user
+
+        self.ana = member("ana", gold, "Honda", self.downtown, ["token-a1", "token-a2"])
+        self.ben = member("ben", gold, "TOYOTA", self.faraway, ["token-b"])
+        self.cy = member("cy", basic, "honda", self.downtown, ["token-c", "dead-c"])
+        # Same phone signed into a second account: one notification, not two
+        Device.objects.create(user=self.ben, platform="ios", push_token="token-a1")
+        lapsed = member("dee", None, "Honda", self.downtown, ["token-d"])
+        lapsed.memberships.update(status="cancelled")
+
+    def run_all(self, batch_size=2):
+        with patch("notifications.broadcast.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ) as post:
+            broadcast = claim_broadcast()
+            broadcast = run_broadcast(broadcast, batch_size)
+        return broadcast, post
+
+    def test_audience_filters_combine(self):
+        """Test tier, make, location and radius filters narrow the audience"""
+        tokens = lambda audience: [row[2] for row in audience_tokens(audience)]
+        self.assertEqual(
+            tokens({}),
+            ["dead-c", "token-a1", "token-a2", "token-b", "token-c", "token-d"],
+        )
+        self.assertEqual(
+            tokens({"active_membership": True}),
+            ["dead-c", "token-a1", "token-a2", "token-b", "token-c"],
+        )
+        self.assertEqual(
+            tokens({"plan_tiers": ["gold"]}),
+            ["token-a1", "token-a2", "token-b"],
+        )
+        self.assertEqual(
+            tokens({"plan_tiers": ["gold"], "vehicle_makes": ["toyota"]}),
+            ["token-a1", "token-b"],
+        )
+        self.assertEqual(
+            tokens({"location_ids": [str(self.faraway.id)]}),
+            ["token-a1", "token-b"],
+        )
+        near = {"lat": 40.75, "lng": -73.99, "radius_km": 25}
+        self.assertEqual(
+            tokens({"near": near, "vehicle_makes": ["Honda"]}),
+            ["dead-c", "token-a1", "token-a2", "token-c", "token-d"],
+        )
+        self.assertEqual(audience_size({"plan_tiers": ["gold"]}), 3)
+
+    def test_broadcast_sends_each_token_once_and_prunes(self):
+        """Test a broadcast streams in batches, dedupes tokens and logs results"""
+        Broadcast.objects.create(
+            title="Winter Tires",
+            body="20% off this week",
+            notification_type="offer",
+            audience={"active_membership": True},
+            audience_size=audience_size({"active_membership": True}),
+        )
+        broadcast, post = self.run_all()
+
+        self.assertEqual(post.call_count, 5)
+        self.assertEqual(broadcast.status, "completed")
+        self.assertEqual(broadcast.recipients, 5)
+        self.assertEqual(broadcast.success_count, 4)
+        self.assertEqual(broadcast.failure_count, 1)
+        self.assertEqual(broadcast.cursor, "token-c")
+        self.assertIsNotNone(broadcast.completed_at)
+        self.assertEqual(NotificationLog.objects.filter(status="sent").count(), 4)
+        self.assertEqual(NotificationLog.objects.get(status="failed").user, self.cy)
+        self.assertFalse(Device.objects.get(push_token="dead-c").is_active)
+        self.assertIsNone(claim_broadcast())
+
+    def test_stale_broadcast_resumes_from_cursor(self):
+        """Test a broadcast abandoned mid-run is reclaimed and continues"""
+        stale = timezone.now() - timedelta(seconds=settings.BROADCAST_STALE_AFTER + 1)
+        broadcast = Broadcast.objects.create(
+            title="Service Notice",
+            body="We are open Sunday",
+            status="running",
+            cursor="token-a2",
+            recipients=3,
+            success_count=3,
+            updated_at=timezone.now(),
+        )
+        self.assertIsNone(claim_broadcast())
+
+        Broadcast.objects.filter(pk=broadcast.pk).update(updated_at=stale)
+        broadcast, post = self.run_all()
+
+        sent = [call.kwargs["json"]["message"]["token"] for call in post.call_args_list]
+        self.assertEqual(sent, ["token-b", "token-c", "token-d"])
+        self.assertEqual(broadcast.status, "completed")
+        self.assertEqual(broadcast.recipients, 6)
+
+    def test_slow_worker_stops_once_taken_over(self):
+        """Test a worker that lost its claim stops instead of sending twice"""
+        Broadcast.objects.create(title="Recall", body="Check your car")
+        slow = claim_broadcast()
+        stale = timezone.now() - timedelta(seconds=settings.BROADCAST_STALE_AFTER + 1)
+        Broadcast.objects.filter(pk=slow.pk).update(updated_at=stale)
+        fresh = claim_broadcast()
+        self.assertNotEqual(fresh.claim_token, slow.claim_token)
+
+        with patch("notifications.broadcast.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ) as post:
+            slow = run_broadcast(slow, batch_size=2)
+
+        # Only the batch already in flight went out, and it was not counted
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(slow.status, "running")
+        self.assertEqual(slow.claim_token, fresh.claim_token)
+        self.assertEqual(slow.recipients, 0)
+        self.assertIsNone(slow.cursor)
+
+    def test_stopping_worker_hands_broadcast_back(self):
+        """Test a worker shutting down returns the broadcast to the queue"""
+        Broadcast.objects.create(title="Recall", body="Check your car")
+        batches = iter([True, False])
+
+        with patch("notifications.broadcast.fcm_service", self.service), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ) as post:
+            broadcast = run_broadcast(
+                claim_broadcast(), batch_size=2, keep_going=lambda: next(batches)
+            )
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(broadcast.status, "pending")
+        self.assertIsNone(broadcast.claim_token)
+        self.assertEqual(broadcast.cursor, "token-a1")
+        started_at = broadcast.started_at
+
+        broadcast, post = self.run_all()
+        self.assertEqual(broadcast.status, "completed")
+        self.assertEqual(broadcast.recipients, 6)
+        self.assertEqual(broadcast.started_at, started_at)
+
+    def test_cancelled_broadcast_stops_after_batch(self):
+        """Test cancelling through the admin API halts a running broadcast"""
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        broadcast = Broadcast.objects.create(title="Recall", body="Check your car")
+
+        send_batch = broadcast_module._send_batch
+
+        def cancel_midway(broadcast, batch):
+            client.post(reverse("cancel_broadcast", args=[broadcast.id]))
+            return send_batch(broadcast, batch)
+
+        with patch("notifications.broadcast.fcm_service", self.service), patch(
+            "notifications.broadcast._send_batch", side_effect=cancel_midway
+        ), patch.object(
+            self.service.session, "post", side_effect=fcm_response
+        ) as post:
+            broadcast = run_broadcast(claim_broadcast(), batch_size=2)
+
+        self.assertEqual(post.call_count, 2)
+        self.assertEqual(broadcast.status, "cancelled")
+        self.assertEqual(broadcast.recipients, 0)
+        response = client.post(reverse("cancel_broadcast", args=[broadcast.id]))
+        self.assertEqual(response.status_code, 400)
+
+    def test_admin_creates_offer_broadcast(self):
+        """Test an offer broadcast inherits its tiers, locations and deep link"""
+        admin = User.objects.create_superuser(
+            email="admin@example.com", password="adminpass123"
+        )
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        offer = Offer.objects.create(
+            title="Free Wash",
+            description="One free wash with any service",
+            eligible_memberships=["gold"],
+            locations=[str(self.downtown.id)],
+        )
+
+        response = client.post(
+            reverse("create_broadcast"),
+            {"offer_id": str(offer.id), "audience": {"vehicle_makes": ["Honda"]}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data["title"], "Special Offer: Free Wash")
+        self.assertEqual(data["notification_type"], "offer")
+        self.assertEqual(data["audience_size"], 2)
+        self.assertEqual(data["status"], "pending")
+        broadcast = Broadcast.objects.get()
+        self.assertEqual(broadcast.offer, offer)
+        self.assertEqual(broadcast.created_by, admin)
+        self.assertEqual(broadcast.data["deepLink"], "/(authenticated)/offers")
+
+        response = client.post(
+            reverse("create_broadcast"),
+            {"title": "Hi", "body": "There", "audience": {"near": {"lat": 91}}},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+
+        offer.expiry = timezone.now() - timedelta(days=1)
+        offer.save()
+        for body in [
+            [],
+            {"title": "Hi", "body": "There", "audience": ["gold"]},
+            {"offer_id": str(offer.id)},
+        ]:
+            response = client.post(reverse("create_broadcast"), body, format="json")
+            self.assertEqual(response.status_code, 400)
+        response = client.post(reverse("preview_broadcast_audience"), [], format="json")
+        self.assertEqual(response.status_code, 400)
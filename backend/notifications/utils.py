@@ -3,14 +3,55 @@ Utility functions for sending notifications in various scenarios
 """
 
 from typing import List, Optional, Dict
+from django.conf import settings
 from django.utils import timezone
 from .models import Device, NotificationLog
-from .fcm_service import fcm_service
+from .fcm_service import fcm_service, is_dead_token
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+def log_entry(user_id, device, notification_type, title, body, data, result):
+    return NotificationLog(
+        user_id=user_id,
+        device=device,
+        notification_type=notification_type,
+        title=title,
+        body=body,
+        data=data,
+        status="sent" if result.get("success") else "failed",
+        error_message=result.get("error"),
+        message_id=result.get("message_id"),
+        sent_at=timezone.now() if result.get("success") else None,
+    )
+
+
+def prune_dead_devices(outcomes) -> int:
+    """
+    Deactivate devices whose token a push service reported as dead
+
+    Args:
+        outcomes: Iterable of (device id, send result) pairs
+
+    Returns:
+        Number of devices deactivated
+    """
+    dead = {device_id for device_id, result in outcomes if is_dead_token(result)}
+    if not dead:
+        return 0
+    pruned = Device.objects.filter(pk__in=dead, is_active=True).update(
+        is_active=False, updated_at=timezone.now()
+    )
+    logger.info(f"Deactivated {pruned} devices with unregistered push tokens")
+    return pruned
+
+
+def _counts(results):
+    success_count = sum(1 for result in results if result.get("success"))
+    return {"success_count": success_count, "failure_count": len(results) - success_count}
+
+
 def send_notification_to_user(
     user,
     title: str,
@@ -22,6 +63,9 @@ def send_notification_to_user(
     """
     Send notification to all active devices for a user
 
+    Devices are sent to concurrently and logged in one insert, and devices
+    whose token turns out to be dead are deactivated.
+
     Args:
         user: User instance
         title: Notification title
@@ -33,70 +77,144 @@ def send_notification_to_user(
     Returns:
         Dict with success_count and failure_count
     """
-    devices = Device.objects.filter(user=user, is_active=True)
+    devices = list(Device.objects.filter(user=user, is_active=True))
 
-    if not devices.exists():
+    if not devices:
         logger.warning(f"No active devices for user {user.email}")
         return {"success_count": 0, "failure_count": 0}
 
-    success_count = 0
-    failure_count = 0
+    results = fcm_service.send_each(
+        [
+            {
+                "token": device.push_token,
+                "title": title,
+                "body": body,
+                "data": data or {},
+                "image_url": image_url,
+            }
+            for device in devices
+        ]
+    )
 
-    for device in devices:
-        result = fcm_service.send_notification(
-            token=device.push_token,
-            title=title,
-            body=body,
-            data=data or {},
-            image_url=image_url,
-        )
+    # Log the notifications
+    NotificationLog.objects.bulk_create(
+        log_entry(user.id, device, notification_type, title, body, data or {}, result)
+        for device, result in zip(devices, results)
+    )
+    prune_dead_devices((device.id, result) for device, result in zip(devices, results))
+
+    return _counts(results)
+
+
+def send_bulk_notifications(messages: List[Dict], notification_type: str) -> Dict:
+    """
+    Send a batch of per-member notifications
+
+    Each message is a dict with user_id, title, body and optional data.
+    Devices for every recipient are loaded in one query, sends run
+    concurrently on the push worker pool, the logs are written in one
+    insert and dead tokens are deactivated in one update.
+
+    Returns:
+        Dict with success_count and failure_count
+    """
+    user_ids = {message["user_id"] for message in messages}
+    devices = {}
+    for device in Device.objects.filter(user_id__in=user_ids, is_active=True):
+        devices.setdefault(device.user_id, []).append(device)
 
-        # Log the notification
-        NotificationLog.objects.create(
-            user=user,
-            device=device,
-            notification_type=notification_type,
-            title=title,
-            body=body,
-            data=data or {},
-            status="sent" if result.get("success") else "failed",
-            error_message=result.get("error"),
-            sent_at=timezone.now() if result.get("success") else None,
+    targets = [
+        (message, device)
+        for message in messages
+        for device in devices.get(message["user_id"], [])
+    ]
+    results = fcm_service.send_each(
+        [
+            {
+                "token": device.push_token,
+                "title": message["title"],
+                "body": message["body"],
+                "data": message.get("data") or {},
+            }
+            for message, device in targets
+        ]
+    )
+
+    NotificationLog.objects.bulk_create(
+        (
+            log_entry(
+                message["user_id"],
+                device,
+                notification_type,
+                message["title"],
+                message["body"],
+                message.get("data") or {},
+                result,
+            )
+            for (message, device), result in zip(targets, results)
+        ),
+        batch_size=500,
+    )
+    prune_dead_devices(
+        (device.id, result) for (_, device), result in zip(targets, results)
+    )
+    return _counts(results)
+
+
+def notify_user(
+    user,
+    title: str,
+    body: str,
+    notification_type: str = "general",
+    data: Optional[Dict] = None,
+    image_url: Optional[str] = None,
+) -> Dict:
+    """
+    Queue a notification for the outbox worker
+
+    With NOTIFICATION_OUTBOX off it is sent inline through
+    send_notification_to_user instead.
+
+    Returns:
+        Dict with queued, or success_count and failure_count when sent inline
+    """
+    if not settings.NOTIFICATION_OUTBOX:
+        return send_notification_to_user(
+            user, title, body, notification_type, data, image_url
         )
 
-        if result.get("success"):
-            success_count += 1
-        else:
-            failure_count += 1
+    from .outbox import enqueue_notification
 
-    return {"success_count": success_count, "failure_count": failure_count}
+    return {
+        "queued": enqueue_notification(
+            user, title, body, notification_type, data, image_url
+        )
+    }
 
 
 def send_appointment_reminder(appointment):
     """Send appointment reminder notification"""
-    from datetime import timedelta
-
-    # Check if appointment is within 24 hours
-    time_until = appointment.scheduled_at - timezone.now()
-    if timedelta(hours=23) <= time_until <= timedelta(hours=25):
-        hours = int(time_until.total_seconds() / 3600)
+    time_until = appointment.start_time - timezone.now()
+    hours = max(0, round(time_until.total_seconds() / 3600))
+    service = ", ".join(appointment.services) if appointment.services else "service"
+    location = appointment.location.name if appointment.location else "the shop"
 
-        send_notification_to_user(
-            user=appointment.user,
-            title="Appointment Reminder",
-            body=f"Your {appointment.service_type} appointment is in {hours} hours at {appointment.location.name}",
-            notification_type="appointment_reminder",
-            data={
-                "type": "appointment",
-                "appointment_id": str(appointment.id),
-                "deepLink": "/(authenticated)/appointments",
-            },
-        )
+    return notify_user(
+        user=appointment.user,
+        title="Appointment Reminder",
+        body=f"Your {service} appointment is in {hours} hours at {location}",
+        notification_type="appointment_reminder",
+        data={
+            "type": "appointment",
+            "appointment_id": str(appointment.id),
+            "deepLink": "/(authenticated)/appointments",
+        },
+    )
 
 
 def send_service_due_notification(vehicle, service_schedule):
     """Notify user that a service is due"""
-    send_notification_to_user(
+    notify_user(
         user=vehicle.user,
         title="Service Due",
         body=f"{service_schedule.service_type.name} is due for your {vehicle.year} {vehicle.make} {vehicle.model}",
@@ -117,7 +235,7 @@ def send_parking_reminder(parking_spot):
     # Send reminder after 4 hours of parking
     time_parked = timezone.now() - parking_spot.parked_at
     if time_parked >= timedelta(hours=4):
-        send_notification_to_user(
+        notify_user(
             user=parking_spot.user,
             title="Parking Reminder",
             body=f"You've been parked at {parking_spot.address or 'your location'} for {int(time_parked.total_seconds() / 3600)} hours",
@@ -141,7 +259,7 @@ def send_parking_meter_expiring_notification(parking_spot):
 
     # Send notification 15 minutes before expiry
     if timedelta(minutes=14) <= time_until_expiry <= timedelta(minutes=16):
-        send_notification_to_user(
+        notify_user(
             user=parking_spot.user,
             title="⏰ Parking Meter Expiring Soon!",
             body=f"Your parking meter expires in 15 minutes at {parking_spot.address or 'your location'}",
@@ -155,7 +273,7 @@ def send_parking_meter_expiring_notification(parking_spot):
 
     # Send notification when meter has expired
     elif time_until_expiry <= timedelta(minutes=0):
-        send_notification_to_user(
+        notify_user(
             user=parking_spot.user,
             title="🚨 Parking Meter Expired!",
             body=f"Your parking meter has expired! Move your vehicle to avoid a ticket.",
@@ -170,7 +288,7 @@ def send_parking_meter_expiring_notification(parking_spot):
 
 def send_membership_update(user, message: str):
     """Send membership-related notification"""
-    send_notification_to_user(
+    notify_user(
         user=user,
         title="Membership Update",
         body=message,
@@ -184,7 +302,7 @@ def send_membership_update(user, message: str):
 
 def send_offer_notification(user, offer):
     """Send special offer notification"""
-    send_notification_to_user(
+    notify_user(
         user=user,
         title=f"Special Offer: {offer.title}",
         body=offer.description[:100],
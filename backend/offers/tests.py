@@ -72,3 +72,23 @@ class OfferAPITest(TestCase):
         # Should only return valid offer
         self.assertEqual(len(response.data), 1)
         self.assertEqual(response.data[0]["title"], "Valid Offer")
+
+    def test_list_offers_filtered_by_location(self):
+        """Test that lat/lng limit offers to nearby locations"""
+        from appointments.models import Location
+
+        nearby = Location.objects.create(name="Nearby", lat=40.7831, lng=-73.9712)
+        far = Location.objects.create(name="Far", lat=34.0522, lng=-118.2437)
+        expiry = timezone.now() + timedelta(days=30)
+        Offer.objects.create(title="Local Offer", expiry=expiry, locations=[str(nearby.id)])
+        Offer.objects.create(title="West Coast Offer", expiry=expiry, locations=[str(far.id)])
+        Offer.objects.create(title="Nationwide Offer", expiry=expiry)
+
+        url = reverse("offer-list")
+        response = self.client.get(url, {"lat": 40.7128, "lng": -74.0060})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            sorted(offer["title"] for offer in response.data),
+            ["Local Offer", "Nationwide Offer"],
+        )
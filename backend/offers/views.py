@@ -5,6 +5,7 @@ from rest_framework.permissions import IsAuthenticated
 from django.utils import timezone
 from .models import Offer
 from .serializers import OfferSerializer
+from appointments.geo import DEFAULT_RADIUS_KM, get_location_index, parse_coordinates
 
 
 class OfferListView(APIView):
@@ -13,8 +14,14 @@ class OfferListView(APIView):
     def get(self, request):
         """List offers for user"""
         vehicle_id = request.query_params.get("vehicleId")
-        lat = request.query_params.get("lat")
-        lng = request.query_params.get("lng")
+        try:
+            coordinates = parse_coordinates(request.query_params)
+            radius_km = float(request.query_params.get("radius", DEFAULT_RADIUS_KM))
+        except ValueError:
+            return Response(
+                {"error": "Invalid lat, lng or radius"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
 
         # Get user's membership tier
         user_membership = request.user.memberships.filter(status="active").first()
@@ -32,17 +39,25 @@ class OfferListView(APIView):
         # In production with PostgreSQL, use: eligible_memberships__contains=[membership_tier]
         # For SQLite compatibility, we'll filter in Python
         if membership_tier:
-            offers_list = list(offers)
-            filtered_offers = [
-                offer for offer in offers_list
+            offers = [
+                offer for offer in offers
                 if not offer.eligible_memberships or membership_tier in offer.eligible_memberships
             ]
-            # Return filtered offers directly
-            serializer = OfferSerializer(filtered_offers, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
 
-        # If location provided, could filter by nearby locations
-        # For now, we'll return all eligible offers
+        # If location provided, keep offers valid at a location within the radius.
+        # Offers without locations apply everywhere.
+        if coordinates:
+            nearby = {
+                str(location_id)
+                for location_id, _ in get_location_index().nearest(
+                    *coordinates, radius_km=radius_km
+                )
+            }
+            offers = [
+                offer for offer in offers
+                if not offer.locations
+                or any(str(location_id) in nearby for location_id in offer.locations)
+            ]
 
         serializer = OfferSerializer(offers, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
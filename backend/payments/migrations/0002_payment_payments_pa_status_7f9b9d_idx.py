@@ -0,0 +1,20 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0001_initial"),
+        ("users", "0005_user_users_created_1b562c_idx"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["status", "completed_at"], name="payments_pa_status_7f9b9d_idx"),
+        ),
+    ]
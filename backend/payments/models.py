@@ -35,6 +35,9 @@ class Payment(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "completed_at"]),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.plan.name if self.plan else 'Unknown'} - {self.status}"
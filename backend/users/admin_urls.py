@@ -17,6 +17,8 @@ urlpatterns = [
     ),
     path("analytics/revenue/", admin_views.revenue_analytics, name="revenue_analytics"),
     path("analytics/members/", admin_views.member_analytics, name="member_analytics"),
+    # Search
+    path("search/", admin_views.admin_search, name="admin_search"),
     # Member Management
     path("members/", admin_views.list_members, name="list_members"),
     path("members/<uuid:member_id>/", admin_views.member_detail, name="member_detail"),
@@ -42,6 +44,11 @@ urlpatterns = [
     ),
     # Appointment Management
     path("appointments/", admin_views.list_appointments, name="list_appointments"),
+    path(
+        "appointments/bulk/",
+        admin_views.bulk_update_appointments_view,
+        name="bulk_update_appointments",
+    ),
     path(
         "appointments/<uuid:appointment_id>/",
         admin_views.appointment_detail,
@@ -60,6 +67,9 @@ urlpatterns = [
     # Offers Management
     path("offers/", admin_views.list_offers, name="list_offers"),
     path("offers/create/", admin_views.create_offer, name="create_offer"),
+    path(
+        "offers/bulk/", admin_views.bulk_update_offers_view, name="bulk_update_offers"
+    ),
     path("offers/<uuid:offer_id>/", admin_views.offer_detail, name="offer_detail"),
     path(
         "offers/<uuid:offer_id>/update/", admin_views.update_offer, name="update_offer"
@@ -67,8 +77,27 @@ urlpatterns = [
     path(
         "offers/<uuid:offer_id>/delete/", admin_views.delete_offer, name="delete_offer"
     ),
+    # Broadcasts
+    path("broadcasts/", admin_views.list_broadcasts, name="list_broadcasts"),
+    path(
+        "broadcasts/audience/",
+        admin_views.preview_broadcast_audience,
+        name="preview_broadcast_audience",
+    ),
+    path("broadcasts/create/", admin_views.create_broadcast, name="create_broadcast"),
+    path(
+        "broadcasts/<uuid:broadcast_id>/",
+        admin_views.broadcast_detail,
+        name="broadcast_detail",
+    ),
+    path(
+        "broadcasts/<uuid:broadcast_id>/cancel/",
+        admin_views.cancel_broadcast,
+        name="cancel_broadcast",
+    ),
     # Chat Management
     path("chat/threads/", admin_views.list_chat_threads, name="list_chat_threads"),
+    path("chat/search/", admin_views.search_chat_messages, name="search_chat_messages"),
     path(
         "chat/threads/<uuid:thread_id>/",
         admin_views.chat_thread_detail,
@@ -89,15 +118,31 @@ urlpatterns = [
         admin_views.location_detail,
         name="location_detail",
     ),
+    path(
+        "locations/<uuid:location_id>/calendar/",
+        admin_views.location_calendar,
+        name="location_calendar",
+    ),
     # Service Schedule Management
     path(
         "service-schedules/",
         admin_views.list_service_schedules,
         name="list_service_schedules",
     ),
+    path(
+        "service-schedules/bulk/",
+        admin_views.bulk_update_service_schedules_view,
+        name="bulk_update_service_schedules",
+    ),
     path(
         "service-schedules/<uuid:schedule_id>/",
         admin_views.service_schedule_detail,
         name="service_schedule_detail",
     ),
+    # Data Exports
+    path(
+        "exports/<str:dataset>.<str:export_format>",
+        admin_views.export_data,
+        name="export_data",
+    ),
 ]
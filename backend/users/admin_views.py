@@ -3,8 +3,9 @@ Admin API Views for Membership Auto Admin Dashboard
 Handles all admin-only endpoints for managing the platform
 """
 
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
+from django.core.exceptions import ValidationError
 from django.contrib.auth import authenticate
 from django.db.models import Count, Sum, Avg, Q
 from django.db.models.functions import TruncMonth
@@ -15,10 +16,34 @@ from rest_framework.authtoken.models import Token
 from datetime import datetime, timedelta
 from decimal import Decimal
 import json
+import time
+import uuid
 
 from .models import User
+from .bulk import (
+    bulk_update_appointments,
+    bulk_update_offers,
+    bulk_update_service_schedules,
+)
+from .exports import (
+    EXPORTS,
+    FORMATS as EXPORT_FORMATS,
+    aiter_chunks,
+    chunked,
+    csv_lines,
+    export_rows,
+    ndjson_lines,
+    parse_day,
+)
+from .pagination import paginate
+from .search import (
+    DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT,
+    MAX_LIMIT as MAX_SEARCH_LIMIT,
+    search,
+)
 from vehicles.models import Vehicle
 from appointments.models import Appointment, Location
+from appointments.availability import invalidate_appointment_availability
 from offers.models import Offer
 from referrals.models import Referral
 from chat.models import ChatMessage
@@ -111,45 +136,47 @@ def verify_admin_token(request):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def dashboard_analytics(request):
     """
-    Get comprehensive dashboard analytics
+    Get comprehensive dashboard analytics from the daily metrics rollups
     """
+    from analytics.models import DailyMetrics
+
     # Date ranges
-    today = datetime.now().date()
+    today = timezone.localdate()
+    yesterday = today - timedelta(days=1)
     month_start = today.replace(day=1)
     last_month_start = (month_start - timedelta(days=1)).replace(day=1)
-
-    # Total counts
-    total_members = User.objects.filter(is_active=True, is_staff=False).count()
-    last_month_members = User.objects.filter(
-        is_active=True, is_staff=False, created_at__lt=month_start
-    ).count()
-
-    total_vehicles = Vehicle.objects.count()
-    # Vehicle model doesn't have created_at field
-    last_month_vehicles = total_vehicles  # Placeholder
-
-    # Revenue (simplified - you'll need to adjust based on your billing model)
-    # This assumes you have a Subscription or Payment model
-    monthly_revenue = total_members * 79  # Average plan price
-    last_month_revenue = last_month_members * 79
-
-    # Appointments - using start_time field
-    today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    today_end = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-    appointments_today = Appointment.objects.filter(
-        start_time__range=(today_start, today_end)
-    ).count()
-
-    yesterday = today - timedelta(days=1)
-    yesterday_start = timezone.make_aware(
-        datetime.combine(yesterday, datetime.min.time())
+    chart_start = today - timedelta(days=6)
+    revenue_chart_start = month_start
+    for _ in range(5):
+        revenue_chart_start = (revenue_chart_start - timedelta(days=1)).replace(day=1)
+
+    # Running totals and month-over-month figures in one pass over the rollups
+    totals = DailyMetrics.objects.aggregate(
+        total_members=Sum("new_members", filter=Q(date__lte=today)),
+        last_month_members=Sum("new_members", filter=Q(date__lt=month_start)),
+        total_vehicles=Sum("new_vehicles", filter=Q(date__lte=today)),
+        last_month_vehicles=Sum("new_vehicles", filter=Q(date__lt=month_start)),
+        monthly_revenue=Sum("revenue", filter=Q(date__gte=month_start)),
+        last_month_revenue=Sum(
+            "revenue", filter=Q(date__gte=last_month_start, date__lt=month_start)
+        ),
     )
-    yesterday_end = timezone.make_aware(
-        datetime.combine(yesterday, datetime.max.time())
+    totals = {key: value or 0 for key, value in totals.items()}
+    total_members = totals["total_members"]
+    last_month_members = totals["last_month_members"]
+    total_vehicles = totals["total_vehicles"]
+    last_month_vehicles = totals["last_month_vehicles"]
+    monthly_revenue = float(totals["monthly_revenue"])
+    last_month_revenue = float(totals["last_month_revenue"])
+
+    # Last 7 days of rows (appointments chart, today/yesterday, tier snapshot)
+    recent = {row.date: row for row in DailyMetrics.objects.filter(
+        date__gte=min(chart_start, yesterday), date__lte=today
+    )}
+    appointments_today = recent[today].appointments_total if today in recent else 0
+    appointments_yesterday = (
+        recent[yesterday].appointments_total if yesterday in recent else 0
     )
-    appointments_yesterday = Appointment.objects.filter(
-        start_time__range=(yesterday_start, yesterday_end)
-    ).count()
 
     # Calculate percentage changes
     members_change = (
@@ -173,40 +200,50 @@ def dashboard_analytics(request):
         else 0
     )
 
-    # Revenue chart data (last 6 months)
+    # Revenue chart data (last 6 months including this one)
+    monthly = {
+        row["month"]: row["revenue"]
+        for row in DailyMetrics.objects.filter(
+            date__gte=revenue_chart_start, date__lte=today
+        )
+        .annotate(month=TruncMonth("date"))
+        .order_by()
+        .values("month")
+        .annotate(revenue=Sum("revenue"))
+    }
     revenue_chart = []
-    for i in range(6, 0, -1):
-        month_date = today - timedelta(days=30 * i)
-        month_name = month_date.strftime("%b")
-        # Simplified - you'll need actual revenue tracking
+    month_date = revenue_chart_start
+    while month_date <= today:
         revenue_chart.append(
             {
-                "month": month_name,
-                "revenue": (total_members - (i * 10)) * 79,  # Simulated growth
+                "month": month_date.strftime("%b"),
+                "revenue": float(monthly.get(month_date, 0) or 0),
             }
         )
-
-    # Membership tiers distribution
+        month_date = (month_date + timedelta(days=32)).replace(day=1)
+
+    # Membership tiers distribution from the latest snapshot
+    tiers = {}
+    for day in sorted(recent, reverse=True):
+        if recent[day].membership_tiers:
+            tiers = recent[day].membership_tiers
+            break
     membership_tiers = [
-        {"name": "Basic", "value": int(total_members * 0.40)},
-        {"name": "Plus", "value": int(total_members * 0.35)},
-        {"name": "Premium", "value": int(total_members * 0.20)},
-        {"name": "Elite", "value": int(total_members * 0.05)},
+        {"name": tier.title(), "value": count}
+        for tier, count in sorted(tiers.items(), key=lambda item: -item[1])
     ]
 
     # Appointments by day (this week)
     appointments_chart = []
     for i in range(7):
-        day_date = today - timedelta(days=6 - i)
-        day_name = day_date.strftime("%a")
-        day_appointments = Appointment.objects.filter(scheduled_date=day_date)
-
+        day_date = chart_start + timedelta(days=i)
+        row = recent.get(day_date)
         appointments_chart.append(
             {
-                "day": day_name,
-                "scheduled": day_appointments.filter(status="scheduled").count(),
-                "completed": day_appointments.filter(status="completed").count(),
-                "cancelled": day_appointments.filter(status="cancelled").count(),
+                "day": day_date.strftime("%a"),
+                "scheduled": row.appointments_scheduled if row else 0,
+                "completed": row.appointments_completed if row else 0,
+                "cancelled": row.appointments_cancelled if row else 0,
             }
         )
 
@@ -231,14 +268,47 @@ def dashboard_analytics(request):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def revenue_analytics(request):
     """
-    Detailed revenue analytics
+    Revenue and MRR analytics: live MRR/ARR/ARPU from active memberships and
+    a monthly series of MRR movements and revenue by plan from payments
     """
-    # This is simplified - implement based on your actual billing system
+    from analytics.revenue import add_months, get_revenue
+
+    try:
+        months = min(max(int(request.GET.get("months", 12)), 1), 36)
+    except ValueError:
+        return JsonResponse({"error": "Invalid months"}, status=400)
+
+    last_month = timezone.localdate().replace(day=1)
+    first_month = add_months(last_month, 1 - months)
+    report = get_revenue(first_month, last_month)
+    current = report["current"]
+
+    revenue_by_plan = {}
+    for month in report["months"]:
+        for plan, amount in month["revenue_by_plan"].items():
+            revenue_by_plan[plan] = revenue_by_plan.get(plan, 0) + amount
+
+    def as_float(values):
+        return {
+            key: float(value) if isinstance(value, Decimal) else value
+            for key, value in values.items()
+        }
+
     return JsonResponse(
         {
-            "total_revenue": 0,
-            "monthly_recurring": 0,
-            "average_per_member": 0,
+            "total_revenue": float(sum(m["revenue"] for m in report["months"])),
+            "monthly_recurring": float(current["mrr"]),
+            "annual_recurring": float(current["arr"]),
+            "average_per_member": float(current["arpu"]),
+            "active_subscriptions": current["subscriptions"],
+            "revenue_by_plan": as_float(revenue_by_plan),
+            "months": [
+                {
+                    **as_float(month),
+                    "revenue_by_plan": as_float(month["revenue_by_plan"]),
+                }
+                for month in report["months"]
+            ],
         }
     )
 
@@ -247,15 +317,92 @@ def revenue_analytics(request):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def member_analytics(request):
     """
-    Member growth and engagement analytics
+    Member growth, 30-day activity, churn and signup-cohort retention from the
+    nightly rollup_cohorts results
     """
+    from analytics.cohorts import active_member_ids
+    from analytics.models import CohortRetention, DailyMetrics, MonthlyChurn
+    from analytics.revenue import add_months
+
     total_members = User.objects.filter(is_active=True, is_staff=False).count()
+    this_month = timezone.localdate().replace(day=1)
+    first_month = add_months(this_month, -11)
+
+    active_30_days = (
+        DailyMetrics.objects.filter(active_members_30d__isnull=False)
+        .order_by("-date")
+        .values_list("active_members_30d", flat=True)
+        .first()
+    )
+    if active_30_days is None:
+        # Before the first nightly run
+        active_30_days = len(active_member_ids(timezone.now() - timedelta(days=30)))
+
+    churn = [
+        {
+            "month": row.month.strftime("%Y-%m"),
+            "active": row.active_members,
+            "new": row.new_members,
+            "churned": row.churned_members,
+            "reactivated": row.reactivated_members,
+            "churn_rate": row.churn_rate,
+        }
+        for row in MonthlyChurn.objects.filter(month__gte=first_month)
+    ]
+    # The current month is still in progress
+    completed = [row for row in churn if row["month"] < this_month.strftime("%Y-%m")]
+
+    cohorts = {}
+    for cell in CohortRetention.objects.filter(cohort__gte=first_month):
+        cohort = cohorts.setdefault(
+            cell.cohort,
+            {
+                "cohort": cell.cohort.strftime("%Y-%m"),
+                "size": cell.cohort_size,
+                "retention": [],
+            },
+        )
+        cohort["retention"].append(cell.retention_rate)
 
     return JsonResponse(
         {
             "total": total_members,
-            "active_30_days": total_members,  # Implement activity tracking
-            "churn_rate": 2.5,  # Implement churn calculation
+            "active_30_days": active_30_days,
+            "churn_rate": completed[-1]["churn_rate"] if completed else 0,
+            "churn": churn,
+            "cohorts": list(cohorts.values()),
+        }
+    )
+
+
+# ============================================================================
+# SEARCH
+# ============================================================================
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def admin_search(request):
+    """
+    Ranked search across members, vehicles (VIN, plate, make/model) and
+    appointments within a fixed time budget
+    """
+    query = request.GET.get("q", "")
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_SEARCH_LIMIT))
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    limit = min(max(limit, 1), MAX_SEARCH_LIMIT)
+
+    started = time.monotonic()
+    found = search(query, limit=limit)
+
+    return JsonResponse(
+        {
+            "query": query,
+            "results": found["results"],
+            "partial": found["partial"],
+            "took_ms": round((time.monotonic() - started) * 1000, 1),
         }
     )
 
@@ -272,10 +419,10 @@ def list_members(request):
     List all members with filtering and pagination
     """
     search = request.GET.get("search", "")
-    page = int(request.GET.get("page", 1))
-    per_page = int(request.GET.get("per_page", 20))
 
-    members = User.objects.filter(is_staff=False)
+    members = User.objects.filter(is_staff=False).annotate(
+        vehicle_count=Count("vehicles")
+    )
 
     if search:
         members = members.filter(
@@ -284,37 +431,28 @@ def list_members(request):
             | Q(membership_id__icontains=search)
         )
 
-    total = members.count()
-    start = (page - 1) * per_page
-    end = start + per_page
-
-    members_data = []
-    for member in members[start:end]:
-        vehicles = Vehicle.objects.filter(user=member)
-        members_data.append(
-            {
-                "id": str(member.id),
-                "name": member.name or "No name",
-                "email": member.email,
-                "phone": member.phone or "",
-                "membership_id": member.membership_id or "",
-                "role": member.role,
-                "rewards_balance": member.rewards_balance,
-                "created_at": member.created_at.isoformat(),
-                "is_active": member.is_active,
-                "vehicle_count": vehicles.count(),
-            }
-        )
+    try:
+        page, meta = paginate(members, request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
-    return JsonResponse(
+    members_data = [
         {
-            "results": members_data,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": (total + per_page - 1) // per_page,
+            "id": str(member.id),
+            "name": member.name or "No name",
+            "email": member.email,
+            "phone": member.phone or "",
+            "membership_id": member.membership_id or "",
+            "role": member.role,
+            "rewards_balance": member.rewards_balance,
+            "created_at": member.created_at.isoformat(),
+            "is_active": member.is_active,
+            "vehicle_count": member.vehicle_count,
         }
-    )
+        for member in page
+    ]
+
+    return JsonResponse({"results": members_data, **meta})
 
 
 @api_view(["GET"])
@@ -424,8 +562,6 @@ def list_vehicles(request):
     List all vehicles with filtering
     """
     search = request.GET.get("search", "")
-    page = int(request.GET.get("page", 1))
-    per_page = int(request.GET.get("per_page", 20))
 
     vehicles = Vehicle.objects.select_related("user").all()
 
@@ -439,9 +575,10 @@ def list_vehicles(request):
             | Q(user__name__icontains=search)
         )
 
-    total = vehicles.count()
-    start = (page - 1) * per_page
-    end = start + per_page
+    try:
+        page, meta = paginate(vehicles, request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
     vehicles_data = [
         {
@@ -466,18 +603,10 @@ def list_vehicles(request):
                 else timezone.now().isoformat()
             ),
         }
-        for v in vehicles[start:end]
+        for v in page
     ]
 
-    return JsonResponse(
-        {
-            "results": vehicles_data,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": (total + per_page - 1) // per_page,
-        }
-    )
+    return JsonResponse({"results": vehicles_data, **meta})
 
 
 @api_view(["GET"])
@@ -586,6 +715,7 @@ def list_appointments(request):
                 status=data.get("status", "scheduled"),
                 notes=data.get("notes", ""),
             )
+            invalidate_appointment_availability(appointment)
 
             return JsonResponse(
                 {
@@ -618,8 +748,6 @@ def list_appointments(request):
     # GET request - list appointments
     status = request.GET.get("status", "")
     date = request.GET.get("date", "")
-    page = int(request.GET.get("page", 1))
-    per_page = int(request.GET.get("per_page", 20))
 
     appointments = Appointment.objects.select_related(
         "user", "vehicle", "location"
@@ -635,9 +763,10 @@ def list_appointments(request):
         except ValueError:
             pass
 
-    total = appointments.count()
-    start = (page - 1) * per_page
-    end = start + per_page
+    try:
+        page, meta = paginate(appointments, request)
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
 
     appointments_data = [
         {
@@ -663,18 +792,10 @@ def list_appointments(request):
             "location": apt.location.name if apt.location else "N/A",
             "notes": apt.notes or "",
         }
-        for apt in appointments[start:end]
+        for apt in page
     ]
 
-    return JsonResponse(
-        {
-            "results": appointments_data,
-            "total": total,
-            "page": page,
-            "per_page": per_page,
-            "pages": (total + per_page - 1) // per_page,
-        }
-    )
+    return JsonResponse({"results": appointments_data, **meta})
 
 
 @api_view(["GET", "PATCH", "PUT"])
@@ -702,6 +823,8 @@ def appointment_detail(request, appointment_id):
                 appointment.notes = data.get("notes")
 
             appointment.save()
+            if appointment.status != old_status:
+                invalidate_appointment_availability(appointment)
 
             # If appointment is marked as completed and linked to service schedule, update it
             if (
@@ -780,6 +903,7 @@ def update_appointment_status(request, appointment_id):
         if hasattr(appointment, "status"):
             appointment.status = data.get("status")
             appointment.save()
+            invalidate_appointment_availability(appointment)
 
         return JsonResponse({"success": True})
     except Appointment.DoesNotExist:
@@ -798,11 +922,29 @@ def assign_appointment(request, appointment_id):
 
         # Implement technician assignment logic
 
+        invalidate_appointment_availability(appointment)
+
         return JsonResponse({"success": True})
     except Appointment.DoesNotExist:
         return JsonResponse({"error": "Appointment not found"}, status=404)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def bulk_update_appointments_view(request):
+    """
+    Apply changes to many appointments at once
+
+    Body: {"ids": [...]} or {"filter": {...}}, plus {"changes": {...}} with
+    any of status, location_id and notes
+    """
+    try:
+        data = json.loads(request.body)
+        return JsonResponse(bulk_update_appointments(data))
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
 # ============================================================================
 # OFFERS MANAGEMENT
 # ============================================================================
@@ -918,6 +1060,206 @@ def delete_offer(request, offer_id):
         return JsonResponse({"error": "Offer not found"}, status=404)
 
 
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def bulk_update_offers_view(request):
+    """
+    Apply changes to many offers at once
+
+    Body: {"ids": [...]} or {"filter": {...}}, plus {"changes": {...}} with
+    any of title, description, terms, expiry,
+    eligible_memberships and locations
+    """
+    try:
+        data = json.loads(request.body)
+        return JsonResponse(bulk_update_offers(data))
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+# ============================================================================
+# BROADCASTS
+# ============================================================================
+
+
+def _broadcast_data(broadcast):
+    return {
+        "id": str(broadcast.id),
+        "title": broadcast.title,
+        "body": broadcast.body,
+        "notification_type": broadcast.notification_type,
+        "offer_id": str(broadcast.offer_id) if broadcast.offer_id else None,
+        "audience": broadcast.audience,
+        "status": broadcast.status,
+        "audience_size": broadcast.audience_size,
+        "recipients": broadcast.recipients,
+        "success_count": broadcast.success_count,
+        "failure_count": broadcast.failure_count,
+        "progress": (
+            round(min(broadcast.recipients / broadcast.audience_size, 1) * 100, 1)
+            if broadcast.audience_size
+            else (100.0 if broadcast.status == "completed" else 0.0)
+        ),
+        "created_at": broadcast.created_at.isoformat(),
+        "started_at": (
+            broadcast.started_at.isoformat() if broadcast.started_at else None
+        ),
+        "completed_at": (
+            broadcast.completed_at.isoformat() if broadcast.completed_at else None
+        ),
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def list_broadcasts(request):
+    """
+    List push broadcasts, newest first, cursor-paginated
+    """
+    from notifications.models import Broadcast
+
+    broadcasts = Broadcast.objects.all()
+    if request.GET.get("status"):
+        broadcasts = broadcasts.filter(status=request.GET["status"])
+
+    try:
+        page, meta = paginate(broadcasts, request)
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse(
+        {"results": [_broadcast_data(broadcast) for broadcast in page], **meta}
+    )
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def preview_broadcast_audience(request):
+    """
+    Count the devices an audience reaches
+
+    Body: {"audience": {...}} with the filters accepted by create_broadcast
+    """
+    from notifications.broadcast import audience_size, clean_audience
+
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        audience = clean_audience(data.get("audience"))
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"audience": audience, "devices": audience_size(audience)})
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def create_broadcast(request):
+    """
+    Queue a push broadcast to an audience segment
+
+    Body: title, body, optional notification_type, data and image_url, and an
+    audience with any of plan_tiers, active_membership, vehicle_makes,
+    location_ids and near {lat, lng, radius_km}. With offer_id the offer
+    supplies the message and, unless given, its tiers and locations. A
+    run_broadcasts worker sends it.
+    """
+    from notifications.broadcast import audience_size, clean_audience
+    from notifications.models import Broadcast, NotificationLog
+
+    try:
+        data = json.loads(request.body)
+        if not isinstance(data, dict):
+            raise ValueError("Request body must be a JSON object")
+        audience = data.get("audience") or {}
+        if not isinstance(audience, dict):
+            raise ValueError("audience must be an object")
+        audience = dict(audience)
+        offer = None
+        if data.get("offer_id"):
+            offer = Offer.objects.get(id=data["offer_id"])
+            if offer.expiry and offer.expiry <= timezone.now():
+                raise ValueError("Offer has expired")
+            audience.setdefault("plan_tiers", offer.eligible_memberships)
+            audience.setdefault("location_ids", [str(loc) for loc in offer.locations])
+        audience = clean_audience(audience)
+    except Offer.DoesNotExist:
+        return JsonResponse({"error": "Offer not found"}, status=404)
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    title = data.get("title") or (f"Special Offer: {offer.title}" if offer else "")
+    body = data.get("body") or ((offer.description or "")[:100] if offer else "")
+    if not title or not body:
+        return JsonResponse({"error": "title and body are required"}, status=400)
+
+    notification_type = data.get("notification_type") or (
+        "offer" if offer else "announcement"
+    )
+    if notification_type not in dict(NotificationLog.TYPE_CHOICES):
+        return JsonResponse({"error": "Invalid notification_type"}, status=400)
+
+    payload = data.get("data") or {}
+    if not isinstance(payload, dict):
+        return JsonResponse({"error": "data must be an object"}, status=400)
+    if offer:
+        payload = {
+            "type": "offer",
+            "offer_id": str(offer.id),
+            "deepLink": "/(authenticated)/offers",
+            **payload,
+        }
+
+    broadcast = Broadcast.objects.create(
+        title=title,
+        body=body,
+        notification_type=notification_type,
+        data=payload,
+        image_url=data.get("image_url"),
+        offer=offer,
+        audience=audience,
+        audience_size=audience_size(audience),
+        created_by=request.user,
+    )
+    return JsonResponse(_broadcast_data(broadcast), status=201)
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def broadcast_detail(request, broadcast_id):
+    """
+    Get a broadcast and its progress
+    """
+    from notifications.models import Broadcast
+
+    try:
+        broadcast = Broadcast.objects.get(id=broadcast_id)
+    except Broadcast.DoesNotExist:
+        return JsonResponse({"error": "Broadcast not found"}, status=404)
+
+    return JsonResponse(_broadcast_data(broadcast))
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def cancel_broadcast(request, broadcast_id):
+    """
+    Stop a broadcast; a running one stops after its current batch
+    """
+    from notifications.models import Broadcast
+
+    cancelled = Broadcast.objects.filter(
+        id=broadcast_id, status__in=["pending", "running"]
+    ).update(status="cancelled", completed_at=timezone.now())
+    if not cancelled:
+        if not Broadcast.objects.filter(id=broadcast_id).exists():
+            return JsonResponse({"error": "Broadcast not found"}, status=404)
+        return JsonResponse({"error": "Broadcast already finished"}, status=400)
+
+    return JsonResponse(_broadcast_data(Broadcast.objects.get(id=broadcast_id)))
+
+
 # ============================================================================
 # CHAT MANAGEMENT
 # ============================================================================
@@ -927,16 +1269,117 @@ def delete_offer(request, offer_id):
 @permission_classes([IsAuthenticated, IsAdminUser])
 def list_chat_threads(request):
     """
-    List all chat threads for admin view
+    Admin chat inbox, most recent conversation first, cursor-paginated
     """
-    from chat.models import ChatThread
-    from chat.serializers import ChatThreadSerializer
+    from chat.models import ChatInbox
+    from chat.presence import online
 
-    threads = (
-        ChatThread.objects.all().prefetch_related("messages").order_by("-created_at")
-    )
-    serializer = ChatThreadSerializer(threads, many=True)
-    return JsonResponse({"threads": serializer.data})
+    inbox = ChatInbox.objects.select_related("thread", "user")
+
+    if request.GET.get("unread") == "true":
+        inbox = inbox.filter(unread_by_support__gt=0)
+    if request.GET.get("member"):
+        try:
+            inbox = inbox.filter(user_id=uuid.UUID(request.GET["member"]))
+        except ValueError:
+            return JsonResponse({"error": "Invalid member id"}, status=400)
+    if request.GET.get("assigned") == "me":
+        inbox = inbox.filter(thread__assigned_to=request.user)
+    elif request.GET.get("assigned") == "none":
+        inbox = inbox.filter(thread__assigned_to__isnull=True)
+    if request.GET.get("status"):
+        inbox = inbox.filter(thread__status=request.GET["status"])
+
+    try:
+        page, meta = paginate(inbox, request, field="last_message_at")
+    except ValueError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    members_online = online({row.user_id for row in page})
+    threads_data = [
+        {
+            "id": str(row.thread_id),
+            "member": {
+                "id": str(row.user.id),
+                "name": row.user.name or "No name",
+                "email": row.user.email,
+            },
+            "subject": row.thread.subject,
+            "status": row.thread.status,
+            "assigned_to": (
+                str(row.thread.assigned_to_id) if row.thread.assigned_to_id else None
+            ),
+            "member_online": row.user_id in members_online,
+            "last_message": row.last_message_preview,
+            "last_message_sender": row.last_message_sender,
+            "last_message_time": row.last_message_at.isoformat(),
+            "message_count": row.message_count,
+            "unread_count": row.unread_by_support,
+            "created_at": row.thread.created_at.isoformat(),
+        }
+        for row in page
+    ]
+
+    return JsonResponse({"results": threads_data, **meta})
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def search_chat_messages(request):
+    """
+    Full-text search across every chat message, newest first
+
+    ?q= is required; narrow with ?thread=, ?member= or ?sender=user|support.
+    Cursor-paginated like the inbox, with a highlighted snippet per result.
+    """
+    from chat.search import highlights, search_messages
+
+    query = request.GET.get("q", "")
+    messages = ChatMessage.objects.select_related("thread__user")
+    try:
+        if request.GET.get("thread"):
+            messages = messages.filter(thread_id=uuid.UUID(request.GET["thread"]))
+        if request.GET.get("member"):
+            messages = messages.filter(
+                thread__user_id=uuid.UUID(request.GET["member"])
+            )
+    except ValueError:
+        return JsonResponse({"error": "Invalid thread or member id"}, status=400)
+    if request.GET.get("sender"):
+        messages = messages.filter(sender=request.GET["sender"])
+
+    messages = search_messages(messages, query)
+    if messages is None:
+        return JsonResponse({"error": "Search query is required"}, status=400)
+
+    try:
+        page, meta = paginate(messages, request)
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    snippets = highlights(page, query)
+    results = [
+        {
+            "id": str(message.id),
+            "thread": {
+                "id": str(message.thread_id),
+                "subject": message.thread.subject,
+                "status": message.thread.status,
+            },
+            "member": {
+                "id": str(message.thread.user_id),
+                "name": message.thread.user.name or "No name",
+                "email": message.thread.user.email,
+            },
+            "sender": message.sender,
+            "body": message.body,
+            "highlight": snippets.get(message.pk, ""),
+            "created_at": message.created_at.isoformat(),
+        }
+        for message in page
+    ]
+
+    return JsonResponse({"query": query, "results": results, **meta})
 
 
 @api_view(["GET"])
@@ -947,10 +1390,12 @@ def chat_thread_detail(request, thread_id):
     """
     from chat.models import ChatThread, ChatMessage
     from chat.serializers import ChatMessageSerializer
+    from chat.inbox import mark_read
 
     try:
         thread = ChatThread.objects.get(id=thread_id)
         messages = ChatMessage.objects.filter(thread=thread).order_by("created_at")
+        mark_read(thread.id, "support")
         serializer = ChatMessageSerializer(messages, many=True)
         return JsonResponse(
             {
@@ -959,6 +1404,9 @@ def chat_thread_detail(request, thread_id):
                     "user": str(thread.user.email),
                     "subject": thread.subject,
                     "status": thread.status,
+                    "assigned_to": (
+                        str(thread.assigned_to_id) if thread.assigned_to_id else None
+                    ),
                     "created_at": thread.created_at.isoformat(),
                 },
                 "messages": serializer.data,
@@ -973,11 +1421,36 @@ def chat_thread_detail(request, thread_id):
 def assign_chat_thread(request, thread_id):
     """
     Assign chat thread to staff member and optionally send a response
+
+    assigned_to defaults to the requesting admin; pass null to unassign.
+    The reply and the assignment are pushed to connected sockets.
     """
     from chat.models import ChatThread, ChatMessage
+    from chat.rooms import publish_assignment
 
     try:
         thread = ChatThread.objects.get(id=thread_id)
+        previous_assignee_id = thread.assigned_to_id
+
+        if "assigned_to" in request.data:
+            assignee_id = request.data.get("assigned_to")
+        else:
+            assignee_id = request.user.id
+        if assignee_id is not None:
+            try:
+                assignee = User.objects.get(id=assignee_id, is_staff=True)
+            except (User.DoesNotExist, ValidationError):
+                return JsonResponse({"error": "Staff member not found"}, status=400)
+            assignee_id = assignee.id
+
+        # Update thread status
+        thread_status = request.data.get("status", thread.status)
+        if thread_status not in dict(ChatThread.STATUS_CHOICES):
+            return JsonResponse({"error": "Invalid status"}, status=400)
+        thread.status = thread_status
+        thread.assigned_to_id = assignee_id
+        thread.save(update_fields=["status", "assigned_to"])
+        publish_assignment(thread, previous_assignee_id)
 
         # Optionally send a message from support
         message_body = request.data.get("message")
@@ -988,12 +1461,13 @@ def assign_chat_thread(request, thread_id):
                 body=message_body,
             )
 
-        # Update thread status
-        thread.status = request.data.get("status", thread.status)
-        thread.save()
-
         return JsonResponse(
-            {"success": True, "thread_id": str(thread.id), "status": thread.status}
+            {
+                "success": True,
+                "thread_id": str(thread.id),
+                "status": thread.status,
+                "assigned_to": str(assignee_id) if assignee_id else None,
+            }
         )
     except ChatThread.DoesNotExist:
         return JsonResponse({"error": "Thread not found"}, status=404)
@@ -1070,6 +1544,8 @@ def list_locations(request):
                 address=full_address,
                 phone=data.get("phone"),
                 hours=data.get("hours", {}),
+                lat=data.get("lat"),
+                lng=data.get("lng"),
             )
 
             return JsonResponse(
@@ -1079,6 +1555,8 @@ def list_locations(request):
                     "address": location.address,
                     "phone": location.phone,
                     "hours": location.hours,
+                    "lat": location.lat,
+                    "lng": location.lng,
                     "created_at": location.created_at.isoformat(),
                     "status": "active",
                 },
@@ -1096,6 +1574,8 @@ def list_locations(request):
             "address": loc.address,
             "phone": loc.phone,
             "hours": loc.hours,
+            "lat": loc.lat,
+            "lng": loc.lng,
             "created_at": loc.created_at.isoformat(),
             "status": "active",
         }
@@ -1124,6 +1604,8 @@ def location_detail(request, location_id):
                 "address": location.address,
                 "phone": location.phone,
                 "hours": location.hours,
+                "lat": location.lat,
+                "lng": location.lng,
                 "created_at": location.created_at.isoformat(),
                 "status": "active",
             }
@@ -1147,6 +1629,10 @@ def location_detail(request, location_id):
                 location.phone = data.get("phone")
             if "hours" in data:
                 location.hours = data.get("hours")
+            if "lat" in data:
+                location.lat = data.get("lat")
+            if "lng" in data:
+                location.lng = data.get("lng")
 
             location.save()
 
@@ -1157,6 +1643,8 @@ def location_detail(request, location_id):
                     "address": location.address,
                     "phone": location.phone,
                     "hours": location.hours,
+                    "lat": location.lat,
+                    "lng": location.lng,
                     "created_at": location.created_at.isoformat(),
                     "status": "active",
                 }
@@ -1169,6 +1657,28 @@ def location_detail(request, location_id):
         return JsonResponse({"success": True}, status=204)
 
 
+@api_view(["GET", "POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def location_calendar(request, location_id):
+    """
+    Get (or create) the location's appointment calendar feed.
+    POST rotates the token, revoking the previously shared URL.
+    """
+    from appointments.models import CalendarFeed
+    from appointments.views import calendar_feed_payload
+
+    try:
+        location = Location.objects.get(id=location_id)
+    except Location.DoesNotExist:
+        return JsonResponse({"error": "Location not found"}, status=404)
+
+    feed, created = CalendarFeed.objects.get_or_create(location=location)
+    if request.method == "POST" and not created:
+        feed.rotate_token()
+
+    return JsonResponse(calendar_feed_payload(request, feed))
+
+
 # ============================================================================
 # SERVICE SCHEDULE MANAGEMENT
 # ============================================================================
@@ -1418,3 +1928,56 @@ def service_schedule_detail(request, schedule_id):
     elif request.method == "DELETE":
         schedule.delete()
         return JsonResponse({"success": True}, status=204)
+
+
+@api_view(["POST"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def bulk_update_service_schedules_view(request):
+    """
+    Apply changes to many service schedules at once
+
+    Body: {"ids": [...]} or {"filter": {...}}, plus {"changes": {...}} with
+    any of status, notes, mileage_trigger,
+    time_trigger_months, next_due_mileage and next_due_date
+    """
+    try:
+        data = json.loads(request.body)
+        return JsonResponse(bulk_update_service_schedules(data))
+    except (ValueError, ValidationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+# ============================================================================
+# DATA EXPORTS
+# ============================================================================
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def export_data(request, dataset, export_format):
+    """
+    Stream an export as CSV or NDJSON, optionally limited to ?since=&until=
+    (YYYY-MM-DD, inclusive)
+    """
+    if dataset not in EXPORTS or export_format not in EXPORT_FORMATS:
+        return JsonResponse({"error": "Unknown export"}, status=404)
+
+    try:
+        since = parse_day(request.GET.get("since"))
+        until = parse_day(request.GET.get("until"))
+    except ValueError:
+        return JsonResponse({"error": "Dates must be YYYY-MM-DD"}, status=400)
+
+    headers, rows = export_rows(dataset, since=since, until=until)
+    lines = csv_lines if export_format == "csv" else ndjson_lines
+    chunks = chunked(lines(headers, rows))
+    if getattr(request, "scope", None) is not None:
+        # Served over ASGI (daphne)
+        chunks = aiter_chunks(chunks)
+
+    response = StreamingHttpResponse(
+        chunks, content_type=EXPORT_FORMATS[export_format]
+    )
+    filename = f"{dataset}-{timezone.localdate().isoformat()}.{export_format}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,465 @@
+"""
+Set-based admin bulk actions for appointments, service schedules and offers
+
+A request names its targets either as a list of ids or as a filter over a
+few whitelisted lookups, plus the changes to apply. The affected rows are
+read once under a row lock, each change lands in a single UPDATE inside one
+transaction, and the side effects (availability cache, daily metrics,
+linked service schedules, member notifications) are issued once per
+distinct location/day or member after commit rather than once per row.
+"""
+
+from datetime import datetime, time, timedelta
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, OuterRef, Q, Subquery, When
+from django.db.models.functions import Cast
+from django.utils import timezone
+from .exports import parse_day
+
+MAX_IDS = 5000
+
+APPOINTMENT_STATUS_MESSAGES = {
+    "scheduled": "Your {service} appointment on {day} is confirmed",
+    "in_progress": "Work on your {service} has started",
+    "completed": "Your {service} is complete",
+    "cancelled": "Your {service} appointment on {day} has been cancelled",
+}
+
+
+def _day_start(value):
+    return timezone.make_aware(datetime.combine(parse_day(value), time.min))
+
+
+def _day_range(field, value):
+    start = _day_start(value)
+    return Q(**{f"{field}__gte": start, f"{field}__lt": start + timedelta(days=1)})
+
+
+def _choice(choices):
+    allowed = {value for value, _ in choices}
+
+    def clean(value):
+        if value not in allowed:
+            raise ValueError(f"Invalid status: {value}")
+        return value
+
+    return clean
+
+
+def _text(value):
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise ValueError("Expected a string")
+    return value
+
+
+def _required_text(value):
+    if not value or not isinstance(value, str):
+        raise ValueError("Expected a non-empty string")
+    return value
+
+
+def _optional_int(value):
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError("Expected an integer")
+    return value
+
+
+def _optional_day(value):
+    return parse_day(value) if value else None
+
+
+def _datetime(value):
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _optional_datetime(value):
+    return _datetime(value) if value else None
+
+
+def _string_list(value):
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError("Expected a list of strings")
+    return value
+
+
+def _location(value):
+    from appointments.models import Location
+
+    try:
+        if not Location.objects.filter(pk=value).exists():
+            raise ValueError("Location not found")
+    except ValidationError as e:
+        raise ValueError("Location not found") from e
+    return Location._meta.pk.to_python(value)
+
+
+def _targets(model, payload, filters):
+    """Queryset of the rows named by payload["ids"] or payload["filter"]"""
+    ids = payload.get("ids")
+    criteria = payload.get("filter")
+    if bool(ids) == bool(criteria):
+        raise ValueError("Provide either ids or filter")
+
+    if ids:
+        if not isinstance(ids, list) or len(ids) > MAX_IDS:
+            raise ValueError(f"ids must be a list of at most {MAX_IDS}")
+        try:
+            ids = [model._meta.pk.to_python(pk) for pk in ids]
+        except ValidationError as e:
+            raise ValueError("Invalid id") from e
+        return model.objects.filter(pk__in=ids)
+
+    if not isinstance(criteria, dict):
+        raise ValueError("filter must be an object")
+    unknown = set(criteria) - set(filters)
+    if unknown:
+        raise ValueError(f"Unsupported filter: {', '.join(sorted(unknown))}")
+    try:
+        conditions = [filters[name](value) for name, value in criteria.items()]
+    except ValidationError as e:
+        raise ValueError("Invalid filter value") from e
+    return model.objects.filter(*conditions)
+
+
+def _changes(payload, fields):
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object")
+    changes = payload.get("changes")
+    if not isinstance(changes, dict) or not changes:
+        raise ValueError("changes must be a non-empty object")
+    unknown = set(changes) - set(fields)
+    if unknown:
+        raise ValueError(f"Unsupported field: {', '.join(sorted(unknown))}")
+    cleaned = {}
+    for name, value in changes.items():
+        try:
+            cleaned[name] = fields[name](value)
+        except ValueError as e:
+            raise ValueError(f"{name}: {e}") from e
+    return cleaned
+
+
+def _notify(messages, notification_type):
+    """
+    Queue the batch in the notification outbox as part of the transaction,
+    or send it once the transaction commits when the outbox is off
+    """
+    if not messages:
+        return
+
+    if settings.NOTIFICATION_OUTBOX:
+        from notifications.outbox import enqueue
+
+        enqueue(messages, notification_type)
+        return
+
+    def send():
+        from notifications.utils import send_bulk_notifications
+
+        send_bulk_notifications(messages, notification_type)
+
+    transaction.on_commit(send)
+
+
+# ============================================================================
+# APPOINTMENTS
+# ============================================================================
+
+
+def _appointment_filters():
+    from appointments.models import Appointment
+
+    status = _choice(Appointment.STATUS_CHOICES)
+    return {
+        "status": lambda value: Q(status=status(value)),
+        "location_id": lambda value: Q(location_id=value),
+        "user_id": lambda value: Q(user_id=value),
+        "date": lambda value: _day_range("start_time", value),
+        "start_after": lambda value: Q(start_time__gte=_datetime(value)),
+        "start_before": lambda value: Q(start_time__lt=_datetime(value)),
+    }
+
+
+def complete_service_schedules(schedule_ids, today=None):
+    """
+    Roll linked service schedules forward after their appointments complete
+
+    Mirrors the single-appointment path in appointment_detail with a
+    handful of UPDATEs: one for the completion date and status, one for
+    mileage from each vehicle's odometer, and one per distinct time
+    trigger for the next due date.
+    """
+    from services.models import ServiceSchedule
+    from vehicles.models import Vehicle
+
+    if not schedule_ids:
+        return 0
+    today = today or timezone.localdate()
+    now = timezone.now()
+    schedules = ServiceSchedule.objects.filter(pk__in=schedule_ids)
+    updated = schedules.update(
+        last_completed_date=today, status="upcoming", updated_at=now
+    )
+
+    odometer = Cast(
+        Subquery(
+            Vehicle.objects.filter(pk=OuterRef("vehicle_id")).values("odometer")[:1]
+        ),
+        IntegerField(),
+    )
+    schedules.filter(vehicle__odometer__gt=0).update(
+        last_completed_mileage=odometer,
+        next_due_mileage=Case(
+            When(mileage_trigger__isnull=False, then=odometer + F("mileage_trigger")),
+            default=F("next_due_mileage"),
+        ),
+    )
+
+    triggers = (
+        schedules.filter(time_trigger_months__gt=0)
+        .order_by()
+        .values_list("time_trigger_months", flat=True)
+        .distinct()
+    )
+    for months in list(triggers):
+        schedules.filter(time_trigger_months=months).update(
+            next_due_date=today + relativedelta(months=months)
+        )
+    return updated
+
+
+def bulk_update_appointments(payload):
+    """
+    Apply status, location assignment or notes to many appointments
+
+    Returns {"matched", "updated", "notified"}. Raises ValueError for an
+    invalid request.
+    """
+    from analytics.rollups import local_date, refresh_day
+    from appointments.availability import invalidate_availability
+    from appointments.models import Appointment, Location
+
+    changes = _changes(
+        payload,
+        {
+            "status": _choice(Appointment.STATUS_CHOICES),
+            "location_id": _location,
+            "notes": _text,
+        },
+    )
+    targets = _targets(Appointment, payload, _appointment_filters())
+
+    with transaction.atomic():
+        rows = list(
+            targets.select_for_update().values_list(
+                "id",
+                "user_id",
+                "location_id",
+                "start_time",
+                "status",
+                "service_schedule_id",
+                "services",
+            )
+        )
+        if not rows:
+            return {"matched": 0, "updated": 0, "notified": 0}
+
+        # Only the rows locked above; re-running the filter could pick up rows
+        # that started matching since, and change them without a notification
+        updated = Appointment.objects.filter(pk__in=[row[0] for row in rows]).update(
+            **changes, updated_at=timezone.now()
+        )
+
+        # Old and new location/day pairs both change availability
+        slots = {}
+        for _, _, location_id, start_time, _, _, _ in rows:
+            day = local_date(start_time)
+            slots.setdefault((location_id, day), start_time)
+            if "location_id" in changes:
+                slots.setdefault((changes["location_id"], day), start_time)
+        for (location_id, _), start_time in slots.items():
+            invalidate_availability(location_id, start_time)
+        for day in {day for _, day in slots}:
+            refresh_day("appointments", day)
+
+        new_status = changes.get("status")
+        if new_status == "completed":
+            complete_service_schedules(
+                {
+                    schedule_id
+                    for _, _, _, _, status, schedule_id, _ in rows
+                    if schedule_id and status != "completed"
+                }
+            )
+
+        location_name = None
+        if "location_id" in changes:
+            location_name = (
+                Location.objects.filter(pk=changes["location_id"])
+                .values_list("name", flat=True)
+                .first()
+            )
+
+        messages = []
+        for apt_id, user_id, location_id, start_time, status, _, services in rows:
+            service = ", ".join(services) if services else "service"
+            day = timezone.localtime(start_time).strftime("%b %d")
+            if new_status and new_status != status:
+                body = APPOINTMENT_STATUS_MESSAGES[new_status].format(
+                    service=service, day=day
+                )
+            elif location_name and changes["location_id"] != location_id:
+                body = (
+                    f"Your {service} appointment on {day} has moved to "
+                    f"{location_name}"
+                )
+            else:
+                continue
+            messages.append(
+                {
+                    "user_id": user_id,
+                    "title": "Appointment Update",
+                    "body": body,
+                    "data": {
+                        "type": "appointment",
+                        "appointment_id": str(apt_id),
+                        "deepLink": "/(authenticated)/appointments",
+                    },
+                }
+            )
+        _notify(messages, "appointment_update")
+
+    return {"matched": len(rows), "updated": updated, "notified": len(messages)}
+
+
+# ============================================================================
+# SERVICE SCHEDULES
+# ============================================================================
+
+
+def bulk_update_service_schedules(payload):
+    """
+    Apply status or trigger changes to many service schedules
+
+    Members are notified when a schedule becomes due_soon or overdue.
+    Returns {"matched", "updated", "notified"}.
+    """
+    from services.models import ServiceSchedule
+
+    status = _choice(ServiceSchedule._meta.get_field("status").choices)
+    changes = _changes(
+        payload,
+        {
+            "status": status,
+            "notes": _text,
+            "mileage_trigger": _optional_int,
+            "time_trigger_months": _optional_int,
+            "next_due_mileage": _optional_int,
+            "next_due_date": _optional_day,
+        },
+    )
+    targets = _targets(
+        ServiceSchedule,
+        payload,
+        {
+            "status": lambda value: Q(status=status(value)),
+            "vehicle_id": lambda value: Q(vehicle_id=value),
+            "user_id": lambda value: Q(vehicle__user_id=value),
+            "service_type_id": lambda value: Q(service_type_id=value),
+            "due_before": lambda value: Q(next_due_date__lt=parse_day(value)),
+        },
+    )
+
+    with transaction.atomic():
+        rows = list(
+            targets.select_for_update(of=("self",)).values_list(
+                "id",
+                "status",
+                "vehicle_id",
+                "vehicle__user_id",
+                "vehicle__year",
+                "vehicle__make",
+                "vehicle__model",
+                "service_type__name",
+            )
+        )
+        if not rows:
+            return {"matched": 0, "updated": 0, "notified": 0}
+
+        updated = ServiceSchedule.objects.filter(
+            pk__in=[row[0] for row in rows]
+        ).update(**changes, updated_at=timezone.now())
+
+        messages = []
+        new_status = changes.get("status")
+        if new_status in ("due_soon", "overdue"):
+            for pk, old, vehicle_id, user_id, year, make, model, service in rows:
+                if old == new_status:
+                    continue
+                vehicle = " ".join(str(part) for part in (year, make, model) if part)
+                messages.append(
+                    {
+                        "user_id": user_id,
+                        "title": "Service Due",
+                        "body": f"{service} is due for your {vehicle}",
+                        "data": {
+                            "type": "service_due",
+                            "vehicle_id": str(vehicle_id),
+                            "schedule_id": str(pk),
+                            "deepLink": "/(authenticated)/service-schedule",
+                        },
+                    }
+                )
+        _notify(messages, "service_due")
+
+    return {"matched": len(rows), "updated": updated, "notified": len(messages)}
+
+
+# ============================================================================
+# OFFERS
+# ============================================================================
+
+
+def bulk_update_offers(payload):
+    """Apply field changes to many offers, returning {"matched", "updated"}"""
+    from offers.models import Offer
+
+    changes = _changes(
+        payload,
+        {
+            "title": _required_text,
+            "description": _text,
+            "terms": _text,
+            "expiry": _optional_datetime,
+            "eligible_memberships": _string_list,
+            "locations": _string_list,
+        },
+    )
+    targets = _targets(
+        Offer,
+        payload,
+        {
+            "expired": lambda value: (
+                Q(expiry__lt=timezone.now())
+                if value
+                else Q(expiry__isnull=True) | Q(expiry__gte=timezone.now())
+            ),
+            "created_before": lambda value: Q(created_at__lt=_day_start(value)),
+        },
+    )
+
+    with transaction.atomic():
+        ids = list(targets.select_for_update().values_list("id", flat=True))
+        updated = Offer.objects.filter(pk__in=ids).update(**changes) if ids else 0
+
+    return {"matched": len(ids), "updated": updated}
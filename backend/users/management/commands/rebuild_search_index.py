@@ -0,0 +1,29 @@
+"""
+Management command to rebuild the admin search token table
+
+Only needed on databases without pg_trgm (SQLite); signals keep the table
+current afterwards. On PostgreSQL the trigram indexes need no maintenance.
+
+Usage:
+    python manage.py rebuild_search_index
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from users.search import rebuild_index, uses_token_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the admin search token table"
+
+    def handle(self, *args, **options):
+        if not uses_token_index():
+            self.stdout.write("PostgreSQL searches trigram indexes; nothing to rebuild")
+            return
+
+        with transaction.atomic():
+            indexed = rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✅ Indexed {indexed} members and vehicles for search")
+        )
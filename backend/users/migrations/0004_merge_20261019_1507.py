@@ -0,0 +1,14 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:07
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0003_membership_renewal"),
+        ("users", "0003_user_stripe_customer_id_passwordresettoken"),
+    ]
+
+    operations = [
+    ]
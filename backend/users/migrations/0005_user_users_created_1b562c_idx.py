@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_merge_20261019_1507"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(fields=["created_at", "id"], name="users_created_1b562c_idx"),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0005_user_users_created_1b562c_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SearchToken",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("kind", models.CharField(choices=[("member", "Member"), ("vehicle", "Vehicle")], max_length=16)),
+                ("object_id", models.UUIDField()),
+                ("token", models.CharField(max_length=64)),
+            ],
+            options={
+                "db_table": "search_tokens",
+                "indexes": [models.Index(fields=["kind", "token"], name="search_toke_kind_eba4d2_idx"), models.Index(fields=["kind", "object_id"], name="search_toke_kind_957255_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Trigram indexes behind admin search on PostgreSQL
+
+from django.db import migrations
+
+# Match the UPPER(col::text) LIKE expression Django emits for icontains
+COLUMNS = ["email", "name", "membership_id", "phone"]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for column in COLUMNS:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS users_{column}_trgm "
+            f"ON users USING gin (UPPER({column}::text) gin_trgm_ops)"
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for column in COLUMNS:
+        schema_editor.execute(f"DROP INDEX IF EXISTS users_{column}_trgm")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0007_searchtoken"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
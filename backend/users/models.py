@@ -57,6 +57,7 @@ class User(AbstractBaseUser):
         db_table = "users"
         indexes = [
             models.Index(fields=["email"]),
+            models.Index(fields=["created_at", "id"]),
         ]
 
     def save(self, *args, **kwargs):
@@ -170,3 +171,30 @@ class PasswordResetToken(models.Model):
     def is_expired(self):
         """Check if token has expired"""
         return timezone.now() > self.expires_at
+
+
+class SearchToken(models.Model):
+    """
+    Prefix-searchable tokens for admin search on databases without trigram
+    indexes (SQLite). Maintained by users.signals; PostgreSQL searches the
+    source columns directly through pg_trgm indexes instead.
+    """
+
+    KIND_CHOICES = [
+        ("member", "Member"),
+        ("vehicle", "Vehicle"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES)
+    object_id = models.UUIDField()
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        db_table = "search_tokens"
+        indexes = [
+            models.Index(fields=["kind", "token"]),
+            models.Index(fields=["kind", "object_id"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.token}"
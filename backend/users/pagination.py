@@ -0,0 +1,110 @@
+"""
+Keyset (cursor) pagination for admin list endpoints
+
+Pages are addressed by an opaque cursor holding the (timestamp, pk) of the
+row at the page edge, so page 10,000 costs the same index range scan as
+page 1. Totals are opt-in: ?total=exact runs COUNT(*), ?total=approximate
+uses the PostgreSQL planner's row estimate.
+"""
+
+import base64
+import json
+from datetime import datetime
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Q
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+
+
+def encode_cursor(direction, row, field="created_at"):
+    raw = json.dumps([direction, getattr(row, field).isoformat(), str(row.pk)])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, model):
+    """Return (direction, timestamp, pk) or raise ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        direction, timestamp, pk = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ("n", "p"):
+            raise ValueError(direction)
+        pk = model._meta.pk.to_python(pk)
+        return direction, datetime.fromisoformat(timestamp), pk
+    except (TypeError, ValueError, ValidationError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def approximate_count(queryset):
+    """Planner row estimate on PostgreSQL, exact count elsewhere"""
+    if connection.vendor != "postgresql":
+        return queryset.count(), False
+
+    sql, params = queryset.order_by().values("pk").query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"]), True
+
+
+def paginate(queryset, request, field="created_at"):
+    """
+    Return (rows, meta) for one page of queryset, newest first by field
+
+    meta carries per_page, next_cursor and previous_cursor, plus total and
+    total_is_approximate when ?total=exact|approximate is requested. Raises
+    ValueError for a malformed cursor or page size.
+    """
+    try:
+        per_page = int(request.GET.get("per_page", DEFAULT_PER_PAGE))
+    except ValueError as e:
+        raise ValueError("Invalid per_page") from e
+    per_page = min(max(per_page, 1), MAX_PER_PAGE)
+    cursor = request.GET.get("cursor")
+    total_mode = request.GET.get("total", "")
+
+    backwards = False
+    page = queryset.order_by(f"-{field}", "-pk")
+    if cursor:
+        direction, timestamp, pk = decode_cursor(cursor, queryset.model)
+        backwards = direction == "p"
+        # The range bound on the timestamp lets the index seek straight to
+        # the cursor; the OR only breaks ties between identical timestamps
+        if backwards:
+            after = Q(**{f"{field}__gt": timestamp})
+            after |= Q(**{field: timestamp, "pk__gt": pk})
+            page = queryset.filter(after, **{f"{field}__gte": timestamp})
+            page = page.order_by(field, "pk")
+        else:
+            before = Q(**{f"{field}__lt": timestamp})
+            before |= Q(**{field: timestamp, "pk__lt": pk})
+            page = page.filter(before, **{f"{field}__lte": timestamp})
+
+    rows = list(page[: per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    has_next = has_more if not backwards else bool(cursor)
+    has_previous = has_more if backwards else bool(cursor)
+    meta = {
+        "per_page": per_page,
+        "next_cursor": (
+            encode_cursor("n", rows[-1], field) if rows and has_next else None
+        ),
+        "previous_cursor": (
+            encode_cursor("p", rows[0], field) if rows and has_previous else None
+        ),
+    }
+
+    if total_mode == "exact":
+        meta["total"] = queryset.count()
+        meta["total_is_approximate"] = False
+    elif total_mode == "approximate":
+        meta["total"], meta["total_is_approximate"] = approximate_count(queryset)
+
+    return rows, meta
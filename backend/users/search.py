@@ -0,0 +1,306 @@
+"""
+Unified admin search across members, vehicles and appointments
+
+On PostgreSQL the source columns are matched directly and served by pg_trgm
+GIN indexes; other databases (SQLite in development) use the SearchToken
+table that users.signals keeps current. Appointments are found through their
+member and vehicle matches. Candidates are ranked in Python and every query
+shares one time budget, so a slow lookup returns partial results instead of
+holding up the request.
+"""
+
+import re
+import time
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Q
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Identifiers are also indexed by suffix so "last 6 of the VIN" works
+MIN_SUFFIX = 4
+
+MEMBER_FIELDS = {"email": 1.0, "membership_id": 1.0, "name": 0.9, "phone": 0.8}
+VEHICLE_FIELDS = {"vin": 1.0, "license_plate": 1.0, "make": 0.7, "model": 0.7}
+IDENTIFIER_FIELDS = {"membership_id", "phone", "vin", "license_plate"}
+APPOINTMENT_WEIGHT = 0.9
+
+
+def uses_token_index():
+    return connection.vendor != "postgresql"
+
+
+def tokenize(value):
+    if not value:
+        return []
+    return TOKEN_RE.findall(str(value).lower())
+
+
+def _field_tokens(field, value):
+    tokens = set(tokenize(value))
+    if field in IDENTIFIER_FIELDS and value:
+        compact = "".join(tokenize(value))
+        tokens.add(compact)
+        tokens.update(compact[i:] for i in range(len(compact) - MIN_SUFFIX + 1))
+    return {token[:64] for token in tokens if token}
+
+
+def index_object(kind, obj):
+    """Replace the search tokens of one member or vehicle"""
+    from .models import SearchToken
+
+    fields = MEMBER_FIELDS if kind == "member" else VEHICLE_FIELDS
+    tokens = set()
+    for field in fields:
+        tokens |= _field_tokens(field, getattr(obj, field))
+    if kind == "vehicle" and obj.year:
+        tokens.add(str(obj.year))
+
+    SearchToken.objects.filter(kind=kind, object_id=obj.pk).delete()
+    SearchToken.objects.bulk_create(
+        [SearchToken(kind=kind, object_id=obj.pk, token=token) for token in tokens]
+    )
+
+
+def unindex_object(kind, pk):
+    from .models import SearchToken
+
+    SearchToken.objects.filter(kind=kind, object_id=pk).delete()
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the whole token table, returning the number of objects indexed"""
+    from vehicles.models import Vehicle
+    from .models import SearchToken, User
+
+    SearchToken.objects.all().delete()
+    sources = [
+        ("member", User.objects.filter(is_staff=False), MEMBER_FIELDS),
+        ("vehicle", Vehicle.objects.all(), VEHICLE_FIELDS),
+    ]
+
+    indexed = 0
+    pending = []
+    for kind, queryset, fields in sources:
+        columns = ["pk", *fields] + (["year"] if kind == "vehicle" else [])
+        for row in queryset.values_list(*columns).iterator(chunk_size=batch_size):
+            values = dict(zip(columns, row))
+            tokens = set()
+            for field in fields:
+                tokens |= _field_tokens(field, values[field])
+            if values.get("year"):
+                tokens.add(str(values["year"]))
+            pending.extend(
+                SearchToken(kind=kind, object_id=values["pk"], token=token)
+                for token in tokens
+            )
+            indexed += 1
+            if len(pending) >= batch_size:
+                SearchToken.objects.bulk_create(pending)
+                pending = []
+    SearchToken.objects.bulk_create(pending)
+    return indexed
+
+
+def score(query, terms, values):
+    """Best weighted match of the query against (value, weight) pairs"""
+    compact_query = "".join(terms)
+    best = 0.0
+    for value, weight in values:
+        text = str(value or "").lower()
+        if not text:
+            continue
+        compact = "".join(tokenize(text))
+        if text == query or compact == compact_query:
+            match = 1.0
+        elif text.startswith(query) or compact.startswith(compact_query):
+            match = 0.8
+        elif compact.endswith(compact_query):
+            match = 0.7
+        elif query in text:
+            match = 0.6
+        else:
+            match = 0.4 * sum(1 for term in terms if term in compact) / len(terms)
+        best = max(best, match * weight)
+    return round(best, 3)
+
+
+class SearchBudget:
+    """Wall-clock allowance shared by every query of one search"""
+
+    def __init__(self, seconds):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self):
+        return self.deadline - time.monotonic()
+
+
+def _run(queryset, budget):
+    """Evaluate a queryset within the remaining budget, or return None"""
+    remaining = budget.remaining()
+    if remaining <= 0:
+        return None
+    if connection.vendor != "postgresql":
+        return list(queryset)
+
+    try:
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                timeout_ms = max(int(remaining * 1000), 1)
+                cursor.execute(f"SET LOCAL statement_timeout = {timeout_ms}")
+            return list(queryset)
+    except OperationalError:
+        # Cancelled by statement_timeout
+        return None
+
+
+def _token_filter(queryset, kind, terms):
+    """Every term must prefix-match one of the object's tokens"""
+    from .models import SearchToken
+
+    for term in terms:
+        term = term[:64]
+        # A range rather than LIKE so SQLite can use the (kind, token) index
+        matches = SearchToken.objects.filter(
+            kind=kind, token__gte=term, token__lt=term + "\uffff"
+        ).values("object_id")
+        queryset = queryset.filter(pk__in=matches)
+    return queryset.order_by("-created_at")
+
+
+def _trigram_filter(queryset, fields, terms, query):
+    """Every term must appear in one of the fields, best matches first"""
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    from django.db.models.functions import Greatest
+
+    for term in terms:
+        condition = Q()
+        for field in fields:
+            condition |= Q(**{f"{field}__icontains": term})
+        queryset = queryset.filter(condition)
+    rank = Greatest(*[TrigramWordSimilarity(query, field) for field in fields])
+    return queryset.annotate(search_rank=rank).order_by("-search_rank")
+
+
+def _matching(queryset, kind, fields, terms, query):
+    if uses_token_index():
+        return _token_filter(queryset, kind, terms)
+    return _trigram_filter(queryset, fields, terms, query)
+
+
+def _weighted(obj, fields):
+    return [(getattr(obj, field), weight) for field, weight in fields.items()]
+
+
+def _vehicle_title(vehicle):
+    parts = [vehicle.year, vehicle.make, vehicle.model]
+    return " ".join(str(part) for part in parts if part) or "Vehicle"
+
+
+def search(query, limit=DEFAULT_LIMIT, budget_seconds=None):
+    """
+    Return {"results": [...], "partial": bool} with the top `limit` matches
+
+    Results are dicts with type, id, title, subtitle and score, best first.
+    """
+    from appointments.models import Appointment
+    from vehicles.models import Vehicle
+    from .models import User
+
+    query = query.strip().lower()
+    terms = tokenize(query)
+    if not terms:
+        return {"results": [], "partial": False}
+
+    if budget_seconds is None:
+        budget_seconds = settings.ADMIN_SEARCH_TIME_BUDGET_MS / 1000
+    budget = SearchBudget(budget_seconds)
+    candidates = limit * 3
+    partial = False
+    results = []
+
+    members = _run(
+        _matching(
+            User.objects.filter(is_staff=False), "member", MEMBER_FIELDS, terms, query
+        )[:candidates],
+        budget,
+    )
+    if members is None:
+        partial, members = True, []
+    member_scores = {}
+    for member in members:
+        member_scores[member.id] = score(
+            query, terms, _weighted(member, MEMBER_FIELDS)
+        )
+        results.append(
+            {
+                "type": "member",
+                "id": str(member.id),
+                "title": member.name or member.email,
+                "subtitle": member.email,
+                "score": member_scores[member.id],
+            }
+        )
+
+    vehicles = _run(
+        _matching(
+            Vehicle.objects.select_related("user"),
+            "vehicle",
+            VEHICLE_FIELDS,
+            terms,
+            query,
+        )[:candidates],
+        budget,
+    )
+    if vehicles is None:
+        partial, vehicles = True, []
+    vehicle_scores = {}
+    for vehicle in vehicles:
+        vehicle_scores[vehicle.id] = score(
+            query, terms, _weighted(vehicle, VEHICLE_FIELDS)
+        )
+        results.append(
+            {
+                "type": "vehicle",
+                "id": str(vehicle.id),
+                "title": _vehicle_title(vehicle),
+                "subtitle": " · ".join(
+                    part
+                    for part in (vehicle.license_plate, vehicle.vin, vehicle.user.email)
+                    if part
+                ),
+                "score": vehicle_scores[vehicle.id],
+            }
+        )
+
+    if member_scores or vehicle_scores:
+        appointments = _run(
+            Appointment.objects.filter(
+                Q(user_id__in=list(member_scores))
+                | Q(vehicle_id__in=list(vehicle_scores))
+            )
+            .select_related("user", "vehicle")
+            .order_by("-start_time")[:candidates],
+            budget,
+        )
+        if appointments is None:
+            partial, appointments = True, []
+        for apt in appointments:
+            parent = max(
+                member_scores.get(apt.user_id, 0), vehicle_scores.get(apt.vehicle_id, 0)
+            )
+            results.append(
+                {
+                    "type": "appointment",
+                    "id": str(apt.id),
+                    "title": ", ".join(apt.services) if apt.services else "Service",
+                    "subtitle": f"{apt.user.name or apt.user.email} · {apt.status}",
+                    "scheduled_time": apt.start_time.isoformat(),
+                    "score": round(parent * APPOINTMENT_WEIGHT, 3),
+                }
+            )
+
+    # Stable sort keeps the latest appointments first on ties
+    results.sort(key=lambda result: -result["score"])
+    return {"results": results[:limit], "partial": partial}
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from vehicles.models import Vehicle
+from .models import User
+from .search import (
+    MEMBER_FIELDS,
+    VEHICLE_FIELDS,
+    index_object,
+    unindex_object,
+    uses_token_index,
+)
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(set(update_fields) & set(fields))
+
+
+@receiver(post_save, sender=User)
+def index_member(sender, instance, **kwargs):
+    """Keep the admin search tokens of a member current"""
+    if not uses_token_index():
+        return
+    if not _touches(kwargs.get("update_fields"), [*MEMBER_FIELDS, "is_staff"]):
+        return
+    if instance.is_staff:
+        unindex_object("member", instance.pk)
+    else:
+        index_object("member", instance)
+
+
+@receiver(post_save, sender=Vehicle)
+def index_vehicle(sender, instance, **kwargs):
+    """Keep the admin search tokens of a vehicle current"""
+    if not uses_token_index():
+        return
+    if not _touches(kwargs.get("update_fields"), [*VEHICLE_FIELDS, "year"]):
+        return
+    index_object("vehicle", instance)
+
+
+@receiver(post_delete, sender=User)
+def unindex_member(sender, instance, **kwargs):
+    if uses_token_index():
+        unindex_object("member", instance.pk)
+
+
+@receiver(post_delete, sender=Vehicle)
+def unindex_vehicle(sender, instance, **kwargs):
+    if uses_token_index():
+        unindex_object("vehicle", instance.pk)
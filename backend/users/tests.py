@@ -1,8 +1,14 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
+from vehicles.models import Vehicle
 from .models import User, Plan, Membership
+import base64
+import json
 import secrets
 
 
@@ -131,3 +137,406 @@ class AuthAPITest(TestCase):
         response = self.client.post(self.refresh_url, data, format="json")
         
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AdminKeysetPaginationTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        # Some members share a timestamp so ties are broken by id
+        now = timezone.now()
+        self.members = []
+        for i in range(7):
+            member = User.objects.create_user(
+                email=f"member{i}@example.com",
+                password="testpass123",
+                created_at=now - timedelta(minutes=i // 2),
+            )
+            Vehicle.objects.create(user=member, make="Toyota")
+            self.members.append(member)
+        Vehicle.objects.create(user=self.members[0], make="Honda")
+        self.url = reverse("list_members")
+
+    def test_walks_every_member_once_in_constant_queries(self):
+        """Test cursors walk forward and back without gaps or repeats"""
+        seen = []
+        pages = []
+        cursor = None
+        while True:
+            params = {"per_page": 3}
+            if cursor:
+                params["cursor"] = cursor
+            # Auth is forced, so each page is a single query
+            with self.assertNumQueries(1):
+                response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append(data)
+            seen.extend(row["id"] for row in data["results"])
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+
+        expected = sorted(
+            self.members, key=lambda m: (m.created_at, str(m.id)), reverse=True
+        )
+        self.assertEqual(seen, [str(m.id) for m in expected])
+        self.assertEqual(len(pages), 3)
+        self.assertIsNone(pages[0]["previous_cursor"])
+
+        counts = {row["id"]: row["vehicle_count"] for p in pages for row in p["results"]}
+        self.assertEqual(counts[str(self.members[0].id)], 2)
+
+        response = self.client.get(
+            self.url, {"per_page": 3, "cursor": pages[2]["previous_cursor"]}
+        )
+        self.assertEqual(response.json()["results"], pages[1]["results"])
+
+    def test_optional_total_and_invalid_cursor(self):
+        """Test totals are only computed on request and bad cursors are rejected"""
+        response = self.client.get(self.url)
+        self.assertNotIn("total", response.json())
+
+        response = self.client.get(self.url, {"total": "exact"})
+        self.assertEqual(response.json()["total"], 7)
+        self.assertFalse(response.json()["total_is_approximate"])
+
+        response = self.client.get(self.url, {"total": "approximate"})
+        self.assertEqual(response.json()["total"], 7)
+
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.get(reverse("list_vehicles"), {"per_page": 5})
+        self.assertEqual(len(response.json()["results"]), 5)
+        self.assertIsNotNone(response.json()["next_cursor"])
+
+    def test_tampered_cursor_pk_is_rejected(self):
+        """Test a cursor whose pk is not a UUID returns 400, not 500"""
+        raw = json.dumps(["n", timezone.now().isoformat(), "zzz"])
+        cursor = base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+        response = self.client.get(self.url, {"cursor": cursor})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], "Invalid cursor")
+
+
+class AdminSearchTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+        self.url = reverse("admin_search")
+
+        self.member = User.objects.create_user(
+            email="jane.doe@example.com",
+            password="testpass123",
+            name="Jane Doe",
+        )
+        self.other = User.objects.create_user(
+            email="john.smith@example.com",
+            password="testpass123",
+            name="John Smith",
+        )
+        self.vehicle = Vehicle.objects.create(
+            user=self.other,
+            vin="1HGCM82633A004352",
+            license_plate="ABC-1234",
+            make="Honda",
+            model="Accord",
+            year=2021,
+        )
+
+    def search(self, query, **params):
+        response = self.client.get(self.url, {"q": query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_finds_vehicles_by_vin_suffix_and_plate(self):
+        """Test VINs match by suffix and plates match with or without separators"""
+        for query in ("004352", "abc1234", "ABC-1234", "1hgcm82633a004352"):
+            results = self.search(query)["results"]
+            self.assertEqual(results[0]["type"], "vehicle", query)
+            self.assertEqual(results[0]["id"], str(self.vehicle.id), query)
+
+    def test_ranks_members_and_their_appointments(self):
+        """Test exact matches rank first and appointments follow their member"""
+        from appointments.models import Appointment
+
+        appointment = Appointment.objects.create(
+            user=self.member,
+            start_time=timezone.now() + timedelta(days=1),
+            services=["Oil Change"],
+        )
+
+        results = self.search("jane doe")["results"]
+        self.assertEqual(
+            [(r["type"], r["id"]) for r in results],
+            [("member", str(self.member.id)), ("appointment", str(appointment.id))],
+        )
+        self.assertGreater(results[0]["score"], results[1]["score"])
+
+        # Every term must match
+        self.assertEqual(self.search("jane smith")["results"], [])
+
+    def test_index_follows_updates_and_budget(self):
+        """Test edits re-index and an exhausted budget reports partial results"""
+        self.member.name = "Janet Rivers"
+        self.member.save()
+        self.assertEqual(self.search("doe")["results"][0]["title"], "Janet Rivers")
+        self.assertEqual(self.search("rivers")["results"][0]["id"], str(self.member.id))
+
+        self.vehicle.delete()
+        self.assertEqual(self.search("004352")["results"], [])
+
+        with self.settings(ADMIN_SEARCH_TIME_BUDGET_MS=0):
+            found = self.search("jane")
+        self.assertTrue(found["partial"])
+        self.assertEqual(found["results"], [])
+
+
+class AdminExportTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+        for i in range(3):
+            User.objects.create_user(
+                email=f"export{i}@example.com",
+                password="testpass123",
+                name=f"Export, Member {i}",
+                created_at=timezone.now() - timedelta(days=i),
+            )
+
+    def test_streams_members_csv(self):
+        """Test CSV exports stream every row from a single query"""
+        import csv
+        import io
+
+        url = reverse("export_data", args=["members", "csv"])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertIn("attachment;", response["Content-Disposition"])
+
+        with self.assertNumQueries(1):
+            body = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0][:3], ["id", "email", "name"])
+        self.assertEqual(
+            [row[1] for row in rows[1:]],
+            ["export2@example.com", "export1@example.com", "export0@example.com"],
+        )
+        self.assertEqual(rows[-1][2], "Export, Member 0")
+
+    def test_csv_neutralises_formulas(self):
+        """Test CSV cells that would run as spreadsheet formulas are quoted"""
+        import csv
+        import io
+        import json
+
+        User.objects.create_user(
+            email="formula@example.com",
+            password="testpass123",
+            name='=HYPERLINK("http://evil.example","Click")',
+            phone="+15550100",
+        )
+        url = reverse("export_data", args=["members", "csv"])
+        body = b"".join(self.client.get(url).streaming_content).decode()
+        row = list(csv.reader(io.StringIO(body)))[-1]
+        self.assertEqual(row[2], '\'=HYPERLINK("http://evil.example","Click")')
+        self.assertEqual(row[3], "'+15550100")
+
+        # NDJSON is data, not a spreadsheet, so it stays untouched
+        url = reverse("export_data", args=["members", "ndjson"])
+        lines = b"".join(self.client.get(url).streaming_content).decode()
+        record = json.loads(lines.splitlines()[-1])
+        self.assertEqual(record["name"], '=HYPERLINK("http://evil.example","Click")')
+
+    def test_streams_ndjson_with_date_range(self):
+        """Test NDJSON exports honour since/until and reject bad input"""
+        import json
+
+        today = timezone.localdate().isoformat()
+        url = reverse("export_data", args=["members", "ndjson"])
+        response = self.client.get(url, {"since": today, "until": today})
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(json.loads(lines[0])["email"], "export0@example.com")
+
+        response = self.client.get(url, {"since": "yesterday"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.get(reverse("export_data", args=["secrets", "csv"]))
+        self.assertEqual(response.status_code, 404)
+
+
+class AdminBulkActionTest(TestCase):
+    def setUp(self):
+        from appointments.models import Appointment, Location
+        from services.models import ServiceSchedule, ServiceType
+
+        self.client = APIClient()
+        self.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            password="adminpass123",
+        )
+        self.client.force_authenticate(user=self.admin)
+
+        self.shop = Location.objects.create(name="Main Shop")
+        self.annex = Location.objects.create(name="Annex")
+        self.member = User.objects.create_user(
+            email="bulk@example.com", password="testpass123"
+        )
+        self.vehicle = Vehicle.objects.create(
+            user=self.member, make="Toyota", model="Camry", year=2020, odometer=42000
+        )
+        oil = ServiceType.objects.create(
+            name="Oil Change", description="Oil", estimated_duration="30 minutes"
+        )
+        self.schedule = ServiceSchedule.objects.create(
+            vehicle=self.vehicle,
+            service_type=oil,
+            mileage_trigger=5000,
+            time_trigger_months=6,
+            status="due_soon",
+        )
+
+        tomorrow = timezone.now().replace(hour=10, minute=0) + timedelta(days=1)
+        self.appointments = [
+            Appointment.objects.create(
+                user=self.member,
+                vehicle=self.vehicle,
+                location=self.shop,
+                service_schedule=self.schedule if i == 0 else None,
+                start_time=tomorrow + timedelta(hours=i),
+                services=["Oil Change"],
+            )
+            for i in range(4)
+        ]
+        self.later = Appointment.objects.create(
+            user=self.member,
+            location=self.shop,
+            start_time=tomorrow + timedelta(days=3),
+        )
+
+    @override_settings(NOTIFICATION_OUTBOX=False)
+    @patch("notifications.utils.send_bulk_notifications")
+    def test_bulk_status_by_filter(self, send):
+        """Test a filter closes a location's day in one request"""
+        from appointments.models import Appointment
+
+        url = reverse("bulk_update_appointments")
+        day = timezone.localtime(self.appointments[0].start_time).date()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url,
+                {
+                    "filter": {"location_id": str(self.shop.id), "date": str(day)},
+                    "changes": {"status": "cancelled"},
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"matched": 4, "updated": 4, "notified": 4})
+        self.assertEqual(Appointment.objects.filter(status="cancelled").count(), 4)
+        self.later.refresh_from_db()
+        self.assertEqual(self.later.status, "scheduled")
+
+        # One batch for every affected member
+        send.assert_called_once()
+        messages, notification_type = send.call_args.args
+        self.assertEqual(notification_type, "appointment_update")
+        self.assertEqual(len(messages), 4)
+        self.assertIn("cancelled", messages[0]["body"])
+
+    def test_bulk_complete_and_reassign_by_ids(self):
+        """Test completing by id rolls linked schedules forward"""
+        from notifications.models import OutboxNotification
+
+        ids = [str(apt.id) for apt in self.appointments[:2]]
+        url = reverse("bulk_update_appointments")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url,
+                {"ids": ids, "changes": {"status": "completed"}},
+                format="json",
+            )
+        self.assertEqual(response.json()["updated"], 2)
+
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.status, "upcoming")
+        self.assertEqual(self.schedule.last_completed_date, timezone.localdate())
+        self.assertEqual(self.schedule.last_completed_mileage, 42000)
+        self.assertEqual(self.schedule.next_due_mileage, 47000)
+        self.assertIsNotNone(self.schedule.next_due_date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                url,
+                {"ids": ids, "changes": {"location_id": str(self.annex.id)}},
+                format="json",
+            )
+        self.assertEqual(response.json()["notified"], 2)
+        self.appointments[0].refresh_from_db()
+        self.assertEqual(self.appointments[0].location_id, self.annex.id)
+
+        # Queued in the outbox with the change rather than sent inline
+        queued = OutboxNotification.objects.filter(
+            notification_type="appointment_update"
+        )
+        self.assertEqual(queued.count(), 4)
+        self.assertEqual(queued.filter(body__contains="Annex").count(), 2)
+
+    def test_bulk_rejects_invalid_requests(self):
+        """Test targets, fields and values are validated before any write"""
+        url = reverse("bulk_update_appointments")
+        bad = [
+            {"changes": {"status": "cancelled"}},
+            {"ids": ["not-a-uuid"], "changes": {"status": "cancelled"}},
+            {"filter": {"everything": True}, "changes": {"status": "cancelled"}},
+            {"filter": {"status": "scheduled"}, "changes": {"user_id": "x"}},
+            {"filter": {"status": "scheduled"}, "changes": {"status": "gone"}},
+        ]
+        for payload in bad:
+            response = self.client.post(url, payload, format="json")
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertFalse(self.member.appointments.exclude(status="scheduled").exists())
+
+    def test_bulk_schedules_and_offers(self):
+        """Test schedule and offer bulk updates report affected counts"""
+        from notifications.models import OutboxNotification
+        from offers.models import Offer
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("bulk_update_service_schedules"),
+                {
+                    "filter": {"user_id": str(self.member.id)},
+                    "changes": {"status": "overdue"},
+                },
+                format="json",
+            )
+        self.assertEqual(response.json(), {"matched": 1, "updated": 1, "notified": 1})
+        queued = OutboxNotification.objects.get()
+        self.assertEqual(queued.notification_type, "service_due")
+
+        past = timezone.now() - timedelta(days=1)
+        Offer.objects.create(title="Old", expiry=past)
+        Offer.objects.create(title="Older", expiry=past)
+        Offer.objects.create(title="Current")
+        response = self.client.post(
+            reverse("bulk_update_offers"),
+            {"filter": {"expired": True}, "changes": {"locations": []}},
+            format="json",
+        )
+        self.assertEqual(response.json(), {"matched": 2, "updated": 2})
@@ -4,6 +4,8 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from django.contrib.auth.models import update_last_login
+from django.utils import timezone
 from .models import User, Membership
 from .serializers import UserSerializer
 from referrals.models import Referral
@@ -61,6 +63,7 @@ def register(request):
     # Generate tokens
     refresh = RefreshToken.for_user(user)
     access_token = str(refresh.access_token)
+    update_last_login(None, user)
 
     serializer = UserSerializer(user)
     return Response(
@@ -103,6 +106,7 @@ def login(request):
     # Generate tokens
     refresh = RefreshToken.for_user(user)
     access_token = str(refresh.access_token)
+    update_last_login(None, user)
 
     serializer = UserSerializer(user)
     return Response(
@@ -131,6 +135,8 @@ def refresh_token(request):
     try:
         refresh = RefreshToken(refresh_token)
         access_token = str(refresh.access_token)
+        # Apps stay signed in through refreshes, so they mark activity too
+        User.objects.filter(pk=refresh["user_id"]).update(last_login=timezone.now())
         # Return both formats for compatibility
         return Response(
             {"access": access_token, "accessToken": access_token},
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:17
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("vehicles", "0002_vehicle_photo_url"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="vehicle",
+            index=models.Index(fields=["created_at", "id"], name="vehicles_created_175451_idx"),
+        ),
+    ]
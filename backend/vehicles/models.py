@@ -34,6 +34,7 @@ class Vehicle(models.Model):
         db_table = "vehicles"
         indexes = [
             models.Index(fields=["user"]),
+            models.Index(fields=["created_at", "id"]),
         ]
 
     def __str__(self):